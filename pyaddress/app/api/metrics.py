@@ -0,0 +1,26 @@
+"""
+Title: metrics.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Prometheus metrics scraping endpoint.
+
+"""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.metrics import render_metrics
+
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4"
+
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics() -> PlainTextResponse:
+    """Return collected metrics (of all worker processes) in Prometheus text exposition
+    format."""
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_MEDIA_TYPE)
@@ -9,8 +9,10 @@ Description:
 """
 from fastapi.routing import APIRouter
 
+from app.api.metrics import metrics_router
 from app.api.v1.router import v1_router
 
 
 root_router = APIRouter()
 root_router.include_router(v1_router)
+root_router.include_router(metrics_router)
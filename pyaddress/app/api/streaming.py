@@ -0,0 +1,271 @@
+"""
+Title: streaming.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Incremental decoding of JSON array and NDJSON request bodies.
+
+"""
+import codecs
+import json
+from typing import Any, AsyncIterable, AsyncIterator, List
+
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+
+class StreamDecodeError(Exception):
+    """Raised when streamed request body is not a valid JSON array or NDJSON document."""
+
+
+_WHITESPACE = " \t\r\n"
+_DELIMITERS = frozenset(_WHITESPACE + ",]")
+# yielded by decoders before they wait for next body chunk
+_END_OF_CHUNK = object()
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """Streaming response produced while request body is still being read.
+
+    Regular `StreamingResponse` listens for client disconnect on the same receive channel that
+    `Request.stream()` uses, so both would race for body messages. Here body reading is the only
+    receiver and client disconnect surfaces as `ClientDisconnect` raised by `Request.stream()`.
+    """
+
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+# longest remainder of a value which may only be truncated (e.g. "-Infinit" or "\u00e" escape)
+_MAX_TRUNCATED_TAIL = 12
+MAX_ITEM_SIZE = 1 << 20
+
+
+async def _iter_text(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Decode UTF-8 body chunks into text pieces."""
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        async for chunk in chunks:
+            text = text_decoder.decode(chunk)
+            if text:
+                yield text
+        text = text_decoder.decode(b"", final=True)
+    except UnicodeDecodeError as err:
+        raise StreamDecodeError(f"invalid UTF-8 body: {err}") from err
+    if text:
+        yield text
+
+
+def _may_be_truncated(err: json.JSONDecodeError) -> bool:
+    """Return whether decoding failed only because value is not complete yet."""
+    return (
+        err.msg.startswith("Unterminated string")
+        or len(err.doc) - err.pos < _MAX_TRUNCATED_TAIL
+    )
+
+
+def _may_continue(item: Any, buffer: str, end: int) -> bool:
+    """Return whether number decoded from buffer may be a prefix of longer number, because
+    buffer ends before any delimiter following it (e.g. "1.5" decoded from "1.5e")."""
+    if not isinstance(item, (int, float)) or isinstance(item, bool):
+        return False
+    for position in range(end, len(buffer)):
+        if buffer[position] in _DELIMITERS:
+            return False
+    return True
+
+
+def _decode_line(line: str) -> Any:
+    """Decode NDJSON line, return decoding error instead of raising it."""
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as err:
+        return StreamDecodeError(f"malformed JSON: {err.msg}")
+
+
+async def _iter_lines(
+        head: str, pieces: AsyncIterator[str], max_item_size: int
+) -> AsyncIterator[Any]:
+    """Decode NDJSON values line by line, reporting malformed lines instead of raising."""
+    pending = []
+    size = 0
+    skipping = False  # rest of too long line is dropped
+    text = head
+    while True:
+        start = 0
+        newline = text.find("\n")
+        while newline >= 0:
+            if not skipping:
+                size += newline - start
+                if size > max_item_size:
+                    yield StreamDecodeError(f"line exceeds {max_item_size} characters")
+                else:
+                    pending.append(text[start:newline])
+                    line = "".join(pending).strip(_WHITESPACE)
+                    if line:
+                        yield _decode_line(line)
+            pending, size, skipping = [], 0, False
+            start = newline + 1
+            newline = text.find("\n", start)
+        if not skipping and start < len(text):
+            size += len(text) - start
+            if size > max_item_size:
+                yield StreamDecodeError(f"line exceeds {max_item_size} characters")
+                pending, skipping = [], True
+            else:
+                pending.append(text[start:])
+        yield _END_OF_CHUNK
+        try:
+            text = await pieces.__anext__()
+        except StopAsyncIteration:
+            break
+    line = "".join(pending).strip(_WHITESPACE)
+    if line and not skipping:
+        yield _decode_line(line)
+
+
+async def _iter_array(
+        buffer: str, pieces: AsyncIterator[str], max_item_size: int
+) -> AsyncIterator[Any]:
+    """Decode items of JSON array whose opening bracket was already consumed."""
+    decoder = json.JSONDecoder()
+    position = 0
+    expect_item = True  # item expected next (otherwise "," or "]")
+    after_comma = False
+    finished = False
+    eof = False
+
+    while True:
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            if position == len(buffer):
+                break
+            if finished:
+                raise StreamDecodeError("unexpected data after end of JSON array")
+            if not expect_item:
+                if buffer[position] == ",":
+                    expect_item = after_comma = True
+                elif buffer[position] == "]":
+                    finished = True
+                else:
+                    raise StreamDecodeError(f"expected ',' or ']' at offset {position}")
+                position += 1
+                continue
+            if buffer[position] == "]":
+                if after_comma:
+                    raise StreamDecodeError(f"expected value after ',' at offset {position}")
+                finished = True
+                position += 1
+                continue
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as err:
+                if eof or not _may_be_truncated(err):
+                    raise StreamDecodeError(f"malformed JSON: {err.msg}") from err
+                break
+            if not eof and (end == len(buffer) or _may_continue(item, buffer, end)):
+                # value may be truncated (e.g. number split between chunks), wait for more data
+                break
+            position = end
+            expect_item = after_comma = False
+            yield item
+
+        if eof:
+            break
+        if len(buffer) - position > max_item_size:
+            raise StreamDecodeError(f"item exceeds {max_item_size} characters")
+        yield _END_OF_CHUNK
+        try:
+            buffer = buffer[position:] + await pieces.__anext__()
+        except StopAsyncIteration:
+            buffer = buffer[position:]
+            eof = True
+        position = 0
+
+    if not finished:
+        raise StreamDecodeError("unterminated JSON array")
+
+
+async def _iter_decoded(chunks: AsyncIterable[bytes], max_item_size: int) -> AsyncIterator[Any]:
+    """Decode body items, `_END_OF_CHUNK` marks where decoder waits for next body chunk."""
+    pieces = _iter_text(chunks).__aiter__()
+    async for text in pieces:
+        head = text.lstrip(_WHITESPACE)
+        if head:
+            break
+    else:
+        return
+    if head[0] == "[":
+        items = _iter_array(head[1:], pieces, max_item_size)
+    else:
+        items = _iter_lines(head, pieces, max_item_size)
+    async for item in items:
+        yield item
+
+
+async def iter_json_batches(
+        chunks: AsyncIterable[bytes], max_item_size: int = MAX_ITEM_SIZE
+) -> AsyncIterator[List[Any]]:
+    """Decode items from JSON array or NDJSON body in batches of items decoded from each body
+    chunk (see `iter_json_items`). Items decoded before body turns out to be malformed are
+    yielded before the error is raised.
+
+    Args:
+        chunks: Raw body chunks (e.g. ``Request.stream()``).
+        max_item_size: Maximum number of characters of single item (NDJSON line).
+
+    Raise:
+        StreamDecodeError: If body is malformed (not valid UTF-8 or malformed JSON array).
+
+    Yields:
+        Non-empty lists of decoded JSON values (or errors of malformed NDJSON lines).
+
+    """
+    batch: List[Any] = []
+    try:
+        async for item in _iter_decoded(chunks, max_item_size):
+            if item is not _END_OF_CHUNK:
+                batch.append(item)
+            elif batch:
+                yield batch
+                batch = []
+    except StreamDecodeError:
+        if batch:
+            yield batch
+        raise
+    if batch:
+        yield batch
+
+
+async def iter_json_items(
+        chunks: AsyncIterable[bytes], max_item_size: int = MAX_ITEM_SIZE
+) -> AsyncIterator[Any]:
+    """Decode items from JSON array or NDJSON body without loading the whole body in memory.
+
+    Body format is detected from its first non-whitespace character: "[" starts a JSON array,
+    anything else is treated as NDJSON (one JSON value per line). Only not consumed part of the
+    body is buffered, so memory usage depends on the size of a single item only.
+
+    Malformed NDJSON line does not stop decoding, it is yielded as `StreamDecodeError` instance
+    in place of its value. Malformed JSON array fails as soon as it is known to be malformed.
+
+    Args:
+        chunks: Raw body chunks (e.g. ``Request.stream()``).
+        max_item_size: Maximum number of characters of single item (NDJSON line).
+
+    Raise:
+        StreamDecodeError: If body is malformed (not valid UTF-8 or malformed JSON array).
+
+    Yields:
+        Decoded JSON values (or errors of malformed NDJSON lines) in body order.
+
+    """
+    async for item in _iter_decoded(chunks, max_item_size):
+        if item is not _END_OF_CHUNK:
+            yield item
@@ -7,27 +7,172 @@ Description:
     Address management API endpoints.
 
 """
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException
+import json
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from fastapi import APIRouter, Depends, Header, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 
+from app.api.streaming import DuplexStreamingResponse, StreamDecodeError, iter_json_batches
+from app.metrics import REGISTRY, REQUEST_SECONDS, REQUESTS
 from app.schemas.address import Address
-from app.services.address import AddressService, AddressServiceError, get_address_service
+from app.services.address import (
+    AddressService,
+    ParseResult,
+    get_address_service,
+    get_event_loop_address_service,
+    result_etag,
+)
+from app.settings import get_settings
 
 
 address_router = APIRouter(tags=["Addresses"])
 
 
-@address_router.get("/addresses/extract/address}")
+@address_router.get("/addresses/extract/address}", response_model=Optional[Address])
 def extract_address_components(
-        address: str, address_service: AddressService = Depends(get_address_service)
-) -> Optional[Address]:
+        address: str,
+        country: Optional[str] = None,
+        if_none_match: Optional[str] = Header(default=None),
+        address_service: AddressService = Depends(get_address_service),
+) -> Response:
     """
-    Extracts street and number from address string and return as a separate values.
+    Extracts street and number from address string and return as a separate values. Optional
+    `country` code hint skips address country detection.
+
+    Responses (404 ones too) carry ETag derived from normalized address and parsing rules
+    version, requests with matching `If-None-Match` are answered with 304 without parsing.
     """
-    try:
-        return address_service.extract_address_components(address)
-    except AddressServiceError:
-        raise HTTPException(
+    if not REGISTRY.enabled:
+        return _extract_address_components(address, country, if_none_match, address_service)[0]
+    started = time.perf_counter()
+    response, outcome = _extract_address_components(
+        address, country, if_none_match, address_service
+    )
+    REQUEST_SECONDS.observe(time.perf_counter() - started, "extract")
+    REQUESTS.inc("extract", outcome)
+    return response
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Return whether `If-None-Match` header value matches entity tag (weak comparison)."""
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(",")
+    )
+
+
+def _cache_headers(etag: str) -> Dict[str, str]:
+    """Return caching headers of extraction response with given entity tag."""
+    settings = get_settings()
+    cache_control = f"public, max-age={max(settings.HTTP_CACHE_MAX_AGE, 0)}"
+    if settings.HTTP_CACHE_S_MAXAGE is not None:
+        cache_control += f", s-maxage={max(settings.HTTP_CACHE_S_MAXAGE, 0)}"
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+
+def _extract_address_components(
+        address: str,
+        country: Optional[str],
+        if_none_match: Optional[str],
+        address_service: AddressService,
+) -> Tuple[Response, str]:
+    """Return extraction response and its outcome name."""
+    # result is a pure function of its input and rules, so tag is known before parsing
+    headers = _cache_headers(result_etag(address, country))
+    if if_none_match is not None and _etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers), "not_modified"
+    result = address_service.extract(address, country)
+    if not result.ok:
+        # built directly instead of raising HTTPException, unsupported addresses are common
+        return JSONResponse(
             status_code=404,
-            detail=f"Could not extract street and number from {address}"
-        )
+            content={"detail": f"Could not extract street and number from {address}"},
+            headers=headers,
+        ), "not_found"
+    # serialized directly instead of returning Address instance to skip response validation
+    return Response(
+        content=result.json(), media_type="application/json", headers=headers
+    ), "success"
+
+
+def _batch_result(
+        index: Optional[int], result: Optional[ParseResult], error: Optional[str] = None
+) -> bytes:
+    """Serialize single batch result (or input error if there is no result) as NDJSON line."""
+    line = {
+        "index": index,
+        "street": None,
+        "housenumber": None,
+        "error": error,
+    }
+    if result is not None:
+        line.update(street=result.street, housenumber=result.house_number, error=result.message)
+    return json.dumps(line, ensure_ascii=False).encode() + b"\n"
+
+
+def _extract_items(
+        items: List[Any], index: int, country: Optional[str], address_service: AddressService
+) -> bytes:
+    """Extract address components from body items, return their NDJSON result lines."""
+    lines = []
+    for index, item in enumerate(items, start=index):
+        outcome = "failure"
+        if isinstance(item, StreamDecodeError):
+            # malformed NDJSON line, following lines are still processed
+            lines.append(_batch_result(index, None, f"invalid input: {item}"))
+        elif not isinstance(item, str):
+            lines.append(_batch_result(index, None, "invalid input: address must be a string"))
+        else:
+            result = address_service.extract(item, country)
+            if result.ok:
+                outcome = "success"
+            lines.append(_batch_result(index, result, None))
+        if REGISTRY.enabled:
+            REQUESTS.inc("batch_item", outcome)
+    return b"".join(lines)
+
+
+async def _extract_batch(
+        request: Request, country: Optional[str], address_service: AddressService
+) -> AsyncIterator[bytes]:
+    """Extract address components from streamed request body items. Items of each received body
+    chunk are parsed together in a worker thread (cache lookups may block on I/O)."""
+    index = 0
+    try:
+        async for items in iter_json_batches(request.stream()):
+            yield await run_in_threadpool(_extract_items, items, index, country, address_service)
+            index += len(items)
+    except StreamDecodeError as err:
+        # response is already being streamed, so report broken body as a last result line
+        yield _batch_result(None, None, f"malformed request body: {err}")
+
+
+@address_router.post(
+    "/addresses/batch",
+    response_class=DuplexStreamingResponse,
+    responses={200: {"content": {DuplexStreamingResponse.media_type: {}}}},
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"type": "array", "items": {"type": "string"}}},
+                DuplexStreamingResponse.media_type: {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def extract_address_components_batch(
+        request: Request,
+        country: Optional[str] = None,
+        address_service: AddressService = Depends(get_event_loop_address_service),
+) -> DuplexStreamingResponse:
+    """
+    Extracts street and number from many addresses sent as JSON array or NDJSON (one JSON string
+    per line). Results are streamed back as NDJSON in input order, each one carrying its input
+    `index` and `error` reason (null on success). Optional `country` code hint applies to all
+    addresses.
+    """
+    return DuplexStreamingResponse(_extract_batch(request, country, address_service))
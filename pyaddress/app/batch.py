@@ -0,0 +1,334 @@
+"""
+Title: batch.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Offline bulk address parsing of large CSV/TSV files.
+
+    Input file is memory-mapped and split into row-aligned chunks which are parsed on a pool
+    of worker processes. Results are written in input order as CSV rows with street,
+    house_number and status columns, one for every input row (rows which are not valid CSV get
+    MALFORMED_ROW status, invalid UTF-8 bytes are replaced). Results may also be stored in
+    shared parsing results cache, so that API workers start warm. Addresses are parsed with
+    rules data file of the API (`RULES_PATH` setting) unless other one is given.
+
+    Usage:
+
+        python -m app.batch addresses.tsv --delimiter '\\t' --column 2 --output parsed.tsv
+        python -m app.batch addresses.csv --output /dev/null --shared-cache cache.sqlite
+
+"""
+import argparse
+import collections
+import concurrent.futures
+import csv
+import io
+import mmap
+import os
+import sys
+import time
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from app.services.address import (
+    AddressParser,
+    ParsedBatch,
+    ParseStatus,
+    load_gazetteer,
+    ruleset_version,
+    shared_cache_key,
+)
+from app.services.cache import SharedCache
+from app.services.ruleset import load_rules, read_rules
+
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+DEFAULT_SHARED_CACHE_SIZE = 1000000
+MALFORMED_ROW = "MALFORMED_ROW"  # status of input rows which are not valid CSV
+
+
+class ChunkResult(NamedTuple):
+    """Parsed chunk serialized as output rows."""
+
+    data: bytes
+    total: int
+    failed: int
+
+
+def iter_chunks(
+        mapped: mmap.mmap, start: int, chunk_size: int, quotechar: bytes = b'"'
+) -> Iterator[Tuple[int, int]]:
+    """Split memory-mapped file into row-aligned chunks.
+
+    Args:
+        mapped: Memory-mapped input file.
+        start: Offset of the first row to process.
+        chunk_size: Approximate chunk size in bytes.
+        quotechar: CSV quote character, newlines within quoted fields never end a chunk.
+
+    Yields:
+        Chunk (start, end) offsets, each chunk ends right after a newline or at end of file.
+
+    """
+    size = len(mapped)
+    while start < size:
+        end = mapped.find(b"\n", min(start + chunk_size, size) - 1)
+        end = size if end == -1 else end + 1
+        # odd number of quotes means chunk would end within quoted field (escaped quotes are
+        # doubled, so they never change the parity), extend it by whole lines until it does not
+        quotes = mapped[start:end].count(quotechar)
+        while quotes % 2 and end < size:
+            line_end = mapped.find(b"\n", end)
+            line_end = size if line_end == -1 else line_end + 1
+            quotes += mapped[end:line_end].count(quotechar)
+            end = line_end
+        yield start, end
+        start = end
+
+
+def read_addresses(text: str, delimiter: str, column: int) -> Tuple[List[str], Set[int]]:
+    """Read address column of CSV rows. Rows end with newlines only (other line break
+    characters are kept in fields, so that output rows stay aligned with input rows).
+
+    Args:
+        text: Decoded input chunk.
+        delimiter: Column delimiter.
+        column: Index of the address column.
+
+    Returns:
+        Addresses (empty for rows without address column) and indices of malformed rows.
+
+    """
+    addresses = []
+    malformed = set()
+    reader = csv.reader(io.StringIO(text, newline="\n"), delimiter=delimiter)
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            break
+        except csv.Error:  # e.g. carriage return within unquoted field, reader skips the row
+            malformed.add(len(addresses))
+            row = []
+        addresses.append(row[column] if len(row) > column else "")
+    return addresses, malformed
+
+
+def parse_chunk(
+        path: str,
+        start: int,
+        end: int,
+        delimiter: str,
+        column: int,
+        country: Optional[str] = None,
+        shared_cache: Optional[str] = None,
+        shared_cache_size: int = DEFAULT_SHARED_CACHE_SIZE,
+) -> ChunkResult:
+    """Parse addresses from single input file chunk. Executed in worker processes.
+
+    Args:
+        path: Input file path.
+        start: Chunk start offset.
+        end: Chunk end offset.
+        delimiter: Input and output column delimiter.
+        column: Index of the address column.
+        country: Optional country code hint of all addresses.
+        shared_cache: Optional shared parsing results cache file path to store results in.
+        shared_cache_size: Maximum number of shared cache entries.
+
+    Returns:
+        Serialized output rows along with processed and failed addresses counts.
+
+    """
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        # invalid bytes fail parsing of their addresses only
+        text = mapped[start:end].decode("utf-8", errors="replace")
+    addresses, malformed = read_addresses(text, delimiter, column)
+    parsed = AddressParser.parse_many(addresses, country)
+    if shared_cache:
+        _prewarm(SharedCache(shared_cache, shared_cache_size), addresses, country, parsed)
+
+    output = io.StringIO()
+    writer = csv.writer(output, delimiter=delimiter, lineterminator="\n")
+    failed = 0
+    for index, (street, house_number, status) in enumerate(
+            zip(parsed.street, parsed.house_number, parsed.status)
+    ):
+        if status != ParseStatus.OK:
+            failed += 1
+        name = MALFORMED_ROW if index in malformed else ParseStatus(status).name
+        writer.writerow((street or "", house_number or "", name))
+    return ChunkResult(data=output.getvalue().encode("utf-8"), total=len(addresses), failed=failed)
+
+
+def _prewarm(
+        cache: SharedCache, addresses: List[str], country: Optional[str], parsed: ParsedBatch
+) -> None:
+    """Store parsing results in shared cache under current rule set version."""
+    try:
+        cache.put_many(
+            (
+                (
+                    shared_cache_key(AddressParser.normalize(address), country),
+                    [status, street, house_number],
+                )
+                for address, street, house_number, status in zip(
+                    addresses, parsed.street, parsed.house_number, parsed.status
+                )
+            ),
+            version=ruleset_version(),
+        )
+    finally:
+        cache.close()
+
+
+def _initialize_worker(gazetteer: Optional[str], rules: Optional[str]) -> None:
+    """Load street names gazetteer and parsing rules in worker process."""
+    load_gazetteer(gazetteer)
+    load_rules(rules)
+
+
+def run(
+        path: str,
+        output: BinaryIO,
+        workers: int,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        delimiter: str = ",",
+        column: int = 0,
+        header: bool = False,
+        gazetteer: Optional[str] = None,
+        country: Optional[str] = None,
+        shared_cache: Optional[str] = None,
+        shared_cache_size: int = DEFAULT_SHARED_CACHE_SIZE,
+        rules: Optional[str] = None,
+) -> Tuple[int, int]:
+    """Parse all addresses from input file and write results in input order.
+
+    Args:
+        path: Input file path.
+        output: Binary stream results are written to.
+        workers: Number of worker processes.
+        chunk_size: Approximate size of chunk processed by a single worker task.
+        delimiter: Input and output column delimiter.
+        column: Index of the address column.
+        header: Whether first input line is a header to skip.
+        gazetteer: Optional street names gazetteer file path used by workers.
+        country: Optional country code hint of all addresses (skips country detection).
+        shared_cache: Optional shared parsing results cache file path to prewarm.
+        shared_cache_size: Maximum number of shared cache entries.
+        rules: Optional parsing rules data file path used by workers (built-in rules if None).
+
+    Raise:
+        RulesError: If rules data file is malformed.
+
+    Returns:
+        Processed and failed addresses counts.
+
+    """
+    if rules:
+        read_rules(rules)  # fail before any output is written rather than in every worker
+    total = failed = 0
+    output.write(delimiter.join(("street", "house_number", "status")).encode() + b"\n")
+    if os.path.getsize(path) == 0:
+        return total, failed
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        start = mapped.find(b"\n") + 1 if header else 0
+        if header and start == 0:
+            return total, failed
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers, initializer=_initialize_worker, initargs=(gazetteer, rules)
+        ) as executor:
+            # keep bounded number of chunks in flight so results can be written in input order
+            # without buffering whole output in memory
+            pending: "collections.deque[concurrent.futures.Future]" = collections.deque()
+            for chunk_start, chunk_end in iter_chunks(mapped, start, chunk_size):
+                pending.append(
+                    executor.submit(
+                        parse_chunk, path, chunk_start, chunk_end, delimiter, column, country,
+                        shared_cache, shared_cache_size,
+                    )
+                )
+                if len(pending) >= workers * 2:
+                    total, failed = _write_result(pending.popleft(), output, total, failed)
+            while pending:
+                total, failed = _write_result(pending.popleft(), output, total, failed)
+    return total, failed
+
+
+def _write_result(
+        future: concurrent.futures.Future, output: BinaryIO, total: int, failed: int
+) -> Tuple[int, int]:
+    """Wait for chunk result, write it and return updated counters."""
+    result: ChunkResult = future.result()
+    output.write(result.data)
+    return total + result.total, failed + result.failed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entrypoint."""
+    # settings pull in pydantic, only command line needs them
+    from app.settings import (  # pylint: disable=import-outside-toplevel
+        get_settings,
+        initialize_settings,
+    )
+
+    initialize_settings()
+    parser = argparse.ArgumentParser(
+        prog="python -m app.batch", description="Parse addresses from large CSV/TSV files."
+    )
+    parser.add_argument("input", help="input CSV/TSV file path")
+    parser.add_argument("-o", "--output", help="output file path (defaults to stdout)")
+    parser.add_argument(
+        "-w", "--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="approximate chunk size in bytes"
+    )
+    parser.add_argument(
+        "-d", "--delimiter", default=",", help="column delimiter, use '\\t' for TSV files"
+    )
+    parser.add_argument("-c", "--column", type=int, default=0, help="address column index")
+    parser.add_argument("--header", action="store_true", help="skip first input line")
+    parser.add_argument("-g", "--gazetteer", help="street names gazetteer file path")
+    parser.add_argument("--country", help="country code of all addresses (skips detection)")
+    parser.add_argument(
+        "--rules",
+        default=get_settings().RULES_PATH,
+        help="parsing rules data file path (defaults to RULES_PATH setting or built-in rules)",
+    )
+    parser.add_argument("--shared-cache", help="shared parsing results cache file to prewarm")
+    parser.add_argument(
+        "--shared-cache-size",
+        type=int,
+        default=DEFAULT_SHARED_CACHE_SIZE,
+        help="maximum number of shared cache entries",
+    )
+    args = parser.parse_args(argv)
+    delimiter = "\t" if args.delimiter == "\\t" else args.delimiter
+
+    started = time.perf_counter()
+    if args.output:
+        with open(args.output, "wb") as output:
+            total, failed = run(
+                args.input, output, args.workers, args.chunk_size, delimiter, args.column,
+                args.header, args.gazetteer, args.country, args.shared_cache,
+                args.shared_cache_size, args.rules,
+            )
+    else:
+        total, failed = run(
+            args.input, sys.stdout.buffer, args.workers, args.chunk_size, delimiter, args.column,
+            args.header, args.gazetteer, args.country, args.shared_cache, args.shared_cache_size,
+            args.rules,
+        )
+        sys.stdout.flush()
+    elapsed = time.perf_counter() - started
+    print(
+        f"parsed {total} addresses ({failed} failed) in {elapsed:.2f}s: "
+        f"{total / elapsed if elapsed else 0:.0f} addresses/s",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,21 +7,20 @@ Description:
     *pyaddress* application setup and configuration.
 
 """
-import logging.config
-import pathlib
+import functools
+import logging
 
 from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.router import root_router
+from app.logs import AccessLogMiddleware, configure_logging
+from app.metrics import enable_metrics, start_metrics_exporter, stop_metrics_exporter
+from app.services.address import close_address_coalescer, load_gazetteer
+from app.services.ruleset import load_rules, start_rules_reloader, stop_rules_reloader
 from app.settings import get_settings, initialize_settings
 
 
-logger_conf = pathlib.Path(__file__).parent / "logging.conf"
 logger = logging.getLogger(name="app")
-if not pathlib.Path.exists(logger_conf):
-    raise FileNotFoundError(f"Missing logger configuration file: {logger_conf}.")
-logging.config.fileConfig(logger_conf)
 
 
 tags_metadata = [
@@ -32,8 +31,31 @@ tags_metadata = [
 ]
 
 
+def setup_logging() -> None:
+    """Configure non-blocking logging pipeline from settings (deferred from import time to
+    application creation, so importing the module stays side effect free)."""
+    settings = get_settings()
+    configure_logging(
+        level=settings.LOG_LEVEL,
+        json_format=settings.LOG_JSON,
+        queue_size=settings.LOG_QUEUE_SIZE,
+    )
+
+
+def setup_access_log(application: FastAPI) -> None:
+    """Configure sampled requests logging."""
+    settings = get_settings()
+    application.add_middleware(
+        AccessLogMiddleware,
+        sample_rate=settings.ACCESS_LOG_SAMPLE_RATE,
+        slow_ms=settings.ACCESS_LOG_SLOW_MS,
+    )
+
+
 def setup_cors(application: FastAPI) -> None:
     """Configure CORS policies"""
+    from fastapi.middleware.cors import CORSMiddleware  # pylint: disable=import-outside-toplevel
+
     settings = get_settings()
     application.add_middleware(
         CORSMiddleware,
@@ -47,6 +69,7 @@ def setup_cors(application: FastAPI) -> None:
 def create_application(version: str = "CURRENT") -> FastAPI:
     """Create application object and configure its services."""
     initialize_settings()
+    setup_logging()
     settings = get_settings()
     application = FastAPI(
         title="pyaddress service",
@@ -57,4 +80,16 @@ def create_application(version: str = "CURRENT") -> FastAPI:
     )
     application.include_router(router=root_router)
     setup_cors(application=application)
+    setup_access_log(application=application)
+    enable_metrics(settings.METRICS_ENABLED)
+    load_gazetteer(settings.GAZETTEER_PATH)
+    load_rules(settings.RULES_PATH)
+    # started in every worker process, threads do not survive forking
+    application.add_event_handler("startup", start_rules_reloader)
+    application.add_event_handler("shutdown", stop_rules_reloader)
+    application.add_event_handler("shutdown", close_address_coalescer)
+    application.add_event_handler(
+        "startup", functools.partial(start_metrics_exporter, settings.METRICS_EXPORT_INTERVAL)
+    )
+    application.add_event_handler("shutdown", stop_metrics_exporter)
     return application
@@ -0,0 +1,312 @@
+"""
+Title: logs.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    *pyaddress* non-blocking logging pipeline.
+
+    Loggers only put records onto a bounded in-memory queue, a background writer thread formats
+    them and writes them to the output stream in batches (one write and flush per batch), so
+    request handling never waits for terminal or pipe I/O. Records logged when the queue is full
+    are dropped and counted instead of blocking.
+
+    Writer thread does not survive `fork`, so it is restarted in child processes (e.g. workers of
+    `app.server`), which get their own queue.
+
+    `AccessLogMiddleware` logs requests into "app.access" logger: all failed (4xx and 5xx) and slow
+    ones and every N-th successful one.
+
+"""
+import atexit
+import itertools
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from typing import IO, Any, Callable, Dict, Optional
+
+
+ACCESS_LOGGER = "app.access"
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+DEFAULT_MAX_BATCH = 512
+
+# attributes of every log record, anything else was passed in `extra` (uvicorn passes colored
+# message copy, which is left out)
+_RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {
+    "message", "asctime", "color_message"
+}
+_STOP = object()
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single line JSON objects including fields passed in `extra`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        document: Dict[str, Any] = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                document[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            document["exception"] = record.exc_text
+        return json.dumps(document, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.Handler):
+    """Puts records onto queue without ever blocking, records which do not fit are dropped."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__()
+        self.queue = log_queue
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Return record copy safe to be formatted later in writer thread: message arguments and
+        exception (which may change or go away) are rendered, formatting is left to writer."""
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except queue.Full:
+            self.dropped += 1
+        except Exception:  # pylint: disable=broad-except
+            self.handleError(record)
+
+
+class LogWriter:
+    """Background thread writing queued records to stream in batches."""
+
+    def __init__(
+            self,
+            log_queue: queue.Queue,
+            formatter: logging.Formatter,
+            stream: Optional[IO[str]] = None,
+            max_batch: int = DEFAULT_MAX_BATCH,
+    ):
+        """
+        Args:
+
+            log_queue: Queue of records to write.
+            formatter: Records formatter.
+            stream: Output stream (defaults to standard output at the time of writing).
+            max_batch: Maximum number of records written at once.
+
+        """
+        self.queue = log_queue
+        self.formatter = formatter
+        self.stream = stream
+        self.max_batch = max_batch
+        # held while writing, so that process never forks in the middle of a write
+        self.lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start writer thread."""
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Write all queued records and stop writer thread."""
+        if self._thread is None:
+            return
+        self.queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        get, get_nowait = self.queue.get, self.queue.get_nowait
+        stopped = False
+        while not stopped:
+            batch = [get()]
+            try:
+                while len(batch) < self.max_batch:
+                    batch.append(get_nowait())
+            except queue.Empty:
+                pass
+            lines = []
+            for record in batch:
+                if record is _STOP:
+                    stopped = True
+                    continue
+                try:
+                    lines.append(self.formatter.format(record))
+                except Exception:  # pylint: disable=broad-except
+                    lines.append(f"unformattable log record: {record!r}")
+            if lines:
+                self._write("\n".join(lines) + "\n")
+
+    def _write(self, text: str) -> None:
+        with self.lock:
+            stream = self.stream or sys.stdout
+            try:
+                stream.write(text)
+                stream.flush()
+            except (OSError, ValueError):  # closed or broken stream, nothing to report to
+                pass
+
+
+_WRITER: Optional[LogWriter] = None
+_HANDLER: Optional[DroppingQueueHandler] = None
+_HOOKS_REGISTERED = False
+
+
+def _before_fork() -> None:
+    if _WRITER is not None:
+        _WRITER.lock.acquire()  # pylint: disable=consider-using-with
+
+
+def _after_fork_in_parent() -> None:
+    if _WRITER is not None:
+        _WRITER.lock.release()
+
+
+def _after_fork_in_child() -> None:
+    global _WRITER  # pylint: disable=global-statement
+    if _WRITER is None:
+        return
+    # parent's queue may be left locked by its threads, child starts with a fresh one
+    log_queue: queue.Queue = queue.Queue(maxsize=_WRITER.queue.maxsize)
+    _WRITER = LogWriter(log_queue, _WRITER.formatter, _WRITER.stream, _WRITER.max_batch)
+    _HANDLER.queue = log_queue
+    _HANDLER.dropped = 0
+    _WRITER.start()
+
+
+def configure_logging(
+        level: str = "INFO",
+        json_format: bool = False,
+        queue_size: int = 10000,
+        stream: Optional[IO[str]] = None,
+) -> DroppingQueueHandler:
+    """Route all logging through the non-blocking pipeline, replacing root logger handlers
+    (including pipeline configured before).
+
+    Args:
+        level: Root logger level name.
+        json_format: Whether to write records as JSON lines instead of plain text.
+        queue_size: Maximum number of queued records, further ones are dropped.
+        stream: Output stream (defaults to standard output).
+
+    Returns:
+        Queue handler attached to root logger (its `dropped` attribute counts dropped records).
+
+    """
+    global _WRITER, _HANDLER, _HOOKS_REGISTERED  # pylint: disable=global-statement
+    shutdown_logging()
+    formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    log_queue: queue.Queue = queue.Queue(maxsize=max(queue_size, 0))
+    _WRITER = LogWriter(log_queue, formatter, stream)
+    _HANDLER = DroppingQueueHandler(log_queue)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_HANDLER)
+    root.setLevel(level.upper())
+    for name in ("uvicorn", "uvicorn.error", "app"):
+        # uvicorn attaches its own stream handlers, its records go through the pipeline instead
+        logger = logging.getLogger(name)
+        logger.handlers.clear()
+        logger.propagate = True
+        logger.disabled = False
+    # requests are logged (and sampled) by `AccessLogMiddleware`
+    logging.getLogger("uvicorn.access").disabled = True
+
+    if not _HOOKS_REGISTERED:
+        os.register_at_fork(
+            before=_before_fork,
+            after_in_parent=_after_fork_in_parent,
+            after_in_child=_after_fork_in_child,
+        )
+        atexit.register(shutdown_logging)
+        _HOOKS_REGISTERED = True
+    _WRITER.start()
+    return _HANDLER
+
+
+def shutdown_logging() -> None:
+    """Write queued records and stop the pipeline writer thread (if it was configured)."""
+    global _WRITER  # pylint: disable=global-statement
+    if _WRITER is not None:
+        _WRITER.stop()
+        _WRITER = None
+
+
+class AccessLogMiddleware:
+    """ASGI middleware logging requests: failed and slow ones always, successful ones sampled."""
+
+    def __init__(self, app: Callable, sample_rate: int = 1, slow_ms: float = 1000.0):
+        """
+        Args:
+
+            app: Wrapped ASGI application.
+            sample_rate: Log 1 in `sample_rate` successful requests, 0 logs none of them.
+            slow_ms: Requests taking longer than this (in milliseconds) are always logged.
+
+        """
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self._successes = itertools.count()
+        self._logger = logging.getLogger(ACCESS_LOGGER)
+
+    def _sampled(self, status: int, duration_ms: float) -> bool:
+        if status >= 400 or duration_ms >= self.slow_ms:
+            return True
+        return self.sample_rate > 0 and next(self._successes) % self.sample_rate == 0
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or not self._logger.isEnabledFor(logging.INFO):
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500  # reported if application fails before responding
+
+        async def send_with_status(message: Dict) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            if self._sampled(status, duration_ms):
+                self._log(scope, status, duration_ms)
+
+    def _log(self, scope: Dict, status: int, duration_ms: float) -> None:
+        client = scope.get("client")
+        client = f"{client[0]}:{client[1]}" if client else "-"
+        # some servers pass raw request target, query string included, as raw path
+        path = scope.get("raw_path", b"").split(b"?", 1)[0].decode("latin-1") or scope["path"]
+        query = scope.get("query_string", b"").decode("latin-1")
+        if query:
+            path = f"{path}?{query}"
+        self._logger.info(
+            '%s - "%s %s" %d %.1fms', client, scope["method"], path, status, duration_ms,
+            extra={
+                "client": client,
+                "method": scope["method"],
+                "path": path,
+                "status": status,
+                "duration_ms": round(duration_ms, 3),
+            },
+        )
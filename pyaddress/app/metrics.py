@@ -0,0 +1,414 @@
+"""
+Title: metrics.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Lightweight in-process metrics (counters, histograms and callback gauges) rendered in
+    Prometheus text exposition format.
+
+    Instrumentation hooks check `REGISTRY.enabled` before taking any timing, so disabled metrics
+    cost a single attribute lookup per hook.
+
+    Metrics are collected per process. When application runs in many worker processes (see
+    `app.server`), every worker periodically writes snapshot of its metrics into shared metrics
+    directory and scrapes render metrics merged from all snapshots: counters and histograms are
+    summed (including workers which already exited), gauges are reported per worker with `pid`
+    label.
+
+"""
+import bisect
+import fcntl
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Monotonically increasing counter with optional labels."""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        """Increase counter of given label values."""
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        """Return current counter value of given label values."""
+        return self._values.get(labelvalues, 0)
+
+    def snapshot(self) -> List[Any]:
+        """Return JSON serializable [label values, value] samples."""
+        with self._lock:
+            return [[list(labelvalues), value] for labelvalues, value in self._values.items()]
+
+    def merge(self, samples: List[Any]) -> None:
+        """Add samples of another process' snapshot."""
+        for labelvalues, value in samples:
+            self.inc(*labelvalues, amount=value)
+
+    def collect(self) -> Iterable[str]:
+        """Yield metric samples in Prometheus text format."""
+        with self._lock:
+            values = sorted(self._values.items())
+        for labelvalues, value in values:
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield f"{self.name}{labels} {_format_value(value)}"
+
+
+class Histogram:
+    """Histogram of observed values with fixed buckets and optional labels."""
+
+    metric_type = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label values: bucket counts (last one is +Inf), sum of observed values
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        """Record observed value for given label values."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            if entry is None:
+                entry = self._values[labelvalues] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    def count(self, *labelvalues: str) -> int:
+        """Return number of observations for given label values."""
+        entry = self._values.get(labelvalues)
+        return sum(entry[0]) if entry else 0
+
+    def snapshot(self) -> List[Any]:
+        """Return JSON serializable [label values, bucket counts, sum] samples."""
+        with self._lock:
+            return [
+                [list(labelvalues), list(counts), total[0]]
+                for labelvalues, (counts, total) in self._values.items()
+            ]
+
+    def merge(self, samples: List[Any]) -> None:
+        """Add samples of another process' snapshot (recorded with the same buckets)."""
+        with self._lock:
+            for labelvalues, counts, total in samples:
+                entry = self._values.get(tuple(labelvalues))
+                if entry is None:
+                    entry = self._values[tuple(labelvalues)] = ([0] * len(counts), [0.0])
+                for index, count in enumerate(counts):
+                    entry[0][index] += count
+                entry[1][0] += total
+
+    def collect(self) -> Iterable[str]:
+        """Yield metric samples in Prometheus text format."""
+        with self._lock:
+            values = sorted(
+                (labelvalues, (list(counts), total[0]))
+                for labelvalues, (counts, total) in self._values.items()
+            )
+        for labelvalues, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labelnames, labelvalues, f'le="{le}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Gauge:
+    """Gauge which values are read from callback at collection time."""
+
+    metric_type = "gauge"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            callback: Callable[[], Dict[LabelValues, float]],
+            labelnames: Sequence[str] = (),
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def snapshot(self) -> List[Any]:
+        """Return JSON serializable [label values, value] samples."""
+        return [[list(labelvalues), value] for labelvalues, value in self.callback().items()]
+
+    def collect(self) -> Iterable[str]:
+        """Yield metric samples in Prometheus text format."""
+        for labelvalues, value in sorted(self.callback().items()):
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield f"{self.name}{labels} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    """Collection of metrics exposed together."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.directory: Optional[str] = None  # shared metrics directory of worker processes
+        self._metrics = {}
+
+    def register(self, metric):
+        """Register metric (replacing previously registered metric of the same name)."""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[object]:
+        """Return registered metric of given name."""
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render all registered metrics in Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return JSON serializable snapshot of all registered metrics."""
+        return {
+            name: {
+                "type": metric.metric_type,
+                "documentation": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                "buckets": list(getattr(metric, "buckets", ())),
+                "samples": metric.snapshot(),
+            }
+            for name, metric in self._metrics.items()
+        }
+
+
+_EXITED_SNAPSHOT = "exited.json"  # merged counters and histograms of exited processes
+_LOCK_FILE = ".lock"
+
+
+def _snapshot_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"{pid}.json")
+
+
+def _write_json(path: str, document: Any) -> None:
+    # written aside and renamed, so that readers never see partially written snapshot
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump(document, file)
+    os.replace(temporary, path)
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _merge(registry: MetricsRegistry, snapshot: Dict[str, Any], pid: Optional[str]) -> None:
+    """Merge process snapshot into registry, gauges are kept only if process pid is given."""
+    for name, data in snapshot.items():
+        if data["type"] == "gauge" and pid is None:
+            continue
+        metric = registry.get(name)
+        if metric is None:
+            if data["type"] == "counter":
+                metric = Counter(name, data["documentation"], data["labelnames"])
+            elif data["type"] == "histogram":
+                metric = Histogram(
+                    name, data["documentation"], data["labelnames"], data["buckets"]
+                )
+            else:
+                values: Dict[LabelValues, float] = {}
+                metric = Gauge(
+                    name,
+                    data["documentation"],
+                    callback=lambda values=values: values,
+                    labelnames=data["labelnames"] + ["pid"],
+                )
+            registry.register(metric)
+        if isinstance(metric, Gauge):
+            metric.callback().update(
+                (tuple(labelvalues) + (pid,), value) for labelvalues, value in data["samples"]
+            )
+        else:
+            metric.merge(data["samples"])
+
+
+def write_snapshot(
+        directory: str, registry: Optional[MetricsRegistry] = None, pid: Optional[int] = None
+) -> None:
+    """Write metrics snapshot of this process into shared metrics directory."""
+    registry = REGISTRY if registry is None else registry
+    _write_json(_snapshot_path(directory, pid or os.getpid()), registry.snapshot())
+
+
+def render_directory(directory: str) -> str:
+    """Render metrics merged from all snapshots in shared metrics directory."""
+    merged = MetricsRegistry()
+    with open(os.path.join(directory, _LOCK_FILE), "a", encoding="utf-8") as lock:
+        fcntl.flock(lock, fcntl.LOCK_SH)  # process snapshots are not folded while reading
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(".json"):
+                continue
+            snapshot = _read_json(os.path.join(directory, name))
+            if snapshot is not None:
+                pid = None if name == _EXITED_SNAPSHOT else name[:-len(".json")]
+                _merge(merged, snapshot, pid)
+    return merged.render()
+
+
+def collect_exited(directory: str, pid: int) -> None:
+    """Fold snapshot of exited process into snapshot of all exited processes, so that counters
+    never go back and number of snapshot files stays bounded. Must be called before the pid is
+    reused, i.e. by parent process right after reaping its child."""
+    path = _snapshot_path(directory, pid)
+    snapshot = _read_json(path)
+    if snapshot is None:
+        return
+    with open(os.path.join(directory, _LOCK_FILE), "a", encoding="utf-8") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        exited = MetricsRegistry()
+        _merge(exited, _read_json(os.path.join(directory, _EXITED_SNAPSHOT)) or {}, None)
+        _merge(exited, snapshot, None)
+        _write_json(os.path.join(directory, _EXITED_SNAPSHOT), exited.snapshot())
+        os.unlink(path)
+
+
+REGISTRY = MetricsRegistry()
+
+PARSE_STAGE_SECONDS = REGISTRY.register(
+    Histogram(
+        "pyaddress_parse_stage_seconds",
+        "Address parsing stage latency in seconds.",
+        labelnames=("stage",),
+    )
+)
+PARSE_FAILURES = REGISTRY.register(
+    Counter(
+        "pyaddress_parse_failures_total",
+        "Unsupported addresses by failure reason.",
+        labelnames=("reason",),
+    )
+)
+REQUESTS = REGISTRY.register(
+    Counter(
+        "pyaddress_requests_total",
+        "Handled API requests by endpoint and outcome.",
+        labelnames=("endpoint", "outcome"),
+    )
+)
+REQUEST_SECONDS = REGISTRY.register(
+    Histogram(
+        "pyaddress_request_seconds",
+        "API endpoint handler latency in seconds.",
+        labelnames=("endpoint",),
+    )
+)
+
+
+def enable_metrics(enabled: bool = True) -> None:
+    """Turn instrumentation hooks on or off."""
+    REGISTRY.enabled = enabled
+
+
+def render_metrics() -> str:
+    """Render metrics of this process, or of all worker processes if they share metrics
+    directory."""
+    if REGISTRY.directory is None:
+        return REGISTRY.render()
+    write_snapshot(REGISTRY.directory)
+    return render_directory(REGISTRY.directory)
+
+
+DEFAULT_EXPORT_INTERVAL = 1.0
+
+_EXPORTER: Optional[Tuple[threading.Thread, threading.Event]] = None
+
+
+def _export(directory: str, interval: float, stopped: threading.Event) -> None:
+    while not stopped.wait(interval):
+        try:
+            write_snapshot(directory)
+        except OSError:  # e.g. directory removed when server is shutting down
+            pass
+
+
+def start_metrics_exporter(interval: float = DEFAULT_EXPORT_INTERVAL) -> None:
+    """Start writing metrics snapshots of this process into shared metrics directory every
+    `interval` seconds (if metrics are enabled and directory is set)."""
+    global _EXPORTER  # pylint: disable=global-statement
+    if not REGISTRY.enabled or REGISTRY.directory is None or _EXPORTER is not None:
+        return
+    stopped = threading.Event()
+    thread = threading.Thread(
+        target=_export,
+        args=(REGISTRY.directory, interval, stopped),
+        name="metrics-export",
+        daemon=True,
+    )
+    thread.start()
+    _EXPORTER = thread, stopped
+
+
+def stop_metrics_exporter() -> None:
+    """Stop metrics exporter and write the final snapshot of this process."""
+    global _EXPORTER  # pylint: disable=global-statement
+    if _EXPORTER is None:
+        return
+    thread, stopped = _EXPORTER
+    _EXPORTER = None
+    stopped.set()
+    thread.join()
+    try:
+        write_snapshot(REGISTRY.directory)
+    except OSError:
+        pass
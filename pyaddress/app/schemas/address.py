@@ -7,6 +7,8 @@ Description:
     Address representation schema.
 
 """
+import json
+
 from pydantic import BaseModel, Field
 
 
@@ -20,3 +22,14 @@ class Address(BaseModel):
         """Pydantic related configuration."""
 
         populate_by_name = True
+
+
+def address_json(street: str, house_number: str) -> bytes:
+    """Serialize address components exactly as API serializes `Address` instance, without
+    building and validating the model.
+    """
+    return json.dumps(
+        {"street": street, "housenumber": house_number},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
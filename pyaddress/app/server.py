@@ -0,0 +1,230 @@
+"""
+Title: server.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    *pyaddress* production server launcher.
+
+    Application is created (settings, gazetteer, compiled rule packs) and warmed up once in the
+    parent process, which then binds listening socket and forks uvicorn worker processes. Workers
+    share preloaded memory copy-on-write. Parent supervises workers and replaces the ones which
+    exit, e.g. after serving `SERVER_MAX_REQUESTS` requests. SIGHUP is forwarded to workers,
+    which reload rules data file (see `app.services.ruleset`).
+
+    With `METRICS_ENABLED` and many workers, workers share temporary metrics directory, so that
+    `/metrics` scrapes report metrics of all workers whichever one answers them.
+
+    When `SIDECAR_PATH` (or `SIDECAR_PORT`) is set, workers serve binary protocol sidecar
+    connections (see `app.sidecar`) in the same event loop as HTTP requests.
+
+    Usage:
+
+        SERVER_WORKERS=4 python -m app.server
+
+"""
+import asyncio
+import gc
+import logging
+import os
+import random
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import uvicorn
+
+from app.logs import shutdown_logging
+from app.metrics import REGISTRY, collect_exited, enable_metrics
+from app.services.address import AddressParser, get_rule_pack
+from app.services.rules import RULE_PACKS
+from app.settings import Settings, get_settings
+
+
+logger = logging.getLogger(name="app")
+
+# parsed once before forking workers, so that lazily initialized parser state is shared
+WARM_UP_ADDRESSES = (
+    "Winterallee 3",
+    "Auf der Vogelwiese 23 b",
+    "4, rue de la revolution",
+    "Calle 39 No 1540",
+    "ul. Bitwy Warszawskiej 1920 nr 43/45",
+    "5. května 798/62",
+    "200 Broadway Av",
+    "Ave #12",
+)
+
+
+def warm_up() -> None:
+    """Compile all rule packs and run warm-up parses. Parses are not instrumented, workers would
+    inherit (and report) their metrics otherwise."""
+    enabled = REGISTRY.enabled
+    enable_metrics(False)
+    try:
+        for country in RULE_PACKS:
+            get_rule_pack(country)
+        for address in WARM_UP_ADDRESSES:
+            AddressParser.parse_result(address)
+    finally:
+        enable_metrics(enabled)
+
+
+def bind_socket(settings: Settings) -> socket.socket:
+    """Create listening socket shared by all workers."""
+    sock = socket.socket(socket.AF_INET6 if ":" in settings.SERVER_HOST else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((settings.SERVER_HOST, settings.SERVER_PORT))
+    sock.listen(settings.SERVER_BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+
+def bind_sidecar(settings: Settings) -> Optional[socket.socket]:
+    """Create sidecar listening socket shared by all workers, None if sidecar is disabled."""
+    if not settings.SIDECAR_PATH and not settings.SIDECAR_PORT:
+        return None
+    from app.sidecar.server import bind_sidecar_socket  # pylint: disable=import-outside-toplevel
+
+    return bind_sidecar_socket(
+        settings.SIDECAR_PATH,
+        settings.SIDECAR_HOST,
+        settings.SIDECAR_PORT,
+        settings.SERVER_BACKLOG,
+    )
+
+
+async def _serve_with_sidecar(
+        server: uvicorn.Server, sock: socket.socket, sidecar_sock: socket.socket
+) -> None:
+    from app.sidecar.server import start_sidecar  # pylint: disable=import-outside-toplevel
+
+    sidecar = await start_sidecar(sidecar_sock)
+    try:
+        await server.serve(sockets=[sock])
+    finally:
+        sidecar.close()
+        await sidecar.wait_closed()
+
+
+def _serve(
+        app, sock: socket.socket, settings: Settings, sidecar_sock: Optional[socket.socket] = None
+) -> None:
+    """Worker process body: serve requests until shut down or requests limit is reached."""
+    max_requests = None
+    if settings.SERVER_MAX_REQUESTS > 0:
+        # jitter keeps workers started together from being recycled all at once
+        max_requests = settings.SERVER_MAX_REQUESTS + random.randint(
+            0, settings.SERVER_MAX_REQUESTS_JITTER
+        )
+    config = uvicorn.Config(
+        app,
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEP_ALIVE,
+        limit_concurrency=settings.SERVER_LIMIT_CONCURRENCY,
+        limit_max_requests=max_requests,
+        log_config=None,  # configured by application factory already
+        access_log=False,  # requests are logged (and sampled) by application
+        server_header=False,
+    )
+    server = uvicorn.Server(config)
+    if sidecar_sock is None:
+        server.run(sockets=[sock])
+        return
+    config.setup_event_loop()
+    asyncio.run(_serve_with_sidecar(server, sock, sidecar_sock))
+
+
+def _spawn(
+        app, sock: socket.socket, settings: Settings, sidecar_sock: Optional[socket.socket]
+) -> int:
+    """Fork worker process and return its pid."""
+    pid = os.fork()
+    if pid:
+        return pid
+    status = 0
+    try:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        # rules reloader takes SIGHUP over once application starts
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        random.seed()
+        _serve(app, sock, settings, sidecar_sock)
+    except BaseException:  # pylint: disable=broad-except
+        logger.exception("Worker %d failed.", os.getpid())
+        status = 1
+    finally:
+        shutdown_logging()  # exiting without interpreter cleanup, queued records are written now
+        os._exit(status)  # pylint: disable=protected-access
+
+
+def run() -> None:
+    """Preload application, fork workers and supervise them until terminated."""
+    started = time.perf_counter()
+    from app.main import app  # pylint: disable=import-outside-toplevel
+
+    settings = get_settings()
+    warm_up()
+    sock = bind_socket(settings)
+    sidecar_sock = bind_sidecar(settings)
+    if REGISTRY.enabled and settings.SERVER_WORKERS > 1:
+        REGISTRY.directory = tempfile.mkdtemp(prefix="pyaddress-metrics-")
+    # objects created so far are never freed, moving them out of garbage collector's reach keeps
+    # collections in workers from writing to (and so copying) pages shared with parent
+    gc.freeze()
+
+    workers: Dict[int, float] = {}
+    stopping: List[bool] = []
+
+    def forward(signum, _frame) -> None:
+        for pid in workers:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def stop(signum, frame) -> None:
+        stopping.append(True)
+        forward(signum, frame)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGHUP, forward)
+    for _ in range(max(1, settings.SERVER_WORKERS)):
+        workers[_spawn(app, sock, settings, sidecar_sock)] = time.monotonic()
+    logger.info(
+        "Started %d workers on %s:%d in %.2fs.",
+        len(workers), settings.SERVER_HOST, settings.SERVER_PORT, time.perf_counter() - started,
+    )
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        spawned = workers.pop(pid, None)
+        if REGISTRY.directory is not None:
+            collect_exited(REGISTRY.directory, pid)
+        if spawned is None or stopping:
+            continue
+        if os.waitstatus_to_exitcode(status) != 0 and time.monotonic() - spawned < 1.0:
+            # failing straight after start, respawning would only loop
+            logger.error("Worker %d failed on startup, shutting down.", pid)
+            stop(signal.SIGTERM, None)
+            continue
+        workers[_spawn(app, sock, settings, sidecar_sock)] = time.monotonic()
+    sock.close()
+    if sidecar_sock is not None:
+        sidecar_sock.close()
+        if settings.SIDECAR_PATH:
+            os.unlink(settings.SIDECAR_PATH)
+    if REGISTRY.directory is not None:
+        shutil.rmtree(REGISTRY.directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -7,48 +7,500 @@ Description:
     Address management service for processing multinational addresses (e.g. extracting address
     components like street or number).
 
+    Module is importable without web stack (pydantic, settings), so that parser can be used as a
+    library and cold start stays short. Schemas and settings are imported on first use.
+
 """
+import array
 import enum
-from typing import Dict, Generator, List
+import hashlib
+import importlib
+import time
+from typing import TYPE_CHECKING, Dict, Generator, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.metrics import PARSE_FAILURES, PARSE_STAGE_SECONDS, REGISTRY, Gauge
+from app.services.cache import LRUCache, SharedCache
+from app.services.gazetteer import Gazetteer
+from app.services.normalization import DEFAULT_EXPANDER, AbbreviationExpander, normalize_address
+from app.services.rules import (
+    COUNTRY_KEYWORDS,
+    COUNTRY_SUFFIXES,
+    RULE_PACKS,
+    RULES_VERSION,
+    CountrySuffixes,
+    detect_country,
+)
 
-from app.schemas.address import Address
+
+if TYPE_CHECKING:
+    from app.schemas.address import Address
+    from app.services.coalescer import Coalescer
 
 
 class AddressServiceError(Exception):
     """Address service base exception class."""
 
 
-class TokenType(str, enum.Enum):
+class TokenType(enum.IntEnum):
     """Token type representation."""
 
-    ALPHA = "ALPHA"  # possible street name or part of the street name
-    NUM = "NUM"  # possible housenumber
+    ALPHA = 0  # possible street name or part of the street name
+    NUM = 1  # possible housenumber
+
 
+class ParseStatus(enum.IntEnum):
+    """Address parsing outcome code."""
 
-class Token:
-    """Represent single chunk of input address."""
+    OK = 0
+    UNSUPPORTED_TOKEN = 1  # tagging failed, some token is neither street nor number like
+    UNSUPPORTED_PATTERN = 2  # tagged address does not match any parse rule
 
-    def __init__(self, token_type: TokenType, value: str):
-        self.token_type = token_type
-        self.value = value
+
+class Token(NamedTuple):
+    """Represent single chunk of input address. Tokens are immutable and hashable."""
+
+    token_type: TokenType
+    value: str
 
     def __str__(self) -> str:
         """Return token string representation."""
-        return f'Token({self.token_type.value}, "{self.value}")'
+        return f'Token({self.token_type.name}, "{self.value}")'
+
+
+class ParseRule(NamedTuple):
+    """Chunked address pattern and positions of address components within it. Chunks which are
+    neither street nor house number are dropped, the rule only matches if they are house number
+    markers (see `HOUSE_NUMBER_MARKERS`)."""
+
+    pattern: Tuple[TokenType, ...]
+    street: Tuple[int, ...]
+    house_number: Tuple[int, ...]
+
+
+PARSE_RULES = (
+    ParseRule(pattern=(TokenType.ALPHA, TokenType.NUM), street=(0,), house_number=(1,)),
+    ParseRule(pattern=(TokenType.NUM, TokenType.ALPHA), street=(1,), house_number=(0,)),
+    ParseRule(
+        pattern=(TokenType.ALPHA, TokenType.NUM, TokenType.ALPHA),
+        street=(0,),
+        house_number=(1, 2),
+    ),
+    ParseRule(
+        pattern=(TokenType.ALPHA, TokenType.NUM, TokenType.NUM),
+        street=(0, 1),
+        house_number=(2,),
+    ),
+    ParseRule(
+        pattern=(TokenType.ALPHA, TokenType.NUM, TokenType.ALPHA, TokenType.NUM),
+        street=(0, 1),
+        house_number=(2, 3),
+    ),
+)
+
+
+def _positions_to_slice(positions: Tuple[int, ...], pattern_length: int) -> slice:
+    """Convert contiguous chunk positions into a slice."""
+    if not positions:
+        raise ValueError("address component must map to at least one chunk")
+    start, stop = positions[0], positions[-1] + 1
+    if tuple(range(start, stop)) != positions or stop > pattern_length:
+        raise ValueError(f"address component positions must be contiguous: {positions}")
+    return slice(start, stop)
+
+
+CompiledRules = Dict[Tuple[TokenType, ...], Tuple[slice, slice]]
+
+
+def compile_rules(rules: Iterable[ParseRule]) -> CompiledRules:
+    """Compile parse rules into a lookup table keyed by chunked address signature.
+
+    Rules are matched in the given order, so when two rules share the same pattern the first one
+    wins.
+
+    Args:
+        rules: Parse rules to compile.
+
+    Raise:
+        ValueError: If rule positions are not contiguous or exceed the pattern length, or if
+            rule pattern can never match chunked address (adjacent street words always form
+            a single chunk).
+
+    Returns:
+        Python dictionary mapping chunk type signatures onto street and house_number slices.
+
+    """
+    compiled = {}
+    for rule in rules:
+        pattern = tuple(rule.pattern)
+        if any(
+                first is second is TokenType.ALPHA for first, second in zip(pattern, pattern[1:])
+        ):
+            raise ValueError(f"pattern with adjacent ALPHA chunks never matches: {pattern}")
+        if pattern in compiled:
+            continue
+        compiled[pattern] = (
+            _positions_to_slice(tuple(rule.street), len(pattern)),
+            _positions_to_slice(tuple(rule.house_number), len(pattern)),
+        )
+    return compiled
+
+
+COMPILED_RULES = compile_rules(PARSE_RULES)
+
+_RULE_PACK_TABLES: Dict[str, CompiledRules] = {}
+
+
+def get_rule_pack(country: str) -> Optional[CompiledRules]:
+    """Return compiled parse rules of country rule pack. Rule pack module is imported and
+    compiled on first use.
+
+    Args:
+        country: Upper case country code.
+
+    Returns:
+        Compiled rules lookup table or None if there is no rule pack for the country.
+
+    """
+    table = _RULE_PACK_TABLES.get(country)
+    if table is None:
+        module = RULE_PACKS.get(country)
+        if module is None:
+            return None
+        table = _RULE_PACK_TABLES[country] = compile_rules(importlib.import_module(module).RULES)
+    return table
+
+
+class RuleSet(NamedTuple):
+    """Immutable snapshot of parsing rules and dictionaries they use. Parser reads the active
+    snapshot (`AddressParser.rules`) once per address, so swapping it for a new one needs no
+    locking and every address is parsed with a single consistent rule set."""
+
+    version: str
+    rules: CompiledRules  # generic rules, fallback of rule packs
+    rule_packs: Optional[Dict[str, CompiledRules]]  # None compiles built-in packs lazily
+    country_keywords: Dict[str, str]
+    country_suffixes: CountrySuffixes
+    expander: AbbreviationExpander
+
+
+BUILTIN_RULES = RuleSet(
+    version=RULES_VERSION,
+    rules=COMPILED_RULES,
+    rule_packs=None,
+    country_keywords=COUNTRY_KEYWORDS,
+    country_suffixes=COUNTRY_SUFFIXES,
+    expander=DEFAULT_EXPANDER,
+)
+
+
+def _country_code(country: Optional[str]) -> Optional[str]:
+    """Return canonical country hint form (None for missing or blank hint)."""
+    if country is None:
+        return None
+    return country.strip().upper() or None
+
+
+class ParsedBatch(NamedTuple):
+    """Columnar result of parsing many addresses. All columns are parallel to parser input.
+
+    Street and house number are None for addresses whose status is not `ParseStatus.OK`. Use
+    `_asdict()` to feed results straight into dataframe constructors.
+    """
+
+    street: List[Optional[str]]
+    house_number: List[Optional[str]]
+    status: array.array  # unsigned char ParseStatus codes
+
+
+_FAILED_STAGES = {
+    ParseStatus.UNSUPPORTED_TOKEN: "scan",
+    ParseStatus.UNSUPPORTED_PATTERN: "match",
+}
+
+
+class ParseResult:
+    """Outcome of parsing single address, returned instead of raising for unsupported formats.
+
+    Failure details (stage, offending token, message) are derived lazily, so rejecting an
+    address costs no more than accepting it. Schema and JSON representations of successfully
+    parsed address are built on first use and kept, which makes results cheap to cache.
+    """
+
+    __slots__ = ("status", "street", "house_number", "address", "_model", "_json")
+
+    def __init__(
+            self,
+            status: ParseStatus,
+            street: Optional[str] = None,
+            house_number: Optional[str] = None,
+            address: str = "",
+    ):
+        """
+        Args:
+
+            status: Parsing outcome code.
+            street: Extracted street (None unless status is `ParseStatus.OK`).
+            house_number: Extracted house number (None unless status is `ParseStatus.OK`).
+            address: Normalized input address.
+
+        """
+        self.status = status
+        self.street = street
+        self.house_number = house_number
+        self.address = address
+        self._model = None
+        self._json = None
 
-    def __eq__(self, other):
-        if isinstance(other, Token):
-            return bool(self.token_type == other.token_type and self.value == other.value)
-        return False
+    def __repr__(self) -> str:
+        return (
+            f"ParseResult({self.status.name}, street={self.street!r}, "
+            f"house_number={self.house_number!r}, address={self.address!r})"
+        )
+
+    @property
+    def ok(self) -> bool:
+        """Whether address was parsed successfully."""
+        return self.status is ParseStatus.OK
+
+    @property
+    def stage(self) -> Optional[str]:
+        """Name of parsing stage which rejected the address (None on success)."""
+        return _FAILED_STAGES.get(self.status)
+
+    @property
+    def token(self) -> Optional[str]:
+        """First unsupported address word if address was rejected because of it."""
+        if self.status is not ParseStatus.UNSUPPORTED_TOKEN:
+            return None
+        for word in self.address.split():
+            if _tag_or_none([word]) is None:
+                return word
+        return None
+
+    @property
+    def message(self) -> Optional[str]:
+        """Human readable failure reason (None on success)."""
+        if self.ok:
+            return None
+        return f"unsupported address format: {self.address}"
+
+    def as_dict(self) -> Dict:
+        """Return address components Python dictionary with street and house_number."""
+        return {"street": self.street, "house_number": self.house_number}
+
+    def raise_for_status(self) -> None:
+        """Raise `AddressServiceError` if address format is not supported."""
+        if not self.ok:
+            raise AddressServiceError(self.message)
+
+    def model(self) -> "Address":
+        """Return address schema instance or raise if address format is not supported."""
+        if self._model is None:
+            self.raise_for_status()
+            self._model = _build_address(self.as_dict())
+        return self._model
+
+    def json(self) -> bytes:
+        """Return address JSON representation or raise if address format is not supported."""
+        if self._json is None:
+            self.raise_for_status()
+            from app.schemas.address import (  # pylint: disable=import-outside-toplevel
+                address_json,
+            )
+
+            self._json = address_json(self.street, self.house_number)
+        return self._json
+
+
+def _tag_or_none(tokenized_address: List[str]) -> Optional[List[Token]]:
+    """Tag normalized address tokens, return None instead of raising if any token is not
+    supported."""
+    tokens = []
+    for word in tokenized_address:
+        if word.isalpha():
+            token = Token(TokenType.ALPHA, word)
+        elif word.isnumeric():
+            token = Token(TokenType.NUM, word)
+        elif word.isalnum():
+            if word[0].isdigit() and word[-1].isalpha():
+                token = Token(TokenType.NUM, word)
+            elif word[0].isdigit() and word[-1].isdigit() and "/" in word:
+                token = Token(TokenType.NUM, word)
+            else:
+                return None
+        elif word[0].isdigit() and word[-1].isdigit() and "/" in word:
+            token = Token(TokenType.NUM, word)
+        else:
+            return None
+        tokens.append(token)
+    return tokens
+
+
+# enum member lookups go through enum metaclass, aliases keep them off the scanner hot loop
+_ALPHA = TokenType.ALPHA
+_NUM = TokenType.NUM
+
+
+class ScannedAddress(NamedTuple):
+    """Chunked address as parallel token types signature and token values."""
+
+    signature: Tuple[TokenType, ...]
+    values: List[str]
+
+
+def _scan_or_none(address: str) -> Optional[ScannedAddress]:
+    """Tokenize, tag and chunk normalized address in a single pass over its words.
+
+    Produces the same chunks as `AddressParser.chunk(AddressParser.tag(...))` pipeline without
+    building intermediate token lists or token objects. Returns None if any word is not
+    supported.
+    """
+    types = []
+    values = []
+    street_words = []
+    for word in address.split():
+        if word.isalpha():
+            street_words.append(word)
+            continue
+        if not word.isnumeric():
+            if not word[0].isdigit():
+                return None
+            if word.isalnum():
+                if not word[-1].isalpha():
+                    return None
+            elif not (word[-1].isdigit() and "/" in word):
+                return None
+        if street_words:
+            types.append(_ALPHA)
+            values.append(" ".join(street_words))
+            street_words = []
+        types.append(_NUM)
+        values.append(word)
+    if street_words:
+        types.append(_ALPHA)
+        values.append(" ".join(street_words))
+    return ScannedAddress(signature=tuple(types), values=values)
+
+
+# casefolded words marking house number, e.g. "nr 43/45" (they are not a part of it)
+HOUSE_NUMBER_MARKERS = frozenset({"nr", "no", "n", "num"})
+
+
+def _drops_only_markers(match: Tuple[slice, slice], values: List[str]) -> bool:
+    """Return whether chunks matched rule does not map onto address components are all house
+    number markers."""
+    street, house_number = match
+    if street.stop - street.start + house_number.stop - house_number.start == len(values):
+        return True
+    kept = set(range(street.start, street.stop)) | set(range(house_number.start, house_number.stop))
+    return all(
+        value.casefold() in HOUSE_NUMBER_MARKERS
+        for position, value in enumerate(values)
+        if position not in kept
+    )
+
+
+def _match(
+        scanned: ScannedAddress, country: Optional[str], rules: RuleSet
+) -> Optional[Tuple[slice, slice]]:
+    """Find street and house number slices of scanned address.
+
+    Rules of the hinted (or detected) country pack are tried first, generic rules are the
+    fallback.
+    """
+    if country is None:
+        country = detect_country(
+            (
+                word.casefold()
+                for token_type, value in zip(scanned.signature, scanned.values)
+                if token_type is TokenType.ALPHA
+                for word in value.split()
+            ),
+            rules.country_keywords,
+            rules.country_suffixes,
+        )
+    if country is not None:
+        if rules.rule_packs is None:
+            table = get_rule_pack(country)
+        else:
+            table = rules.rule_packs.get(country)
+        if table is not None:
+            match = table.get(scanned.signature)
+            if match is not None:
+                # e.g. "ul Prosta 5 lok 8" is not supported rather than missing "lok"
+                return match if _drops_only_markers(match, scanned.values) else None
+    match = rules.rules.get(scanned.signature)
+    if match is not None and not _drops_only_markers(match, scanned.values):
+        return None
+    return match
+
+
+def _observe_stage(stage: str, started: float) -> float:
+    """Record parsing stage latency and return its end time (next stage start time)."""
+    finished = time.perf_counter()
+    PARSE_STAGE_SECONDS.observe(finished - started, stage)
+    return finished
+
+
+def _house_number_or_none(address: str) -> Optional[str]:
+    """Return house number if normalized address text is one: number optionally followed by
+    single letter (e.g. "23 b") and optionally preceded by house number marker."""
+    scanned = _scan_or_none(address)
+    if scanned is None:
+        return None
+    signature, values = scanned
+    if (
+            len(signature) > 1
+            and signature[0] is TokenType.ALPHA
+            and values[0].casefold() in HOUSE_NUMBER_MARKERS
+    ):
+        signature, values = signature[1:], values[1:]
+    if signature == (TokenType.NUM,) or (
+            signature == (TokenType.NUM, TokenType.ALPHA) and len(values[1]) == 1
+    ):
+        return " ".join(values)
+    return None
+
+
+def _split_with_gazetteer(
+        address: str, gazetteer: Gazetteer, country: Optional[str] = None
+) -> Optional[Tuple[str, str]]:
+    """Split normalized address into known street name and house number.
+
+    The longest known street name being address prefix (or suffix) wins, provided the rest of
+    the address is a house number (see `_house_number_or_none`, e.g. "Prosta Warszawa 12" is
+    not split after "Prosta"). Street names known in other countries only are skipped when
+    country is given. Returns None if no known street name is found.
+    """
+    words = address.split()
+    keys = [word.casefold() for word in words]
+    for length in range(len(words) - 1, 0, -1):
+        for street, house_number in (
+                (slice(None, length), slice(length, None)),
+                (slice(len(words) - length, None), slice(None, len(words) - length)),
+        ):
+            countries = gazetteer.lookup_normalized(" ".join(keys[street]))
+            if countries is None:
+                continue
+            if country is not None and countries and country not in countries:
+                continue
+            number = _house_number_or_none(" ".join(words[house_number]))
+            if number is not None:
+                return " ".join(words[street]), number
+    return None
 
 
 class AddressParser:
 
     internal_punctuation = ".,"   # might want to extend this
+    gazetteer: Optional[Gazetteer] = None  # known street names used before pattern matching
+    rules: RuleSet = BUILTIN_RULES  # active rules snapshot, replaced as a whole when reloaded
 
     @staticmethod
     def normalize(address: str) -> str:
-        """Normalize processed address.
+        """Normalize processed address: fold Unicode compatibility forms, expand dotted
+        abbreviations (e.g. "Hauptstr." into "Hauptstrasse"), replace `internal_punctuation`
+        marks with spaces and collapse whitespace. Letter case is preserved.
 
         Args:
             address: Input address.
@@ -57,8 +509,9 @@ class AddressParser:
             Normalized address string.
 
         """
-        # return address.casefold()
-        return address
+        return normalize_address(
+            address, AddressParser.internal_punctuation, AddressParser.rules.expander
+        )
 
     @staticmethod
     def tokenize(address: str) -> List[str]:
@@ -77,7 +530,8 @@ class AddressParser:
     @staticmethod
     def tag(tokenized_address: List[str]) -> List[Token]:
         """Perform very simple tagging on address components. Assign token type to each token.
-        Skip punctuation marks tokens.
+        Tokens are normalized first, so `internal_punctuation` marks are handled the same way
+        as in `normalize` (e.g. "ul." is tagged as "ul").
 
         Notes:
             If time was not a root factor I would definitely investigate e.g. NLTK to try another
@@ -91,31 +545,25 @@ class AddressParser:
             List of tagged address components (tokens).
 
         """
-        tokens = []
-        for word in tokenized_address:
-            word = word.replace(".", "").replace(",", "")
-            if word.isalpha():
-                token = Token(TokenType.ALPHA, word)
-            elif word.isnumeric():
-                token = Token(TokenType.NUM, word)
-            elif word.isalnum():
-                if word[0].isdigit() and word[-1].isalpha():
-                    token = Token(TokenType.NUM, word)
-                elif word[0].isdigit() and word[-1].isdigit() and "/" in word:
-                    token = Token(TokenType.NUM, word)
-                else:
-                    raise AddressServiceError(
-                        f"unsupported address format: {' '.join(tokenized_address)}"
-                    )
-            elif word[0].isdigit() and word[-1].isdigit() and "/" in word:
-                token = Token(TokenType.NUM, word)
-            else:
-                raise AddressServiceError(
-                    f"unsupported address format: {' '.join(tokenized_address)}"
-                )
-            tokens.append(token)
+        tokens = AddressParser.tag_or_none(tokenized_address)
+        if tokens is None:
+            raise AddressServiceError(f"unsupported address format: {' '.join(tokenized_address)}")
         return tokens
 
+    @staticmethod
+    def tag_or_none(tokenized_address: List[str]) -> Optional[List[Token]]:
+        """Tag address components like `tag`, but return None instead of raising if any token
+        is not supported.
+
+        Args:
+            tokenized_address: Address tokens.
+
+        Returns:
+            List of tagged address components (tokens) or None.
+
+        """
+        return _tag_or_none(AddressParser.normalize(" ".join(tokenized_address)).split())
+
     @staticmethod
     def chunk(tokens: List[Token]) -> List[Token]:
         result = []
@@ -137,11 +585,33 @@ class AddressParser:
         return result
 
     @staticmethod
-    def parse(address) -> Dict:
-        """Parse given address.
+    def scan(address: str) -> List[Token]:
+        """Tokenize, tag and chunk normalized address in one pass. Equivalent of `tokenize`,
+        `tag` and `chunk` stages called one after another, which remain available for debugging.
+
+        Args:
+            address: Normalized input address.
+
+        Raise:
+            AddressServiceError: If address contains unsupported tokens.
+
+        Returns:
+            List of chunked address components (tokens).
+
+        """
+        scanned = _scan_or_none(address)
+        if scanned is None:
+            raise AddressServiceError(f"unsupported address format: {' '.join(address.split())}")
+        return [Token(*token) for token in zip(scanned.signature, scanned.values)]
+
+    @staticmethod
+    def parse(address, country: Optional[str] = None) -> Dict:
+        """Parse given address. Raising variant of `parse_result`.
 
         Args:
             address: Input address string.
+            country: Optional country code hint. Address country is detected from its street
+                type keywords if hint is not given.
 
         Raise:
             AddressServiceError: If address format is not supported.
@@ -149,72 +619,274 @@ class AddressParser:
         Returns:
             Address components Python dictionary with street and house_number.
         """
+        result = AddressParser.parse_result(address, country)
+        result.raise_for_status()
+        return result.as_dict()
+
+    @staticmethod
+    def parse_result(address, country: Optional[str] = None) -> ParseResult:
+        """Parse given address without raising for unsupported address formats.
+
+        Args:
+            address: Input address string.
+            country: Optional country code hint. Address country is detected from its street
+                type keywords if hint is not given.
+
+        Returns:
+            Parsing result with status code and, on success, street and house_number.
+        """
         # very basic tokenized address pattern matching, it's definitely not a solution
         # of the future (and as a whole) as different addresses may surprise us
 
-        address_parser = AddressParser()
-        parse_map = [
-            {
-                "pattern": (TokenType.ALPHA, TokenType.NUM),
-                "map": {"street": [0], "house_number": [1]}
-            },
-            {
-                "pattern": (TokenType.NUM, TokenType.ALPHA),
-                "map": {"street": [1], "house_number": [0]}
-            },
-            {
-                "pattern": (TokenType.ALPHA, TokenType.NUM, TokenType.ALPHA),
-                "map": {"street": [0], "house_number": [1, 2]}
-            },
-            {
-                "pattern": (TokenType.ALPHA, TokenType.NUM, TokenType.NUM),
-                "map": {"street": [0, 1], "house_number": [2]}
-            },
-            {
-                "pattern": (TokenType.ALPHA, TokenType.NUM, TokenType.ALPHA, TokenType.NUM),
-                "map": {"street": [0, 1], "house_number": [2, 3]}
-            }
+        timed = REGISTRY.enabled
+        if timed:
+            started = time.perf_counter()
+
+        country = _country_code(country)
+        rules = AddressParser.rules
+        normalized_address = normalize_address(
+            address, AddressParser.internal_punctuation, rules.expander
+        )
+        if timed:
+            started = _observe_stage("normalize", started)
+        if AddressParser.gazetteer is not None:
+            split = _split_with_gazetteer(normalized_address, AddressParser.gazetteer, country)
+            if timed:
+                started = _observe_stage("gazetteer", started)
+            if split is not None:
+                return ParseResult(ParseStatus.OK, split[0], split[1], normalized_address)
+        scanned = _scan_or_none(normalized_address)
+        if timed:
+            started = _observe_stage("scan", started)
+        if scanned is None:
+            status = ParseStatus.UNSUPPORTED_TOKEN
+        else:
+            match = _match(scanned, country, rules)
+            status = ParseStatus.UNSUPPORTED_PATTERN if match is None else ParseStatus.OK
+        if status is not ParseStatus.OK:
+            if timed:
+                PARSE_FAILURES.inc(status.name.lower())
+            return ParseResult(status, address=normalized_address)
+        street_slice, house_number_slice = match
+        result = ParseResult(
+            status,
+            " ".join(scanned.values[street_slice]),
+            " ".join(scanned.values[house_number_slice]),
+            normalized_address,
+        )
+        if timed:
+            _observe_stage("match", started)
+        return result
+
+    @staticmethod
+    def parse_many(addresses: Iterable[str], country: Optional[str] = None) -> ParsedBatch:
+        """Parse many addresses at once. Each parsing stage (normalization, gazetteer lookup,
+        scanning and rule matching) runs over the whole batch before the next one starts and
+        unsupported addresses are reported with status codes instead of exceptions.
+
+        Args:
+            addresses: Input address strings.
+            country: Optional country code hint applied to all addresses.
+
+        Returns:
+            Columnar parsing result with street, house_number and status columns.
+
+        """
+        addresses = list(addresses)
+        return _parse_many(addresses, [_country_code(country)] * len(addresses))
+
+
+def _parse_many(addresses: List[str], countries: List[Optional[str]]) -> ParsedBatch:
+    """Parse many addresses, each one with its own (canonical) country hint."""
+    rules = AddressParser.rules
+    punctuation = AddressParser.internal_punctuation
+    normalized = [normalize_address(address, punctuation, rules.expander) for address in addresses]
+    gazetteer = AddressParser.gazetteer
+    if gazetteer is not None:
+        splits = [
+            _split_with_gazetteer(address, gazetteer, country)
+            for address, country in zip(normalized, countries)
         ]
+    else:
+        splits = [None] * len(normalized)
+    scanned = [
+        _scan_or_none(address) if split is None else None
+        for address, split in zip(normalized, splits)
+    ]
 
-        normalized_address = address_parser.normalize(address)
-        tokenized_address = address_parser.tokenize(normalized_address)
-        tagged = address_parser.tag(tokenized_address)
-        chunked = address_parser.chunk(tagged)
-
-        # ugly but it's late on Monday and I just want to make it work...
-        match = None
-        patterns = [option for option in parse_map if len(option["pattern"]) == len(chunked)]
-        for option in patterns:
-            if list(option["pattern"]) == [chunk.token_type for chunk in chunked]:
-                match = option
-                break
-        if not match:
-            raise AddressServiceError(f"unsupported address format: {' '.join(tokenized_address)}")
-        try:
-            street = " ".join(
-                [chunked[i].value for i, _ in enumerate(chunked) if i in match["map"]["street"]]
-            )
-            house_number = " ".join(
-                [
-                    chunked[i].value for i, _ in enumerate(chunked)
-                    if i in match["map"]["house_number"]
-                ]
-            )
-        except AttributeError as err:
-            raise AddressServiceError(f"unsupported address format: {' '.join(tokenized_address)}")\
-                from err
-        parsed = {"street": street, "house_number": house_number}
-        return parsed
+    streets: List[Optional[str]] = []
+    house_numbers: List[Optional[str]] = []
+    status = array.array("B")
+    for split, chunks, country in zip(splits, scanned, countries):
+        if split is not None:
+            streets.append(split[0])
+            house_numbers.append(split[1])
+            status.append(ParseStatus.OK)
+            continue
+        if chunks is None:
+            streets.append(None)
+            house_numbers.append(None)
+            status.append(ParseStatus.UNSUPPORTED_TOKEN)
+            continue
+        match = _match(chunks, country, rules)
+        if match is None:
+            streets.append(None)
+            house_numbers.append(None)
+            status.append(ParseStatus.UNSUPPORTED_PATTERN)
+            continue
+        street_slice, house_number_slice = match
+        streets.append(" ".join(chunks.values[street_slice]))
+        house_numbers.append(" ".join(chunks.values[house_number_slice]))
+        status.append(ParseStatus.OK)
+    return ParsedBatch(street=streets, house_number=house_numbers, status=status)
+
+
+def _build_address(parsed_address: Dict) -> "Address":
+    """Build address schema instance from parsed address components."""
+    from app.schemas.address import Address  # pylint: disable=import-outside-toplevel
+
+    if not REGISTRY.enabled:
+        return Address(**parsed_address)
+    started = time.perf_counter()
+    address = Address(**parsed_address)
+    _observe_stage("model", started)
+    return address
+
+
+def load_gazetteer(path: Optional[str]) -> None:
+    """Make `AddressParser` resolve street names with gazetteer file (or stop using gazetteer
+    if path is None).
+    """
+    previous = AddressParser.gazetteer
+    AddressParser.gazetteer = Gazetteer(path) if path else None
+    if previous is not None:
+        previous.close()
+
+
+def ruleset_version() -> str:
+    """Return version of everything parsing results depend on (rules and gazetteer)."""
+    version = AddressParser.rules.version
+    gazetteer = AddressParser.gazetteer
+    return version if gazetteer is None else f"{version}+{gazetteer.version}"
+
+
+def shared_cache_key(normalized_address: str, country: Optional[str] = None) -> str:
+    """Return shared cache key of normalized address parsed with given country hint."""
+    return f"{_country_code(country) or ''}:{normalized_address}"
+
+
+def result_etag(address: str, country: Optional[str] = None) -> str:
+    """Return strong HTTP entity tag of address parsing result. It is derived from normalized
+    address, country hint and `ruleset_version`, so it is known without parsing and changes
+    whenever parsing result may change."""
+    key = f"{ruleset_version()}\n{shared_cache_key(AddressParser.normalize(address), country)}"
+    return f'"{hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()}"'
+
+
+def parse_batch(
+        requests: List[Tuple[str, Optional[str]]]
+) -> List[Tuple[Optional[str], Optional[str], int, str]]:
+    """Parse many (address, country hint) pairs returning (street, house_number, status,
+    `ruleset_version()`) tuple for each of them. Version tells callers in other processes which
+    rules the results were parsed with.
+    """
+    version = ruleset_version()
+    parsed = _parse_many(
+        [address for address, _ in requests],
+        [_country_code(country) for _, country in requests],
+    )
+    return [
+        (street, house_number, status, version)
+        for street, house_number, status in zip(parsed.street, parsed.house_number, parsed.status)
+    ]
 
 
 class AddressService:
 
-    @staticmethod
-    def extract_address_components(address: str) -> Address:
+    def __init__(
+            self,
+            cache: Optional[LRUCache] = None,
+            coalescer: Optional["Coalescer"] = None,
+            shared_cache: Optional[SharedCache] = None,
+    ):
+        """
+        Args:
+
+            cache: Optional parsing results cache shared between service instances. Both
+                successfully extracted addresses and unsupported address formats are cached.
+            coalescer: Optional `parse_batch` coalescer shared between service instances.
+                Addresses extracted concurrently are parsed together in batches.
+            shared_cache: Optional parsing results cache shared between processes, consulted
+                on `cache` misses.
+
+        """
+        self.cache = cache
+        self.coalescer = coalescer
+        self.shared_cache = shared_cache
+
+    def _parse(self, address: str, country: Optional[str]) -> ParseResult:
+        if self.coalescer is None:
+            return AddressParser.parse_result(address, country)
+        street, house_number, status, version = self.coalescer.submit((address, country)).result()
+        if version != ruleset_version():
+            # coalescer worker processes parsed it with rules (or gazetteer) they were started
+            # with, e.g. before rules reload, such results must not be returned nor cached
+            return AddressParser.parse_result(address, country)
+        return ParseResult(
+            ParseStatus(status), street, house_number, AddressParser.normalize(address)
+        )
+
+    def _shared_parse(self, address: str, normalized: str, country: Optional[str]) -> ParseResult:
+        key, version = shared_cache_key(normalized, country), ruleset_version()
+        cached = self.shared_cache.get(key, version=version)
+        if cached is not None:
+            status, street, house_number = cached
+            return ParseResult(ParseStatus(status), street, house_number, normalized)
+        result = self._parse(address, country)
+        self.shared_cache.put(
+            key, [int(result.status), result.street, result.house_number], version=version
+        )
+        return result
+
+    def extract(self, address: str, country: Optional[str] = None) -> ParseResult:
+        """Extract address components without raising for unsupported address formats.
+
+        Args:
+
+            address: Input address string.
+            country: Optional country code hint skipping address country detection.
+
+        Returns:
+
+            Parsing result (shared with other callers when cache is used).
+
+        """
+        if self.cache is None and self.shared_cache is None:
+            return self._parse(address, country)
+        # read before parsing, so that results of reloaded rules (or gazetteer) are never cached
+        # under the version they replaced (entries of previous versions are left to be evicted)
+        version = ruleset_version()
+        normalized = AddressParser.normalize(address)
+        country = _country_code(country)
+        key = (version, normalized) if country is None else (version, country, normalized)
+        result = self.cache.get(key) if self.cache is not None else None
+        if result is None:
+            if self.shared_cache is not None:
+                result = self._shared_parse(address, normalized, country)
+            else:
+                result = self._parse(address, country)
+            if self.cache is not None:
+                self.cache.put(key, result)
+        return result
+
+    def extract_address_components(
+            self, address: str, country: Optional[str] = None
+    ) -> "Address":
         """
         Args:
 
             address:
+            country: Optional country code hint skipping address country detection.
 
         Raises:
             AddressServiceError if extracting separated street and number values from address fails.
@@ -225,10 +897,136 @@ class AddressService:
             is returned.
 
         """
-        parsed_address = AddressParser().parse(address)
-        return Address(**parsed_address)
+        return self.extract(address, country).model()
+
+    def extract_address_components_json(
+            self, address: str, country: Optional[str] = None
+    ) -> bytes:
+        """Serialization fast path of `extract_address_components`. Skips building `Address`
+        instance and returns its JSON representation straight away (cached along with
+        extraction result when cache is used).
+
+        Args:
+
+            address: Input address string.
+            country: Optional country code hint skipping address country detection.
+
+        Raises:
+            AddressServiceError if extracting separated street and number values from address fails.
+
+        Returns:
+
+            UTF-8 encoded JSON document identical to serialized `Address` instance.
+
+        """
+        return self.extract(address, country).json()
+
+
+def _get_settings():
+    """Return application settings (imported on first use, they pull in pydantic)."""
+    from app.settings import get_settings  # pylint: disable=import-outside-toplevel
+
+    return get_settings()
+
+
+_ADDRESS_CACHE = None
+
+
+def get_address_cache() -> Optional[LRUCache]:
+    """Return process wide address extraction results cache or None if caching is disabled."""
+    global _ADDRESS_CACHE  # pylint: disable=global-statement
+    if _ADDRESS_CACHE is None:
+        cache_size = _get_settings().ADDRESS_CACHE_SIZE
+        if cache_size <= 0:
+            return None
+        _ADDRESS_CACHE = LRUCache(max_size=cache_size)
+        REGISTRY.register(
+            Gauge(
+                "pyaddress_address_cache",
+                "Address extraction results cache statistics.",
+                callback=lambda: {
+                    (stat,): value for stat, value in _ADDRESS_CACHE.stats()._asdict().items()
+                },
+                labelnames=("stat",),
+            )
+        )
+    return _ADDRESS_CACHE
+
+
+_SHARED_CACHE = None
+
+
+def get_shared_cache() -> Optional[SharedCache]:
+    """Return host wide address parsing results cache or None if it is not configured."""
+    global _SHARED_CACHE  # pylint: disable=global-statement
+    if _SHARED_CACHE is None:
+        settings = _get_settings()
+        if not settings.SHARED_CACHE_PATH:
+            return None
+        _SHARED_CACHE = SharedCache(settings.SHARED_CACHE_PATH, settings.SHARED_CACHE_SIZE)
+        REGISTRY.register(
+            Gauge(
+                "pyaddress_shared_cache",
+                "Host wide address parsing results cache statistics (hits and misses of this "
+                "process).",
+                callback=lambda: {
+                    (stat,): value for stat, value in _SHARED_CACHE.stats()._asdict().items()
+                },
+                labelnames=("stat",),
+            )
+        )
+    return _SHARED_CACHE
+
+
+_ADDRESS_COALESCER = None
+
+
+def get_address_coalescer() -> Optional["Coalescer"]:
+    """Return process wide address parsing coalescer or None if coalescing is disabled."""
+    global _ADDRESS_COALESCER  # pylint: disable=global-statement
+    if _ADDRESS_COALESCER is None:
+        settings = _get_settings()
+        if not settings.COALESCER_ENABLED:
+            return None
+        from app.services.coalescer import (  # pylint: disable=import-outside-toplevel
+            Coalescer,
+        )
+
+        _ADDRESS_COALESCER = Coalescer(
+            parse_batch,
+            window=settings.COALESCER_WINDOW_MS / 1000,
+            max_batch=settings.COALESCER_MAX_BATCH,
+            processes=settings.COALESCER_PROCESSES,
+        )
+    return _ADDRESS_COALESCER
+
+
+def restart_address_coalescer_workers() -> None:
+    """Replace worker processes of process wide coalescer (if it runs any), so that they parse
+    with current rules and gazetteer."""
+    if _ADDRESS_COALESCER is not None:
+        _ADDRESS_COALESCER.restart_workers()
+
+
+def close_address_coalescer() -> None:
+    """Stop process wide address parsing coalescer if it was started."""
+    global _ADDRESS_COALESCER  # pylint: disable=global-statement
+    if _ADDRESS_COALESCER is not None:
+        _ADDRESS_COALESCER.close()
+        _ADDRESS_COALESCER = None
 
 
 def get_address_service() -> Generator[AddressService, None, None]:
     """Return address service generator."""
-    yield AddressService()
+    yield AddressService(
+        cache=get_address_cache(),
+        coalescer=get_address_coalescer(),
+        shared_cache=get_shared_cache(),
+    )
+
+
+def get_event_loop_address_service() -> Generator[AddressService, None, None]:
+    """Return address service generator for callers parsing many addresses one after another
+    (batch endpoint, sidecar). Their addresses are not coalesced: they would wait for a batch
+    window per address."""
+    yield AddressService(cache=get_address_cache(), shared_cache=get_shared_cache())
@@ -0,0 +1,247 @@
+"""
+Title: cache.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Caching utilities used by services: in-process LRU cache and on-disk cache shared by all
+    processes of a host.
+
+"""
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, NamedTuple, Optional, Tuple
+
+
+class CacheStats(NamedTuple):
+    """Cache usage statistics snapshot."""
+
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    max_size: int
+
+    @property
+    def hit_rate(self) -> float:
+        """Return share of lookups answered from cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe, size-bounded least recently used cache."""
+
+    def __init__(self, max_size: int):
+        if max_size < 1:
+            raise ValueError(f"cache size must be positive, got {max_size}")
+        self.max_size = max_size
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Return cached value and mark it as recently used or `default` if key is missing."""
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self._misses += 1
+                return default
+            self._data.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store value evicting least recently used entry if cache is full."""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries. Statistics are preserved."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> CacheStats:
+        """Return cache usage statistics."""
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                size=len(self._data),
+                max_size=self.max_size,
+            )
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SharedCache:
+    """Size-bounded cache of JSON serializable values shared by all processes of a host.
+
+    Entries live in SQLite database file (in WAL mode, so readers never wait for writers), hence
+    cache survives restarts, new processes start warm and memory use does not grow with number of
+    processes. Entries are namespaced by version, lookups only see entries of their own version.
+    When cache grows over `max_size` entries, the oldest written ones are evicted (lookups stay
+    read-only, so eviction order is first in, first out rather than least recently used).
+    Database errors (e.g. lock timeouts under heavy write contention) are treated as misses.
+    """
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS entries ("
+        "version TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+        "PRIMARY KEY (version, key))"
+    )
+    # maximum number of writes between cache size checks
+    _EVICTION_INTERVAL = 256
+
+    def __init__(self, path: str, max_size: int, timeout: float = 0.1):
+        """
+        Args:
+
+            path: Database file path, created if it does not exist.
+            max_size: Maximum number of entries (all versions together).
+            timeout: Maximum time in seconds to wait for other processes' write lock.
+
+        """
+        if max_size < 1:
+            raise ValueError(f"cache size must be positive, got {max_size}")
+        self.path = path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid = None
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._writes = 0
+        self._eviction_interval = max(1, min(self._EVICTION_INTERVAL, max_size // 10))
+        with self._lock:
+            self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return database connection of current process (connections must not cross fork)."""
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(
+                self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(self._SCHEMA)
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def get(self, key: str, default: Optional[Any] = None, version: str = "") -> Any:
+        """Return cached value of given version or `default` if key is missing."""
+        with self._lock:
+            try:
+                row = self._connect().execute(
+                    "SELECT value FROM entries WHERE version = ? AND key = ?", (version, key)
+                ).fetchone()
+            except sqlite3.Error:
+                row = None
+            if row is None:
+                self._misses += 1
+                return default
+            self._hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any, version: str = "") -> None:
+        """Store value of given version."""
+        self.put_many(((key, value),), version)
+
+    def put_many(self, items: Iterable[Tuple[str, Any]], version: str = "") -> None:
+        """Store many values of given version in a single transaction (e.g. when prewarming)."""
+        rows = [(version, key, json.dumps(value, ensure_ascii=False)) for key, value in items]
+        with self._lock:
+            connection = self._connect()
+            try:
+                with connection:
+                    connection.execute("BEGIN")
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO entries (version, key, value) VALUES (?, ?, ?)",
+                        rows,
+                    )
+            except sqlite3.Error:
+                return
+            previous, self._writes = self._writes, self._writes + len(rows)
+            interval = self._eviction_interval
+            if previous // interval != self._writes // interval:
+                self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        """Drop the oldest entries (and some more, to amortize eviction) if cache is full."""
+        try:
+            # rowids grow with every write, so their span bounds the number of entries cheaply
+            low, high = connection.execute("SELECT min(rowid), max(rowid) FROM entries").fetchone()
+            if low is None or high - low + 1 <= self.max_size:
+                return
+            size = connection.execute("SELECT count(*) FROM entries").fetchone()[0]
+            excess = size - self.max_size
+            if excess <= 0:
+                return
+            excess += self.max_size // 10
+            with connection:
+                connection.execute("BEGIN")
+                evicted = connection.execute(
+                    "DELETE FROM entries WHERE rowid IN "
+                    "(SELECT rowid FROM entries ORDER BY rowid LIMIT ?)",
+                    (excess,),
+                ).rowcount
+            self._evictions += evicted
+        except sqlite3.Error:
+            pass
+
+    def purge(self, version: str) -> int:
+        """Drop entries of all versions other than given one and return their number."""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("BEGIN")
+                return connection.execute(
+                    "DELETE FROM entries WHERE version != ?", (version,)
+                ).rowcount
+
+    def clear(self) -> None:
+        """Drop all entries. Statistics are preserved."""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("BEGIN")
+                connection.execute("DELETE FROM entries")
+
+    def stats(self) -> CacheStats:
+        """Return cache usage statistics (hits, misses and evictions of this process only)."""
+        size = len(self)
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                size=size,
+                max_size=self.max_size,
+            )
+
+    def close(self) -> None:
+        """Close database connection of current process."""
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT count(*) FROM entries").fetchone()[0]
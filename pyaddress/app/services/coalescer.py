@@ -0,0 +1,164 @@
+"""
+Title: coalescer.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Micro-batching of concurrent requests.
+
+"""
+import concurrent.futures
+import queue
+import threading
+import time
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence
+
+
+class _Request(NamedTuple):
+    item: Any
+    future: concurrent.futures.Future
+
+
+_STOP = object()
+
+
+class Coalescer:
+    """Collect items submitted concurrently by many callers and process them in batches.
+
+    Callers wait on their own future while background dispatcher thread waits up to `window`
+    seconds (or until `max_batch` items are collected) and hands the whole batch to a single
+    `function` call, either in the dispatcher thread or on a pool of worker processes.
+    """
+
+    def __init__(
+            self,
+            function: Callable[[List[Any]], Sequence[Any]],
+            window: float,
+            max_batch: int,
+            processes: int = 0,
+    ):
+        """
+        Args:
+
+            function: Batch processing function returning one result per input item. Must be
+                picklable (module level function) when worker processes are used.
+            window: Maximum time in seconds the first item of a batch waits for others.
+            max_batch: Maximum number of items processed in a single batch.
+            processes: Number of worker processes processing batches, 0 processes batches in
+                the dispatcher thread.
+
+        """
+        if max_batch < 1:
+            raise ValueError(f"batch size must be positive, got {max_batch}")
+        self.function = function
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.items = 0
+        self.processes = processes
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._executor = (
+            concurrent.futures.ProcessPoolExecutor(max_workers=processes) if processes > 0
+            else None
+        )
+        # guards executor replacement, batches are never submitted to shut down executor
+        self._executor_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def submit(self, item: Any) -> concurrent.futures.Future:
+        """Queue item for processing and return future of its result."""
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("coalescer is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="coalescer", daemon=True)
+                self._thread.start()
+            self._queue.put(_Request(item, future))
+        return future
+
+    def restart_workers(self) -> None:
+        """Replace worker processes with new ones started from current state of this process
+        (e.g. reloaded configuration). Batches already running finish in previous workers."""
+        with self._executor_lock:
+            if self._executor is None or self._closed:
+                return
+            previous = self._executor
+            self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.processes)
+        previous.shutdown(wait=False)
+
+    def close(self) -> None:
+        """Process already queued items, stop dispatcher thread and worker processes."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+        with self._executor_lock:
+            executor = self._executor
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            request = self._queue.get()
+            if request is _STOP:
+                break
+            batch = [request]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                try:
+                    request = self._queue.get(timeout=timeout) if timeout > 0 \
+                        else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is _STOP:
+                    stopping = True
+                    break
+                batch.append(request)
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: List[_Request]) -> None:
+        self.batches += 1
+        self.items += len(batch)
+        items = [request.item for request in batch]
+        if self._executor is None:
+            try:
+                results = self.function(items)
+            except Exception as err:  # pylint: disable=broad-except
+                self._fail(batch, err)
+            else:
+                self._resolve(batch, results)
+            return
+        try:
+            with self._executor_lock:
+                future = self._executor.submit(self.function, items)
+        except Exception as err:  # pylint: disable=broad-except
+            # e.g. BrokenProcessPool, dispatcher thread must keep serving later batches
+            self._fail(batch, err)
+            return
+        future.add_done_callback(lambda done: self._on_done(batch, done))
+
+    def _on_done(self, batch: List[_Request], done: concurrent.futures.Future) -> None:
+        error = done.exception()
+        if error is not None:
+            self._fail(batch, error)
+        else:
+            self._resolve(batch, done.result())
+
+    @staticmethod
+    def _resolve(batch: List[_Request], results: Sequence[Any]) -> None:
+        for request, result in zip(batch, results):
+            request.future.set_result(result)
+
+    @staticmethod
+    def _fail(batch: List[_Request], error: BaseException) -> None:
+        for request in batch:
+            request.future.set_exception(error)
@@ -0,0 +1,276 @@
+"""
+Title: extraction.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Streaming extraction of addresses embedded in free text (emails, logs, OCR output).
+
+    Text is consumed chunk by chunk and split into words the same way `AddressParser.tokenize`
+    does, each word is tagged with the parser tagger. Consecutive words which may form an address
+    (numbers, capitalized words, street type keywords and joining words like "de" or "der")
+    are collected into a bounded run, anything else (other words, line breaks, sentence ends,
+    brackets) closes the run. Spans of a closed run containing a number are then parsed, longest
+    first, and the ones which parse are yielded with their stream offsets.
+
+    State never exceeds a run of `4 * max_span_words` words and one partial word (overlong words
+    are skipped, not buffered), so memory use does not depend on input size.
+
+    Usage:
+
+        python -m app.services.extraction mailbox.txt --country DE > addresses.ndjson
+
+"""
+import functools
+import re
+import sys
+from typing import IO, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from app.services.address import AddressParser, TokenType
+from app.services.normalization import ABBREVIATIONS
+from app.services.rules import COUNTRY_KEYWORDS
+
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+DEFAULT_MAX_SPAN_WORDS = 8
+DEFAULT_MAX_WORD_LENGTH = 64
+
+_WORD = re.compile(r"\S+")
+_OPENING = "([{\"'«„“‘"
+_CLOSING = ")]}\"'»“”’"
+_BREAKING = _CLOSING + "!?;:"
+
+# lowercase words joining street name words, e.g. "Rue de la Paix" or "Auf der Vogelwiese"
+STREET_PARTICLES = frozenset(
+    ("da", "das", "de", "del", "della", "den", "der", "des", "di", "do", "dos", "du", "la", "le",
+     "les", "van", "von", "y", "zu")
+)
+
+# kinds of words which may be part of an address
+_NUM, _STREET, _PARTICLE = range(3)
+
+
+class AddressSpan(NamedTuple):
+    """Address found in text. Offsets are stream character offsets, end is exclusive. Text is
+    address words joined with single spaces."""
+
+    start: int
+    end: int
+    text: str
+    street: str
+    house_number: str
+
+
+class _Word(NamedTuple):
+    start: int
+    text: str
+    kind: int
+    comma: bool
+
+
+def _iter_words(
+        chunks: Iterable[str], max_word_length: int
+) -> Iterator[Tuple[int, Optional[str], bool]]:
+    """Yield stream offset, text and preceding line break flag of every word of chunked text.
+
+    Words longer than `max_word_length` are yielded as None without being buffered.
+    """
+    offset = 0  # stream offset of text[0]
+    partial = ""  # last word of previous chunk, it may continue in the next one
+    line_break = False
+    skipping = False  # inside overlong word
+    for chunk in chunks:
+        if not chunk:
+            continue
+        text = partial + chunk
+        partial = ""
+        position = 0
+        for match in _WORD.finditer(text):
+            start, end = match.span()
+            if start > position:
+                skipping = False
+                line_break = line_break or "\n" in text[position:start]
+            position = end
+            if end == len(text):
+                partial = match.group()
+                break
+            if skipping:
+                skipping = False
+                continue
+            yield offset + start, match.group(), line_break
+            line_break = False
+        else:
+            if position < len(text):
+                skipping = False
+                line_break = line_break or "\n" in text[position:]
+        if skipping:
+            partial = ""
+        elif len(partial) > max_word_length:
+            yield offset + len(text) - len(partial), None, line_break
+            line_break = False
+            partial = ""
+            skipping = True
+        offset += len(text) - len(partial)
+    if partial:
+        yield offset, partial, line_break
+
+
+def _word_kind(word: str) -> Optional[int]:
+    """Return kind of address word or None if word cannot be part of an address."""
+    if not word.isalpha():  # tagging plain words is just this check, skip it on hot path
+        # internal punctuation (e.g. "3.5") is handled the same way it is in parser
+        tokens = AddressParser.tag_or_none([word])
+        if not tokens:
+            return None
+        if tokens[0].token_type is TokenType.NUM:
+            return _NUM
+    if word[0].isupper() or word.casefold() in COUNTRY_KEYWORDS:
+        return _STREET
+    # joining words or house number letters
+    return _PARTICLE if len(word) == 1 or word in STREET_PARTICLES else None
+
+
+def _is_abbreviation(word: str) -> bool:
+    """Return whether dotted word is rather an abbreviation than sentence end."""
+    key = word.rstrip(".").casefold()
+    return key.isalpha() and (len(key) <= 3 or key in ABBREVIATIONS or key in COUNTRY_KEYWORDS)
+
+
+def _is_candidate(span: List[_Word]) -> bool:
+    """Return whether words may form an address: it has number and sensible edges."""
+    if span[0].kind is _PARTICLE or not any(word.kind is _NUM for word in span):
+        return False
+    # comma may only follow leading house number, e.g. "4, rue de la Paix"
+    if any(word.comma for word in span[1:-1]):
+        return False
+    last = span[-1]
+    # trailing joining word is only allowed as house number letter, e.g. "23 b"
+    return last.kind is not _PARTICLE or (
+        len(last.text) == 1 and len(span) > 1 and span[-2].kind is _NUM
+    )
+
+
+def _find_spans(
+        run: List[_Word], limit: int, country: Optional[str], max_span_words: int
+) -> Iterator[Tuple[int, AddressSpan]]:
+    """Yield end index and address span of every address found in run words before limit.
+
+    Spans are searched left to right, the longest parseable span starting at given word wins.
+    """
+    first = 0
+    while first < limit:
+        for stop in range(min(limit, first + max_span_words), first, -1):
+            span = run[first:stop]
+            if not _is_candidate(span):
+                continue
+            text = " ".join(word.text for word in span).rstrip(".")
+            result = AddressParser.parse_result(text, country)
+            if result.ok:
+                yield stop, AddressSpan(
+                    span[0].start,
+                    span[-1].start + len(span[-1].text.rstrip(".")),
+                    text,
+                    result.street,
+                    result.house_number,
+                )
+                first = stop
+                break
+        else:
+            first += 1
+
+
+def extract_addresses(
+        source: Union[Iterable[str], IO[str]],
+        country: Optional[str] = None,
+        max_span_words: int = DEFAULT_MAX_SPAN_WORDS,
+        max_word_length: int = DEFAULT_MAX_WORD_LENGTH,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[AddressSpan]:
+    """Extract addresses from free text stream.
+
+    Extraction is heuristic: street names are recognized by capitalization and street type
+    keywords, so e.g. capitalized sentence starters may become a part of the street name.
+
+    Args:
+        source: Iterable of text chunks or text file object (read in `chunk_size` blocks).
+        country: Optional country code hint applied to all addresses.
+        max_span_words: Maximum number of words of a single address.
+        max_word_length: Words longer than this are skipped as not being address words.
+        chunk_size: Number of characters read from file object at once.
+
+    Returns:
+        Iterator of address spans in stream order.
+
+    """
+    if hasattr(source, "read"):
+        source = iter(functools.partial(source.read, chunk_size), "")
+    max_run_words = 4 * max_span_words
+    run: List[_Word] = []
+    dotted = False  # last run word ends with a dot, which may end a sentence
+
+    def close_run(final: bool = True) -> Iterator[AddressSpan]:
+        # when run is only full, its last word may continue in the next words, so spans ending
+        # with it are left for later and run tail which may start an address is kept
+        limit = len(run) if final else len(run) - 1
+        drop = len(run) if final else max(len(run) - max_span_words + 1, 0)
+        for stop, span in _find_spans(run, limit, country, max_span_words):
+            drop = max(drop, stop)
+            yield span
+        del run[:drop]
+
+    for start, word, line_break in _iter_words(source, max_word_length):
+        kind = None
+        if word is not None:
+            stripped = word.lstrip(_OPENING)
+            core = stripped.rstrip(_BREAKING + ".,")
+            kind = _word_kind(core) if core else None
+        if run and (
+                kind is None
+                or line_break
+                or len(stripped) < len(word)
+                or dotted and core[0].isupper() and not _is_abbreviation(run[-1].text)
+        ):
+            yield from close_run()
+        if kind is None:
+            continue
+        start += len(word) - len(stripped)
+        trailing = stripped[len(core):]
+        dotted = trailing.startswith(".")
+        comma = "," in trailing
+        run.append(_Word(start, core + "." if dotted else core, kind, comma))
+        if trailing and any(mark in trailing for mark in _BREAKING) or comma and kind is not _NUM:
+            yield from close_run()
+        elif len(run) >= max_run_words:
+            yield from close_run(final=False)
+    if run:
+        yield from close_run()
+
+
+def main(argv: List[str] = None) -> int:
+    """Command line entrypoint writing addresses found in text file as NDJSON lines."""
+    # command line only dependencies, kept off library import path
+    import argparse  # pylint: disable=import-outside-toplevel
+    import json  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(
+        prog="python -m app.services.extraction", description="Extract addresses from text."
+    )
+    parser.add_argument("input", help="text file path, '-' for standard input")
+    parser.add_argument("-c", "--country", help="country code hint")
+    parser.add_argument("--encoding", default="utf-8", help="input file encoding")
+    args = parser.parse_args(argv)
+    if args.input == "-":
+        file = sys.stdin
+    else:
+        file = open(args.input, encoding=args.encoding, errors="replace")  # pylint: disable=R1732
+    try:
+        for span in extract_addresses(file, args.country):
+            sys.stdout.write(json.dumps(span._asdict(), ensure_ascii=False) + "\n")
+    finally:
+        if file is not sys.stdin:
+            file.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+Title: gazetteer.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Read-only, memory-mapped index of known street names.
+
+    Gazetteer is built offline from (country, street name) pairs into a single file of sorted
+    entries and memory-mapped at runtime, so loading it is near-instant and all worker processes
+    share the same pages. Lookups are binary searches over the mapped file.
+
+    File layout (all integers are little-endian uint32):
+
+        magic | entries count N | N + 1 entry offsets | entries
+
+    Each entry is UTF-8 encoded normalized street name, 0x1F separator and comma separated
+    country codes. Entries are sorted by street name bytes. Street names are normalized the same
+    way as parsed addresses (abbreviations and punctuation of active parsing rules), so
+    gazetteer has to be built with the rules it is used with.
+
+    Usage:
+
+        python -m app.services.gazetteer streets.csv streets.gaz
+
+"""
+import mmap
+import os
+import struct
+import sys
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+
+MAGIC = b"PYAGAZ1\n"
+SEPARATOR = b"\x1f"
+
+_UINT32 = struct.Struct("<I")
+
+
+class GazetteerError(Exception):
+    """Raised when gazetteer file is malformed."""
+
+
+def normalize_street_name(name: str) -> str:
+    """Return canonical street name form used as gazetteer key: street name normalized by
+    `AddressParser.normalize` (with active parsing rules) and casefolded."""
+    # address module imports this one
+    from app.services.address import AddressParser  # pylint: disable=import-outside-toplevel
+
+    return AddressParser.normalize(name).casefold()
+
+
+class Gazetteer:
+    """Memory-mapped street names index."""
+
+    def __init__(self, path: str):
+        """
+        Args:
+
+            path: Gazetteer file path (see `build_gazetteer`).
+
+        """
+        self.path = path
+        with open(path, "rb") as file:
+            try:
+                self._mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as err:  # empty file cannot be mapped
+                raise GazetteerError(f"not a gazetteer file: {path}") from err
+            stat = os.fstat(file.fileno())
+        # identifies gazetteer contents, e.g. in keys of cached parsing results
+        self.version = f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+        header = len(MAGIC) + _UINT32.size
+        if self._mapped[:len(MAGIC)] != MAGIC or len(self._mapped) < header:
+            self._mapped.close()
+            raise GazetteerError(f"not a gazetteer file: {path}")
+        self._count = _UINT32.unpack_from(self._mapped, len(MAGIC))[0]
+        self._data_start = header + (self._count + 1) * _UINT32.size
+        if len(self._mapped) < self._data_start:
+            self._mapped.close()
+            raise GazetteerError(f"truncated gazetteer file: {path}")
+        if sys.byteorder == "little":
+            # zero-copy view of offsets table, header size keeps it 4 bytes aligned
+            self._offsets = memoryview(self._mapped)[header:self._data_start].cast("I")
+        else:
+            self._offsets = struct.unpack_from(f"<{self._count + 1}I", self._mapped, header)
+        if self._data_start + self._offsets[self._count] > len(self._mapped):
+            self.close()
+            raise GazetteerError(f"truncated gazetteer file: {path}")
+
+    def lookup_normalized(self, name: str) -> Optional[FrozenSet[str]]:
+        """Return country codes of already normalized street name or None if it is unknown."""
+        # separator sorts before any name character, so comparing whole entries with the
+        # probe orders them exactly as comparing street names alone would
+        probe = name.encode("utf-8") + SEPARATOR
+        mapped, offsets, data_start = self._mapped, self._offsets, self._data_start
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            entry = mapped[data_start + offsets[middle]:data_start + offsets[middle + 1]]
+            if entry.startswith(probe):
+                countries = entry[len(probe):]
+                return frozenset(countries.decode("ascii").split(",")) if countries else frozenset()
+            if entry < probe:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def lookup(self, name: str) -> Optional[FrozenSet[str]]:
+        """Return country codes of street name or None if it is unknown."""
+        return self.lookup_normalized(normalize_street_name(name))
+
+    def __contains__(self, name: str) -> bool:
+        return self.lookup(name) is not None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        """Unmap gazetteer file."""
+        if isinstance(self._offsets, memoryview):
+            self._offsets.release()
+        self._mapped.close()
+
+
+def build_gazetteer(streets: Iterable[Tuple[str, str]], path: str) -> int:
+    """Build gazetteer file from (country code, street name) pairs. File is written aside and
+    renamed over the target, so processes which have the previous file mapped keep reading it.
+
+    Args:
+        streets: Country code and street name pairs.
+        path: Output gazetteer file path.
+
+    Returns:
+        Number of distinct street names written.
+
+    """
+    countries: Dict[bytes, Set[str]] = {}
+    for country, name in streets:
+        key = normalize_street_name(name).encode("utf-8")
+        if key:
+            countries.setdefault(key, set()).add(country.strip().upper())
+
+    entries: List[bytes] = [
+        key + SEPARATOR + ",".join(sorted(codes)).encode("ascii")
+        for key, codes in sorted(countries.items())
+    ]
+    offsets = [0]
+    for entry in entries:
+        offsets.append(offsets[-1] + len(entry))
+    # rewriting mapped file in place would truncate it under the processes reading it
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as file:
+            file.write(MAGIC)
+            file.write(_UINT32.pack(len(entries)))
+            file.write(b"".join(_UINT32.pack(offset) for offset in offsets))
+            file.write(b"".join(entries))
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+        raise
+    return len(entries)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entrypoint building gazetteer from CSV file with country and street columns."""
+    # command line only dependencies, kept off parser import path (settings pull in pydantic)
+    import argparse  # pylint: disable=import-outside-toplevel
+    import csv  # pylint: disable=import-outside-toplevel
+
+    from app.services.ruleset import load_rules  # pylint: disable=import-outside-toplevel
+    from app.settings import (  # pylint: disable=import-outside-toplevel
+        get_settings,
+        initialize_settings,
+    )
+
+    initialize_settings()
+
+    parser = argparse.ArgumentParser(
+        prog="python -m app.services.gazetteer", description="Build street names gazetteer."
+    )
+    parser.add_argument("input", help="CSV file with country code and street name columns")
+    parser.add_argument("output", help="gazetteer file path")
+    parser.add_argument("-d", "--delimiter", default=",", help="input column delimiter")
+    parser.add_argument(
+        "--rules",
+        default=get_settings().RULES_PATH,
+        help="parsing rules data file path (defaults to RULES_PATH setting or built-in rules)",
+    )
+    args = parser.parse_args(argv)
+    load_rules(args.rules)  # street names are normalized with abbreviations of these rules
+    with open(args.input, newline="", encoding="utf-8") as file:
+        rows = (row for row in csv.reader(file, delimiter=args.delimiter) if len(row) >= 2)
+        count = build_gazetteer(((row[0], row[1]) for row in rows), args.output)
+    print(f"written {count} street names to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
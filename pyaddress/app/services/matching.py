@@ -0,0 +1,346 @@
+"""
+Title: matching.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    In-memory index matching parsed addresses against known (master data) addresses.
+
+    Indexed addresses are reduced to canonical keys: normalized casefolded street name and
+    house number without spaces and leading markers like "No" or "nr". Addresses sharing a key
+    are duplicates. Street names are looked up fuzzily through character trigram inverted index
+    and scored by trigram Dice similarity. Only postings of the rarest query trigrams are scanned
+    (any street reaching the similarity threshold must contain one of them), which keeps lookups
+    fast when common trigrams are shared by huge numbers of streets.
+
+    Index is saved to and loaded from a single file, so it does not have to be rebuilt when
+    service starts. File starts with format version magic followed by pickle (of pinned protocol)
+    of plain containers and array buffers. Unpickling refuses any classes or functions.
+
+"""
+import array
+import bisect
+import heapq
+import io
+import math
+import pickle
+import sys
+from collections import Counter
+from typing import Dict, Hashable, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from app.services.address import AddressParser
+from app.services.gazetteer import normalize_street_name
+
+
+MAGIC = b"PYAIDX2\n"
+# pinned, so that index files do not depend on Python version which wrote them
+PICKLE_PROTOCOL = 4
+
+DEFAULT_MIN_SIMILARITY = 0.7
+# score factor of house numbers sharing number only, e.g. "23" and "23b"
+HOUSE_NUMBER_ROOT_SCORE = 0.9
+
+_GRAM_SIZE = 3
+_EPSILON = 1e-9
+_EMPTY = array.array("I")
+# volume of additionally counted postings, relative to volume which has to be counted
+_SCAN_BUDGET = 1
+
+
+class AddressIndexError(Exception):
+    """Raised when address index file is malformed."""
+
+
+class _PayloadUnpickler(pickle.Unpickler):
+    """Unpickler of index payloads, which consist of builtin containers and scalars only."""
+
+    def find_class(self, module: str, name: str):
+        raise pickle.UnpicklingError(f"unexpected object in address index: {module}.{name}")
+
+
+class Match(NamedTuple):
+    """Indexed address matching query, canonical street and house number are reported."""
+
+    id: Hashable
+    street: str
+    house_number: str
+    score: float
+
+
+def canonical_house_number(house_number: str) -> str:
+    """Return canonical house number form: casefolded, without spaces and number markers."""
+    words = normalize_street_name(house_number).replace("#", " ").split()
+    if len(words) > 1 and words[0].isalpha():
+        words = words[1:]  # "No 1540", "nr 43/45"
+    return "".join(words)
+
+
+def _house_number_root(house_number: str) -> str:
+    """Return leading digits of canonical house number (whole one if it starts with letter)."""
+    for position, character in enumerate(house_number):
+        if not character.isdigit():
+            return house_number[:position] or house_number
+    return house_number
+
+
+def _grams(street: str) -> Set[str]:
+    padded = f" {street} "
+    return {padded[start:start + _GRAM_SIZE] for start in range(len(padded) - _GRAM_SIZE + 1)}
+
+
+class AddressIndex:
+    """Known addresses index with exact and fuzzy street name lookup."""
+
+    def __init__(self):
+        # indexed addresses, columns are indexed by address position
+        self._ids: List[Hashable] = []
+        self._house_numbers: List[str] = []
+        self._address_streets = array.array("I")
+        # addresses sharing street and house number root are chained, "<street id> <root>" key
+        # maps onto the last one, every address onto the previous one (or -1)
+        self._addresses: Dict[str, int] = {}
+        self._previous = array.array("i")
+        # distinct street names, trigram counts and trigram -> street ids postings
+        self._streets: List[str] = []
+        self._street_ids: Dict[str, int] = {}
+        self._gram_counts = array.array("I")
+        self._postings: Dict[str, array.array] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def streets(self) -> int:
+        """Number of distinct indexed street names."""
+        return len(self._streets)
+
+    def add(self, address_id: Hashable, street: str, house_number: str) -> bool:
+        """Index address components.
+
+        Args:
+            address_id: Address identifier reported in matches (str or int to be serializable).
+            street: Street name.
+            house_number: House number.
+
+        Returns:
+            True if address was indexed, False if its street or house number is empty.
+
+        """
+        street = normalize_street_name(street)
+        house_number = canonical_house_number(house_number)
+        if not street or not house_number:
+            return False
+        street_id = self._street_ids.get(street)
+        if street_id is None:
+            street_id = self._street_ids[street] = len(self._streets)
+            self._streets.append(street)
+            grams = _grams(street)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                postings = self._postings.get(gram)
+                if postings is None:
+                    postings = self._postings[gram] = array.array("I")
+                postings.append(street_id)
+        key = f"{street_id} {_house_number_root(house_number)}"
+        self._previous.append(self._addresses.get(key, -1))
+        self._addresses[key] = len(self._ids)
+        self._ids.append(address_id)
+        # house numbers repeat a lot, interning keeps one copy of each
+        self._house_numbers.append(sys.intern(house_number))
+        self._address_streets.append(street_id)
+        return True
+
+    def _chain(self, street_id: int, root: str) -> Iterator[int]:
+        """Yield positions of addresses with given street and house number root."""
+        position = self._addresses.get(f"{street_id} {root}", -1)
+        while position >= 0:
+            yield position
+            position = self._previous[position]
+
+    def add_many(self, records: Iterable[Tuple[Hashable, str, str]]) -> int:
+        """Index (address id, street, house number) records and return number of indexed ones."""
+        return sum(self.add(*record) for record in records)
+
+    def add_address(
+            self, address_id: Hashable, address: str, country: Optional[str] = None
+    ) -> bool:
+        """Parse and index address, return False if it cannot be parsed."""
+        result = AddressParser.parse_result(address, country)
+        return result.ok and self.add(address_id, result.street, result.house_number)
+
+    def _similar_streets(self, street: str, min_similarity: float) -> Iterator[Tuple[int, float]]:
+        """Yield ids and similarities of streets at least `min_similarity` similar to street."""
+        grams = _grams(street)
+        size = len(grams)
+        # Dice similarity 2|A & B| / (|A| + |B|) >= t bounds |B| to <t|A| / (2 - t), (2 - t)|A| / t>
+        # and needs overlap of at least t(|A| + |B|) / 2, so any similar street shares at least one
+        # of |A| - overlap + 1 rarest trigrams and only their postings have to be scanned
+        smallest = math.ceil(min_similarity * size / (2 - min_similarity) - _EPSILON)
+        largest = math.floor((2 - min_similarity) * size / min_similarity + _EPSILON)
+        overlap = max(1, math.ceil(min_similarity * (size + smallest) / 2 - _EPSILON))
+        postings = self._postings
+        rarest = sorted((postings.get(gram, _EMPTY) for gram in grams), key=len)
+        # rarer of the remaining postings are counted as well (up to `_SCAN_BUDGET` times the
+        # volume which has to be counted), counting in C is cheaper than verifying candidates
+        # with too few shared grams one by one
+        scanned = size - overlap + 1
+        budget = _SCAN_BUDGET * sum(len(posting) for posting in rarest[:scanned])
+        volume = 0
+        while scanned < size and volume + len(rarest[scanned]) <= budget:
+            volume += len(rarest[scanned])
+            scanned += 1
+        shared_counts: Counter = Counter()
+        for posting in rarest[:scanned]:
+            shared_counts.update(posting)
+        rest = rarest[scanned:]
+        hits = overlap - len(rest)
+        candidates = shared_counts.items()
+        if hits > 1:
+            candidates = [(street_id, shared) for street_id, shared in candidates if shared >= hits]
+        gram_counts = self._gram_counts
+        for street_id, shared in candidates:
+            candidate_size = gram_counts[street_id]
+            if not smallest <= candidate_size <= largest:
+                continue
+            needed = min_similarity * (size + candidate_size) / 2 - _EPSILON
+            if shared + len(rest) < needed:
+                continue
+            for posting in rest:  # postings are sorted, street ids are assigned increasingly
+                position = bisect.bisect_left(posting, street_id)
+                if position < len(posting) and posting[position] == street_id:
+                    shared += 1
+            if shared >= needed:
+                yield street_id, 2 * shared / (size + candidate_size)
+
+    def match(
+            self,
+            street: str,
+            house_number: str,
+            k: int = 5,
+            min_similarity: float = DEFAULT_MIN_SIMILARITY,
+    ) -> List[Match]:
+        """Find indexed addresses best matching address components.
+
+        Score is street names similarity, multiplied by `HOUSE_NUMBER_ROOT_SCORE` when house
+        numbers share number only. Addresses with different house numbers do not match.
+
+        Args:
+            street: Street name.
+            house_number: House number.
+            k: Maximum number of matches.
+            min_similarity: Minimal street names similarity (greater than 0, at most 1).
+
+        Raise:
+            ValueError: If minimal similarity is out of range.
+
+        Returns:
+            Matches ordered by descending score.
+
+        """
+        if not 0 < min_similarity <= 1:
+            raise ValueError(f"minimal similarity must be in (0, 1] range: {min_similarity}")
+        street = normalize_street_name(street)
+        house_number = canonical_house_number(house_number)
+        root = _house_number_root(house_number)
+        if not street or not root:
+            return []
+        scored = []
+        for street_id, similarity in self._similar_streets(street, min_similarity):
+            for position in self._chain(street_id, root):
+                score = similarity
+                if self._house_numbers[position] != house_number:
+                    score *= HOUSE_NUMBER_ROOT_SCORE
+                # ties are broken by indexing order
+                scored.append((score, -position))
+        return [
+            Match(
+                self._ids[-negated],
+                self._streets[self._address_streets[-negated]],
+                self._house_numbers[-negated],
+                score,
+            )
+            for score, negated in heapq.nlargest(k, scored)
+        ]
+
+    def match_address(
+            self,
+            address: str,
+            k: int = 5,
+            country: Optional[str] = None,
+            min_similarity: float = DEFAULT_MIN_SIMILARITY,
+    ) -> List[Match]:
+        """Parse address and find indexed addresses best matching it (see `match`). Returns no
+        matches if address cannot be parsed."""
+        result = AddressParser.parse_result(address, country)
+        if not result.ok:
+            return []
+        return self.match(result.street, result.house_number, k, min_similarity)
+
+    def duplicates(self) -> Iterator[List[Hashable]]:
+        """Yield ids of indexed addresses sharing canonical street and house number."""
+        for last in self._addresses.values():
+            if self._previous[last] < 0:
+                continue
+            groups: Dict[str, List[Hashable]] = {}
+            position = last
+            while position >= 0:
+                groups.setdefault(self._house_numbers[position], []).append(self._ids[position])
+                position = self._previous[position]
+            for group in groups.values():
+                if len(group) > 1:
+                    yield group[::-1]
+
+    def save(self, path: str) -> None:
+        """Write index to file. Address ids must be of builtin types (e.g. str or int)."""
+        payload = (
+            sys.byteorder,
+            self._ids,
+            self._house_numbers,
+            self._address_streets.tobytes(),
+            self._addresses,
+            self._previous.tobytes(),
+            self._streets,
+            self._gram_counts.tobytes(),
+            {gram: postings.tobytes() for gram, postings in self._postings.items()},
+        )
+        with open(path, "wb") as file:
+            file.write(MAGIC)
+            pickle.dump(payload, file, protocol=PICKLE_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: str) -> "AddressIndex":
+        """Read index written by `save`.
+
+        Raise:
+            AddressIndexError: If file is not an address index file.
+
+        """
+        with open(path, "rb") as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise AddressIndexError(f"not an address index file: {path}")
+            content = file.read()
+
+        def unpack(typecode: str, data: bytes) -> array.array:
+            values = array.array(typecode, data)
+            if byteorder != sys.byteorder:
+                values.byteswap()
+            return values
+
+        index = cls()
+        try:
+            (
+                byteorder, ids, house_numbers, address_streets, addresses, previous, streets,
+                gram_counts, postings,
+            ) = _PayloadUnpickler(io.BytesIO(content)).load()
+            index._ids = ids
+            index._house_numbers = house_numbers
+            index._address_streets = unpack("I", address_streets)
+            index._addresses = addresses
+            index._previous = unpack("i", previous)
+            index._streets = streets
+            index._gram_counts = unpack("I", gram_counts)
+            index._street_ids = {street: street_id for street_id, street in enumerate(streets)}
+            index._postings = {gram: unpack("I", data) for gram, data in postings.items()}
+        except (pickle.UnpicklingError, EOFError, ValueError, TypeError, AttributeError) as err:
+            raise AddressIndexError(f"malformed address index file: {path}") from err
+        return index
@@ -0,0 +1,134 @@
+"""
+Title: normalization.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Address text normalization: Unicode compatibility folding, abbreviations canonicalization,
+    punctuation and whitespace cleanup. Normalized form keeps original letter case, so it can be
+    returned to users as is, and serves as a canonical cache (and deduplication) key.
+
+"""
+import functools
+import re
+import unicodedata
+from typing import Dict, Pattern
+
+
+DEFAULT_PUNCTUATION = ".,"
+
+# abbreviations (casefolded, without trailing dot) expanded only when written with a dot
+ABBREVIATIONS: Dict[str, str] = {
+    "str": "strasse",
+    "bd": "boulevard",
+}
+# abbreviations which are also expanded at the end of compound words, e.g. "Bahnhofstr."
+SUFFIX_ABBREVIATIONS: Dict[str, str] = {
+    "str": "strasse",
+}
+
+
+def _alternatives(words) -> str:
+    # longest first, so that regex alternation never stops at a shorter abbreviation
+    return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+
+def _match_case(source: str, expansion: str) -> str:
+    """Return expansion written in the same letter case as abbreviation it replaces."""
+    if len(source) > 1 and source.isupper():
+        return expansion.upper()
+    if source[0].isupper():
+        return expansion.capitalize()
+    return expansion
+
+
+class AbbreviationExpander:
+    """Compiled dotted abbreviations expansion. Instances are immutable, so they can be shared
+    between threads and swapped as a part of rules snapshot."""
+
+    __slots__ = ("abbreviations", "suffix_abbreviations", "_pattern")
+
+    def __init__(self, abbreviations: Dict[str, str], suffix_abbreviations: Dict[str, str]):
+        """
+        Args:
+
+            abbreviations: Casefolded abbreviations (without trailing dot) and their expansions.
+            suffix_abbreviations: Abbreviations which are also expanded at the end of compound
+                words.
+
+        """
+        self.abbreviations = dict(abbreviations)
+        self.suffix_abbreviations = dict(suffix_abbreviations)
+        alternatives = []
+        if self.abbreviations:
+            alternatives.append(rf"(?P<word>{_alternatives(self.abbreviations)})")
+        if self.suffix_abbreviations:
+            alternatives.append(
+                rf"(?P<prefix>\w{{3,}}?)(?P<suffix>{_alternatives(self.suffix_abbreviations)})"
+            )
+        self._pattern = (
+            re.compile(rf"\b(?:{'|'.join(alternatives)})\.", re.IGNORECASE)
+            if alternatives else None
+        )
+
+    def _expand(self, match: "re.Match") -> str:
+        word = match.group("word") if self.abbreviations else None
+        if word is not None:
+            return _match_case(word, self.abbreviations[word.casefold()])
+        suffix = match.group("suffix")
+        return match.group("prefix") + _match_case(
+            suffix, self.suffix_abbreviations[suffix.casefold()]
+        )
+
+    def expand(self, text: str) -> str:
+        """Return text with dotted abbreviations expanded."""
+        if self._pattern is None:
+            return text
+        return self._pattern.sub(self._expand, text)
+
+
+DEFAULT_EXPANDER = AbbreviationExpander(ABBREVIATIONS, SUFFIX_ABBREVIATIONS)
+
+
+@functools.lru_cache(maxsize=None)
+def _inner_marks(mark: str) -> Pattern:
+    """Return pattern of punctuation mark between two digits or between two letters."""
+    mark = re.escape(mark)
+    return re.compile(rf"(?<=\d){mark}(?=\d)|(?<=[^\W\d_]){mark}(?=[^\W\d_])")
+
+
+def normalize_address(
+        address: str,
+        punctuation: str = DEFAULT_PUNCTUATION,
+        expander: AbbreviationExpander = DEFAULT_EXPANDER,
+) -> str:
+    """Return canonical form of address text.
+
+    Non-ASCII text is NFKC normalized (composed characters, compatibility forms like full-width
+    digits or non-breaking spaces folded), pure ASCII text skips Unicode normalization entirely.
+    Dotted abbreviations are expanded. Punctuation marks inside numbers and words (e.g. "3.5",
+    "U.S.A") are removed, other ones are replaced with spaces ("Aduana,29"). Whitespace runs are
+    collapsed into single spaces.
+
+    Args:
+        address: Input address.
+        punctuation: Punctuation marks separating address words.
+        expander: Dotted abbreviations expansion (defaults to built-in abbreviations).
+
+    Returns:
+        Normalized address string.
+
+    """
+    if not address.isascii():
+        address = unicodedata.normalize("NFKC", address)
+    if "." in address:
+        address = expander.expand(address)
+    # replacing few marks one by one is several times faster than str.translate
+    for mark in punctuation:
+        if mark in address:
+            # marks followed by space (e.g. "ul. ", "4, ") only separate words, other ones may
+            # be inside numbers or words and take much slower regex substitution
+            if address.count(mark) != address.count(mark + " ") + address.endswith(mark):
+                address = _inner_marks(mark).sub("", address)
+            address = address.replace(mark, " ")
+    return " ".join(address.split())
@@ -0,0 +1,86 @@
+"""
+Title: __init__.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Country specific address parse rule packs registry and country detection.
+
+    Rule packs are plain modules defining `RULES` tuple of `ParseRule` and are imported lazily,
+    only when the first address of given country is parsed. Country detection relies on street
+    type keywords only, so it does not load any rule pack.
+
+"""
+from typing import Dict, Iterable, Optional, Tuple
+
+
+CountrySuffixes = Tuple[Tuple[Tuple[str, ...], str], ...]
+
+
+# bump whenever parse rules, rule packs, country detection or address normalization change, it
+# versions cached parsing results shared between processes and restarts (rules loaded from data
+# files, see `app.services.ruleset`, carry their own version)
+RULES_VERSION = "3"
+
+RULE_PACKS: Dict[str, str] = {
+    "CZ": "app.services.rules.cz",
+    "DE": "app.services.rules.de",
+    "ES": "app.services.rules.es",
+    "FR": "app.services.rules.fr",
+    "PL": "app.services.rules.pl",
+    "US": "app.services.rules.us",
+}
+
+# casefolded words (without punctuation) which identify address country, short abbreviations
+# are listed only if they are not common words or abbreviations elsewhere (e.g. "al", "pl")
+COUNTRY_KEYWORDS: Dict[str, str] = {
+    # Czech
+    "ulice": "CZ", "náměstí": "CZ", "nábřeží": "CZ", "třída": "CZ", "května": "CZ",
+    "října": "CZ", "listopadu": "CZ",
+    # German
+    "am": "DE", "an": "DE", "auf": "DE", "der": "DE", "im": "DE", "zum": "DE", "zur": "DE",
+    # Spanish
+    "calle": "ES", "avenida": "ES", "paseo": "ES", "plaza": "ES", "carrera": "ES",
+    # French
+    "rue": "FR", "avenue": "FR", "boulevard": "FR", "allée": "FR", "impasse": "FR",
+    "chemin": "FR", "quai": "FR",
+    # Polish
+    "ul": "PL", "ulica": "PL", "aleja": "PL", "aleje": "PL", "plac": "PL", "osiedle": "PL",
+    "nr": "PL",
+    # US
+    "st": "US", "av": "US", "ave": "US", "blvd": "US", "rd": "US", "ln": "US", "dr": "US",
+}
+
+# casefolded word endings identifying address country (e.g. German compound street names)
+COUNTRY_SUFFIXES: CountrySuffixes = (
+    (("straße", "strasse", "str", "weg", "allee", "gasse", "platz", "ring", "damm"), "DE"),
+    (("ská", "ského", "ová"), "CZ"),
+    (("skiej", "ska"), "PL"),
+)
+
+
+def detect_country(
+        words: Iterable[str],
+        keywords: Dict[str, str] = COUNTRY_KEYWORDS,
+        suffixes: CountrySuffixes = COUNTRY_SUFFIXES,
+) -> Optional[str]:
+    """Detect address country from its words.
+
+    Args:
+        words: Casefolded address words without punctuation.
+        keywords: Casefolded words identifying address country (defaults to built-in ones).
+        suffixes: Casefolded word endings identifying address country (defaults to built-in
+            ones).
+
+    Returns:
+        Country code of the first word matching known keyword or suffix, None if no word does.
+
+    """
+    for word in words:
+        country = keywords.get(word)
+        if country is not None:
+            return country
+        for endings, country in suffixes:
+            if word.endswith(endings):
+                return country
+    return None
@@ -0,0 +1,20 @@
+"""
+Title: cz.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Czech address parse rules.
+
+"""
+from app.services.address import ParseRule, TokenType
+
+
+ALPHA, NUM = TokenType.ALPHA, TokenType.NUM
+
+RULES = (
+    ParseRule(pattern=(ALPHA, NUM), street=(0,), house_number=(1,)),
+    # street names starting with a date, e.g. "5. května 798/62"
+    ParseRule(pattern=(NUM, ALPHA, NUM), street=(0, 1), house_number=(2,)),
+    ParseRule(pattern=(ALPHA, NUM, NUM), street=(0, 1), house_number=(2,)),
+)
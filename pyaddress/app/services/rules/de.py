@@ -0,0 +1,19 @@
+"""
+Title: de.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    German address parse rules.
+
+"""
+from app.services.address import ParseRule, TokenType
+
+
+ALPHA, NUM = TokenType.ALPHA, TokenType.NUM
+
+RULES = (
+    ParseRule(pattern=(ALPHA, NUM), street=(0,), house_number=(1,)),
+    # house number with detached letter, e.g. "Auf der Vogelwiese 23 b"
+    ParseRule(pattern=(ALPHA, NUM, ALPHA), street=(0,), house_number=(1, 2)),
+)
@@ -0,0 +1,19 @@
+"""
+Title: es.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Spanish address parse rules.
+
+"""
+from app.services.address import ParseRule, TokenType
+
+
+ALPHA, NUM = TokenType.ALPHA, TokenType.NUM
+
+RULES = (
+    ParseRule(pattern=(ALPHA, NUM), street=(0,), house_number=(1,)),
+    # numbered streets, e.g. "Calle 39 No 1540"
+    ParseRule(pattern=(ALPHA, NUM, ALPHA, NUM), street=(0, 1), house_number=(2, 3)),
+)
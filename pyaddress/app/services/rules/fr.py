@@ -0,0 +1,18 @@
+"""
+Title: fr.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    French address parse rules.
+
+"""
+from app.services.address import ParseRule, TokenType
+
+
+ALPHA, NUM = TokenType.ALPHA, TokenType.NUM
+
+RULES = (
+    ParseRule(pattern=(NUM, ALPHA), street=(1,), house_number=(0,)),
+    ParseRule(pattern=(ALPHA, NUM), street=(0,), house_number=(1,)),
+)
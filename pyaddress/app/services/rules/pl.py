@@ -0,0 +1,22 @@
+"""
+Title: pl.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Polish address parse rules.
+
+"""
+from app.services.address import ParseRule, TokenType
+
+
+ALPHA, NUM = TokenType.ALPHA, TokenType.NUM
+
+RULES = (
+    ParseRule(pattern=(ALPHA, NUM), street=(0,), house_number=(1,)),
+    # street names ending with a number, e.g. "ul. Bitwy Warszawskiej 1920 15"
+    ParseRule(pattern=(ALPHA, NUM, NUM), street=(0, 1), house_number=(2,)),
+    # house number marker (e.g. "nr") before house number is not a part of it, the rule does not
+    # match other words there
+    ParseRule(pattern=(ALPHA, NUM, ALPHA, NUM), street=(0, 1), house_number=(3,)),
+)
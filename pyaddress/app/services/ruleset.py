@@ -0,0 +1,347 @@
+"""
+Title: ruleset.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Parsing rules data files and their hot reload.
+
+    Rules data file is a JSON document with rules version and any of rule set sections (missing
+    ones fall back to built-in definitions):
+
+        {
+            "version": "2",
+            "rules": [{"pattern": ["ALPHA", "NUM"], "street": [0], "house_number": [1]}],
+            "rule_packs": {"DE": [...]},
+            "country_keywords": {"rue": "FR"},
+            "country_suffixes": [{"suffixes": ["straße", "weg"], "country": "DE"}],
+            "abbreviations": {"str": "strasse"},
+            "suffix_abbreviations": {"str": "strasse"}
+        }
+
+    File is read and compiled into `RuleSet` snapshot off the request path, which is then
+    swapped in by a single assignment. Addresses being parsed at that moment finish with the
+    snapshot they started with. Results cached under previous rules version are no longer
+    looked up (their keys carry the version), shared cache entries of other versions are purged.
+
+    `RulesReloader` reloads rules when data file changes and when triggered (SIGHUP sent to
+    application server is forwarded to all its workers). Rules version has to be bumped with
+    every change, files carrying the active version are not swapped in. Coalescer worker
+    processes (`COALESCER_PROCESSES`) are replaced after swap, results they parsed with previous
+    rules in the meantime are parsed again in the API process instead of being cached.
+
+    Usage:
+
+        python -m app.services.ruleset rules.json --version 2   # export built-in rules
+        python -m app.services.ruleset rules.json --check
+
+"""
+import importlib
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.address import (
+    BUILTIN_RULES,
+    PARSE_RULES,
+    AddressParser,
+    CompiledRules,
+    ParseRule,
+    RuleSet,
+    TokenType,
+    compile_rules,
+    get_shared_cache,
+    restart_address_coalescer_workers,
+    ruleset_version,
+)
+from app.services.normalization import ABBREVIATIONS, SUFFIX_ABBREVIATIONS, AbbreviationExpander
+from app.services.rules import COUNTRY_KEYWORDS, COUNTRY_SUFFIXES, RULE_PACKS, RULES_VERSION
+
+
+logger = logging.getLogger(name="app")
+
+
+class RulesError(Exception):
+    """Raised when rules data file is malformed."""
+
+
+def _compile(rules: Any) -> CompiledRules:
+    return compile_rules(
+        ParseRule(
+            pattern=tuple(TokenType[name] for name in rule["pattern"]),
+            street=tuple(rule["street"]),
+            house_number=tuple(rule["house_number"]),
+        )
+        for rule in rules
+    )
+
+
+def _strings(mapping: Any) -> Dict[str, str]:
+    if not all(isinstance(key, str) and isinstance(value, str) for key, value in mapping.items()):
+        raise TypeError("expected mapping of strings")
+    return dict(mapping)
+
+
+def build_rules(data: Dict[str, Any]) -> RuleSet:
+    """Compile rules data file document into rules snapshot.
+
+    Raise:
+        RulesError: If document is malformed.
+
+    """
+    try:
+        version = data["version"]
+        if not isinstance(version, str) or not version:
+            raise TypeError("version must be a non-empty string")
+        rules = _compile(data["rules"]) if "rules" in data else BUILTIN_RULES.rules
+        rule_packs = None
+        if "rule_packs" in data:
+            rule_packs = {
+                country.upper(): _compile(pack) for country, pack in data["rule_packs"].items()
+            }
+        country_keywords = COUNTRY_KEYWORDS
+        if "country_keywords" in data:
+            country_keywords = {
+                word.casefold(): country.upper()
+                for word, country in _strings(data["country_keywords"]).items()
+            }
+        country_suffixes = COUNTRY_SUFFIXES
+        if "country_suffixes" in data:
+            country_suffixes = tuple(
+                (tuple(suffix.casefold() for suffix in item["suffixes"]), item["country"].upper())
+                for item in data["country_suffixes"]
+            )
+        expander = BUILTIN_RULES.expander
+        if "abbreviations" in data or "suffix_abbreviations" in data:
+            expander = AbbreviationExpander(
+                {
+                    word.casefold(): expansion for word, expansion in
+                    _strings(data.get("abbreviations", ABBREVIATIONS)).items()
+                },
+                {
+                    word.casefold(): expansion for word, expansion in
+                    _strings(data.get("suffix_abbreviations", SUFFIX_ABBREVIATIONS)).items()
+                },
+            )
+    except (KeyError, TypeError, ValueError, AttributeError) as err:
+        raise RulesError(f"malformed rules: {err!r}") from err
+    return RuleSet(version, rules, rule_packs, country_keywords, country_suffixes, expander)
+
+
+def read_rules(path: str) -> RuleSet:
+    """Read and compile rules data file.
+
+    Raise:
+        RulesError: If file is not a valid rules data file.
+        OSError: If file cannot be read.
+
+    """
+    with open(path, encoding="utf-8") as file:
+        try:
+            data = json.load(file)
+        except ValueError as err:
+            raise RulesError(f"malformed rules file {path}: {err}") from err
+    if not isinstance(data, dict):
+        raise RulesError(f"malformed rules file {path}: expected JSON object")
+    return build_rules(data)
+
+
+def load_rules(path: Optional[str]) -> RuleSet:
+    """Make `AddressParser` use rules read from data file (or built-in rules if path is None)
+    and return them."""
+    rules = read_rules(path) if path else BUILTIN_RULES
+    AddressParser.rules = rules
+    return rules
+
+
+def _dump(rules: Tuple[ParseRule, ...]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "pattern": [token_type.name for token_type in rule.pattern],
+            "street": list(rule.street),
+            "house_number": list(rule.house_number),
+        }
+        for rule in rules
+    ]
+
+
+def builtin_rules_document(version: str = RULES_VERSION) -> Dict[str, Any]:
+    """Return built-in rules as rules data file document, e.g. to start editing them."""
+    return {
+        "version": version,
+        "rules": _dump(PARSE_RULES),
+        "rule_packs": {
+            country: _dump(importlib.import_module(module).RULES)
+            for country, module in RULE_PACKS.items()
+        },
+        "country_keywords": COUNTRY_KEYWORDS,
+        "country_suffixes": [
+            {"suffixes": list(suffixes), "country": country}
+            for suffixes, country in COUNTRY_SUFFIXES
+        ],
+        "abbreviations": ABBREVIATIONS,
+        "suffix_abbreviations": SUFFIX_ABBREVIATIONS,
+    }
+
+
+def _file_stamp(path: str) -> Tuple[int, int, int]:
+    status = os.stat(path)
+    return status.st_ino, status.st_size, status.st_mtime_ns
+
+
+class RulesReloader:
+    """Reloads rules from data file when it changes or when triggered. Rules are read and
+    compiled in reloader threads, request path only ever reads the active snapshot."""
+
+    def __init__(
+            self,
+            path: str,
+            interval: float = 0.0,
+            on_swap: Optional[Callable[[RuleSet], None]] = None,
+    ):
+        """
+        Args:
+
+            path: Rules data file path.
+            interval: Seconds between data file change checks, 0 disables watching the file.
+            on_swap: Optional callback called with new rules after they are swapped in.
+
+        """
+        self.path = path
+        self.interval = interval
+        self.on_swap = on_swap
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self._lock = threading.Lock()  # serializes reloads, never taken on request path
+        self._stopped = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    def reload(self, force: bool = False) -> bool:
+        """Load rules if data file changed since the last check (or unconditionally if forced)
+        and swap them in unless their version is already active. Failures are logged and
+        active rules are kept.
+
+        Returns:
+            Whether new rules were swapped in.
+
+        """
+        with self._lock:
+            try:
+                stamp = _file_stamp(self.path)
+                if stamp == self._stamp and not force:
+                    return False
+                checked, self._stamp = self._stamp, stamp
+                rules = read_rules(self.path)
+            except (OSError, RulesError) as err:
+                logger.error("Rules reload failed, keeping version %s: %s", self.version, err)
+                return False
+            if rules.version == AddressParser.rules.version:
+                if checked is not None:
+                    logger.warning(
+                        "Rules file %s changed but its version %s is already active, bump it "
+                        "to reload rules.", self.path, rules.version,
+                    )
+                return False
+            previous, AddressParser.rules = AddressParser.rules, rules
+        logger.info("Rules version %s replaced version %s.", rules.version, previous.version)
+        if self.on_swap is not None:
+            self.on_swap(rules)
+        return True
+
+    @property
+    def version(self) -> str:
+        """Active rules version."""
+        return AddressParser.rules.version
+
+    def trigger(self) -> None:
+        """Reload rules in background thread (safe to call from signal handlers)."""
+        threading.Thread(
+            target=self.reload, kwargs={"force": True}, name="rules-reload", daemon=True
+        ).start()
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.reload()
+
+    def start(self) -> None:
+        """Start watching data file for changes (if interval is set)."""
+        if self.interval > 0 and self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, name="rules-watch", daemon=True)
+            self._watcher.start()
+
+    def close(self) -> None:
+        """Stop watching data file."""
+        self._stopped.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+
+def _on_swap(_rules: RuleSet) -> None:
+    restart_address_coalescer_workers()
+    shared_cache = get_shared_cache()
+    if shared_cache is not None:
+        removed = shared_cache.purge(ruleset_version())
+        logger.info("Purged %d shared cache entries of previous rules versions.", removed)
+
+
+_RULES_RELOADER = None
+
+
+def start_rules_reloader() -> None:
+    """Start process wide rules reloader if rules data file is configured (`RULES_PATH`). Rules
+    changed since they were loaded are reloaded straight away, e.g. in newly forked workers."""
+    global _RULES_RELOADER  # pylint: disable=global-statement
+    from app.settings import get_settings  # pylint: disable=import-outside-toplevel
+
+    settings = get_settings()
+    if not settings.RULES_PATH or _RULES_RELOADER is not None:
+        return
+    reloader = _RULES_RELOADER = RulesReloader(
+        settings.RULES_PATH, settings.RULES_RELOAD_INTERVAL, on_swap=_on_swap
+    )
+    reloader.reload()
+    reloader.start()
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGHUP, lambda _signum, _frame: reloader.trigger())
+
+
+def stop_rules_reloader() -> None:
+    """Stop process wide rules reloader if it was started."""
+    global _RULES_RELOADER  # pylint: disable=global-statement
+    if _RULES_RELOADER is not None:
+        _RULES_RELOADER.close()
+        _RULES_RELOADER = None
+
+
+def main(argv: List[str] = None) -> int:
+    """Command line entrypoint exporting built-in rules to data file or checking data file."""
+    # command line only dependency, kept off library import path
+    import argparse  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(
+        prog="python -m app.services.ruleset", description="Export or check rules data file."
+    )
+    parser.add_argument("path", help="rules data file path")
+    parser.add_argument("--version", default=RULES_VERSION, help="version of exported rules")
+    parser.add_argument("--check", action="store_true", help="check data file instead")
+    args = parser.parse_args(argv)
+    if args.check:
+        try:
+            rules = read_rules(args.path)
+        except (OSError, RulesError) as err:
+            print(err, file=sys.stderr)
+            return 1
+        print(f"rules version {rules.version} are valid", file=sys.stderr)
+        return 0
+    with open(args.path, "w", encoding="utf-8") as file:
+        json.dump(builtin_rules_document(args.version), file, ensure_ascii=False, indent=2)
+    print(f"written built-in rules version {args.version} to {args.path}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,8 @@ Description:
     *pyaddress* configuration management.
 
 """
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 
@@ -16,7 +18,44 @@ _SETTINGS = None
 class Settings(BaseSettings):
 
     DEBUG: bool = True
+    # logging pipeline (see app.logs), records are written to stdout by a background thread
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = False  # structured JSON lines instead of plain text
+    LOG_QUEUE_SIZE: int = 10000  # records waiting to be written, further ones are dropped
+    ACCESS_LOG_SAMPLE_RATE: int = 1  # log 1 in N successful requests, 0 logs none of them
+    ACCESS_LOG_SLOW_MS: float = 1000.0  # slower requests are always logged, as failed ones are
     CORS_ORIGINS: str = "http://localhost:8080,http://127.0.0.1:8080"
+    GAZETTEER_PATH: Optional[str] = None  # known street names file built offline
+    RULES_PATH: Optional[str] = None  # parsing rules data file, None uses built-in rules
+    RULES_RELOAD_INTERVAL: float = 5.0  # seconds between rules file change checks, 0 disables
+    ADDRESS_CACHE_SIZE: int = 10000  # 0 disables address extraction results caching
+    # parsing results cache file shared by all worker processes of a host (None disables it)
+    SHARED_CACHE_PATH: Optional[str] = None
+    SHARED_CACHE_SIZE: int = 1000000
+    # micro-batching of concurrent address parsing requests
+    COALESCER_ENABLED: bool = False
+    COALESCER_WINDOW_MS: float = 2.0  # maximum time the first request waits for a batch to fill
+    COALESCER_MAX_BATCH: int = 64
+    COALESCER_PROCESSES: int = 0  # 0 parses batches in the dispatcher thread
+    # HTTP caching of extraction responses (ETag revalidation is always supported), seconds
+    HTTP_CACHE_MAX_AGE: int = 3600  # private (client) caches, 0 makes clients always revalidate
+    HTTP_CACHE_S_MAXAGE: Optional[int] = 86400  # shared caches (CDN), None uses max-age
+    METRICS_ENABLED: bool = False  # parsing stages and API endpoints latency instrumentation
+    # seconds between worker metrics snapshots merged by scrapes (app.server, many workers)
+    METRICS_EXPORT_INTERVAL: float = 1.0
+    # production server launcher (python -m app.server)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8080
+    SERVER_WORKERS: int = 1
+    SERVER_BACKLOG: int = 2048  # listening socket pending connections queue length
+    SERVER_KEEP_ALIVE: int = 5  # seconds idle keep-alive connection is kept open
+    SERVER_LIMIT_CONCURRENCY: Optional[int] = None  # connections per worker before 503 responses
+    SERVER_MAX_REQUESTS: int = 0  # requests served before worker is replaced, 0 never replaces
+    SERVER_MAX_REQUESTS_JITTER: int = 0  # random extra requests spreading workers replacement
+    # binary protocol sidecar (python -m app.sidecar), also served by app.server workers when set
+    SIDECAR_PATH: Optional[str] = None  # Unix domain socket path
+    SIDECAR_HOST: str = "127.0.0.1"
+    SIDECAR_PORT: int = 0  # local TCP port used if SIDECAR_PATH is not set, 0 disables TCP
 
 
 def initialize_settings() -> None:
@@ -0,0 +1,10 @@
+"""
+Title: __init__.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Low overhead binary protocol access to address parsing for co-located services: sidecar
+    server (`app.sidecar.server`) and pooled client (`app.sidecar.client`).
+
+"""
@@ -0,0 +1,19 @@
+"""
+Title: __main__.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Standalone sidecar server entrypoint (see `app.sidecar.server`).
+
+    Usage:
+
+        python -m app.sidecar --path /run/pyaddress.sock
+
+"""
+import sys
+
+from app.sidecar.server import main
+
+
+sys.exit(main())
@@ -0,0 +1,208 @@
+"""
+Title: client.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Sidecar client with connection pooling. Depends on standard library and protocol module only.
+
+    Usage:
+
+        with SidecarClient(path="/run/pyaddress.sock") as client:
+            client.parse("Winterallee 3")
+            client.parse_many(addresses, country="DE")
+
+"""
+import collections
+import contextlib
+import socket
+import threading
+from typing import Deque, Iterator, List, Optional, Sequence, Tuple
+
+from app.sidecar.protocol import (
+    BATCH,
+    ERROR,
+    HEADER,
+    PARSE,
+    ProtocolError,
+    SidecarResult,
+    decode_results,
+    encode_batch,
+    encode_frame,
+    encode_item,
+)
+
+# responses to addresses sent ahead must fit into socket buffers, otherwise both sides block
+# writing when sidecar stops reading requests until client reads responses
+MAX_IN_FLIGHT_ADDRESSES = 2048
+
+
+class SidecarError(Exception):
+    """Raised when sidecar rejects request or responds unexpectedly."""
+
+
+class _Connection:
+    """Single sidecar connection sending frames and reading responses in order."""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self._reader = sock.makefile("rb")
+        self._last_id = 0
+
+    def send(self, kind: int, body: bytes) -> int:
+        """Send request frame and return its request id."""
+        self._last_id = (self._last_id + 1) & 0xFFFFFFFF
+        self.sock.sendall(encode_frame(self._last_id, kind, body))
+        return self._last_id
+
+    def receive(self, request_id: int) -> List[SidecarResult]:
+        """Read response to request with given id (responses come in request order)."""
+        header = self._reader.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise SidecarError("connection closed by sidecar")
+        length, response_id, kind = HEADER.unpack(header)
+        body = self._reader.read(length + 4 - HEADER.size)
+        if len(body) < length + 4 - HEADER.size:
+            raise SidecarError("connection closed by sidecar")
+        if kind == ERROR:
+            raise SidecarError(body.decode("utf-8", errors="replace"))
+        if response_id != request_id:
+            raise SidecarError(f"unexpected response id {response_id}, expected {request_id}")
+        try:
+            return decode_results(kind, body)
+        except ProtocolError as err:
+            raise SidecarError(str(err)) from err
+
+    def close(self) -> None:
+        self._reader.close()
+        self.sock.close()
+
+
+class SidecarClient:
+    """Thread-safe sidecar client keeping a pool of open connections."""
+
+    def __init__(
+            self,
+            path: Optional[str] = None,
+            host: str = "127.0.0.1",
+            port: int = 0,
+            pool_size: int = 4,
+            timeout: Optional[float] = 5.0,
+            batch_size: int = 256,
+            pipeline: int = 8,
+    ):
+        """
+        Args:
+
+            path: Sidecar Unix domain socket path.
+            host: Sidecar TCP host, used if path is not given.
+            port: Sidecar TCP port, used if path is not given.
+            pool_size: Maximum number of open connections (concurrently sending requests).
+            timeout: Socket operations timeout in seconds (None blocks indefinitely).
+            batch_size: Number of addresses sent in a single frame by `parse_many`.
+            pipeline: Number of frames `parse_many` sends before reading the first response
+                (limited to `MAX_IN_FLIGHT_ADDRESSES` addresses).
+
+        """
+        if not path and not port:
+            raise ValueError("either sidecar socket path or TCP port is required")
+        self.path = path
+        self.address = (host, port)
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.pipeline = pipeline
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._idle: List[_Connection] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> _Connection:
+        if self.path:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+        else:
+            sock = socket.create_connection(self.address, timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return _Connection(sock)
+
+    @contextlib.contextmanager
+    def _connection(self) -> Iterator[_Connection]:
+        """Borrow pooled connection. Connections failing during use are closed, not returned."""
+        with self._slots:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                connection = self._connect()
+            try:
+                yield connection
+            except BaseException:
+                connection.close()
+                raise
+            with self._lock:
+                self._idle.append(connection)
+
+    def parse(self, address: str, country: Optional[str] = None) -> SidecarResult:
+        """Parse single address.
+
+        Args:
+            address: Input address.
+            country: Optional country code hint.
+
+        Raise:
+            SidecarError: If sidecar rejects request.
+            OSError: If connection fails.
+
+        Returns:
+            Parsing result.
+
+        """
+        with self._connection() as connection:
+            request_id = connection.send(PARSE, encode_item(address, country))
+            return connection.receive(request_id)[0]
+
+    def parse_many(
+            self, addresses: Sequence[str], country: Optional[str] = None
+    ) -> List[SidecarResult]:
+        """Parse many addresses sent in pipelined batch frames over a single connection.
+
+        Args:
+            addresses: Input addresses.
+            country: Optional country code hint applied to all addresses.
+
+        Raise:
+            SidecarError: If sidecar rejects request.
+            OSError: If connection fails.
+
+        Returns:
+            Parsing results in input order.
+
+        """
+        results: List[SidecarResult] = []
+        batch_size = min(self.batch_size, MAX_IN_FLIGHT_ADDRESSES)
+        pipeline = max(1, min(self.pipeline, MAX_IN_FLIGHT_ADDRESSES // batch_size))
+        with self._connection() as connection:
+            in_flight: Deque[int] = collections.deque()
+            for start in range(0, len(addresses), batch_size):
+                if len(in_flight) >= pipeline:
+                    results += connection.receive(in_flight.popleft())
+                body = encode_batch(
+                    encode_item(address, country)
+                    for address in addresses[start:start + batch_size]
+                )
+                in_flight.append(connection.send(BATCH, body))
+            while in_flight:
+                results += connection.receive(in_flight.popleft())
+        return results
+
+    def close(self) -> None:
+        """Close idle pooled connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def __enter__(self) -> "SidecarClient":
+        return self
+
+    def __exit__(self, *exc_info: Tuple) -> None:
+        self.close()
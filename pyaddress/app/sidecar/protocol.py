@@ -0,0 +1,183 @@
+"""
+Title: protocol.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Sidecar binary protocol framing. All integers are little-endian, strings are UTF-8.
+
+        frame:   length:uint32 | request id:uint32 | kind:uint8 | body
+                 (length counts request id, kind and body bytes)
+
+    Request bodies:
+
+        PARSE:   item
+        BATCH:   count:uint32 | count * item
+        item:    country length:uint8 | address length:uint32 | country | address
+
+    Response frames echo request id and kind:
+
+        PARSE:   result
+        BATCH:   count:uint32 | count * result
+        result:  status:uint8 | street length:uint32 | house number length:uint32 | street |
+                 house number
+        ERROR:   message (server closes connection after sending it)
+
+    Requests may be pipelined, responses are sent in request order.
+
+"""
+import struct
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+
+PARSE = 1
+BATCH = 2
+ERROR = 255
+
+DEFAULT_MAX_FRAME = 1 << 24
+
+HEADER = struct.Struct("<IIB")
+_COUNT = struct.Struct("<I")
+_ITEM = struct.Struct("<BI")
+_RESULT = struct.Struct("<BII")
+
+
+class ProtocolError(Exception):
+    """Raised when frame is malformed."""
+
+
+class SidecarResult(NamedTuple):
+    """Address parsing result, street and house number are None unless status is OK (0)."""
+
+    status: int
+    street: Optional[str]
+    house_number: Optional[str]
+
+    @property
+    def ok(self) -> bool:
+        """Whether address was parsed."""
+        return self.status == 0
+
+
+def encode_frame(request_id: int, kind: int, body: bytes) -> bytes:
+    """Return frame bytes."""
+    return HEADER.pack(len(body) + HEADER.size - 4, request_id, kind) + body
+
+
+def split_frames(buffer: bytearray, max_frame: int) -> List[Tuple[int, int, bytes]]:
+    """Remove complete frames from the beginning of buffer and return their request ids, kinds
+    and bodies.
+
+    Raise:
+        ProtocolError: If frame length exceeds `max_frame` bytes or is too short.
+
+    """
+    frames = []
+    position = 0
+    while len(buffer) - position >= HEADER.size:
+        length, request_id, kind = HEADER.unpack_from(buffer, position)
+        if length > max_frame or length < HEADER.size - 4:
+            raise ProtocolError(f"invalid frame length: {length}")
+        end = position + 4 + length
+        if end > len(buffer):
+            break
+        frames.append((request_id, kind, bytes(buffer[position + HEADER.size:end])))
+        position = end
+    del buffer[:position]
+    return frames
+
+
+def encode_item(address: str, country: Optional[str] = None) -> bytes:
+    """Return request item bytes."""
+    address_bytes = address.encode("utf-8")
+    country_bytes = country.encode("ascii") if country else b""
+    return _ITEM.pack(len(country_bytes), len(address_bytes)) + country_bytes + address_bytes
+
+
+def encode_batch(parts: Iterable[bytes]) -> bytes:
+    """Return BATCH body of encoded request items or results."""
+    parts = list(parts)
+    return _COUNT.pack(len(parts)) + b"".join(parts)
+
+
+def _decode_item(body: bytes, position: int) -> Tuple[str, Optional[str], int]:
+    country_length, address_length = _ITEM.unpack_from(body, position)
+    position += _ITEM.size
+    end = position + country_length + address_length
+    if end > len(body):
+        raise ProtocolError("truncated request item")
+    country = body[position:position + country_length].decode("ascii") or None
+    address = body[position + country_length:end].decode("utf-8")
+    return address, country, end
+
+
+def decode_request(kind: int, body: bytes) -> List[Tuple[str, Optional[str]]]:
+    """Return (address, country hint) pairs of request body.
+
+    Raise:
+        ProtocolError: If request kind is unknown or body is malformed.
+
+    """
+    try:
+        if kind == PARSE:
+            address, country, end = _decode_item(body, 0)
+            items = [(address, country)]
+        elif kind == BATCH:
+            count = _COUNT.unpack_from(body)[0]
+            end = _COUNT.size
+            items = []
+            for _ in range(count):
+                address, country, end = _decode_item(body, end)
+                items.append((address, country))
+        else:
+            raise ProtocolError(f"unknown request kind: {kind}")
+    except (struct.error, UnicodeDecodeError) as err:
+        raise ProtocolError(f"malformed request: {err}") from err
+    if end != len(body):
+        raise ProtocolError("trailing bytes after request items")
+    return items
+
+
+def encode_result(status: int, street: Optional[str], house_number: Optional[str]) -> bytes:
+    """Return result bytes."""
+    street_bytes = street.encode("utf-8") if street else b""
+    house_number_bytes = house_number.encode("utf-8") if house_number else b""
+    return (
+        _RESULT.pack(status, len(street_bytes), len(house_number_bytes))
+        + street_bytes
+        + house_number_bytes
+    )
+
+
+def decode_results(kind: int, body: bytes) -> List[SidecarResult]:
+    """Return results of PARSE or BATCH response body.
+
+    Raise:
+        ProtocolError: If response body is malformed.
+
+    """
+    try:
+        if kind == PARSE:
+            count, position = 1, 0
+        else:
+            count, position = _COUNT.unpack_from(body)[0], _COUNT.size
+        results = []
+        for _ in range(count):
+            status, street_length, house_number_length = _RESULT.unpack_from(body, position)
+            position += _RESULT.size
+            street_end = position + street_length
+            end = street_end + house_number_length
+            if end > len(body):
+                raise ProtocolError("truncated result")
+            if status == 0:
+                results.append(SidecarResult(
+                    status,
+                    body[position:street_end].decode("utf-8"),
+                    body[street_end:end].decode("utf-8"),
+                ))
+            else:
+                results.append(SidecarResult(status, None, None))
+            position = end
+    except (struct.error, UnicodeDecodeError) as err:
+        raise ProtocolError(f"malformed response: {err}") from err
+    return results
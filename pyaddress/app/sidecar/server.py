@@ -0,0 +1,194 @@
+"""
+Title: server.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Sidecar server exposing `AddressService` to co-located processes over Unix domain (or local
+    TCP) socket with binary protocol (see `app.sidecar.protocol`).
+
+    All complete frames received in one read are processed together and their responses are
+    written back at once, so pipelined and batched requests cost a single system call each way.
+    Sidecar either runs standalone or next to HTTP server in the same worker processes (see
+    `SIDECAR_PATH` and `SIDECAR_PORT` settings of `app.server`).
+
+    Usage:
+
+        python -m app.sidecar --path /run/pyaddress.sock
+
+"""
+import asyncio
+import logging
+import os
+import signal
+import socket
+import stat
+import sys
+from typing import List, Optional
+
+from app.services.address import AddressService, get_event_loop_address_service, load_gazetteer
+from app.sidecar.protocol import (
+    BATCH,
+    DEFAULT_MAX_FRAME,
+    ERROR,
+    ProtocolError,
+    decode_request,
+    encode_batch,
+    encode_frame,
+    encode_result,
+    split_frames,
+)
+
+
+logger = logging.getLogger(name="app")
+
+
+class SidecarProtocol(asyncio.Protocol):
+    """Single sidecar connection."""
+
+    def __init__(self, service: AddressService, max_frame: int = DEFAULT_MAX_FRAME):
+        self.service = service
+        self.max_frame = max_frame
+        self._transport: Optional[asyncio.Transport] = None
+        self._buffer = bytearray()
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self._transport = transport
+
+    def pause_writing(self) -> None:
+        # client does not read responses, stop reading its requests until it catches up
+        self._transport.pause_reading()
+
+    def resume_writing(self) -> None:
+        self._transport.resume_reading()
+
+    def data_received(self, data: bytes) -> None:
+        self._buffer += data
+        responses = []
+        try:
+            for request_id, kind, body in split_frames(self._buffer, self.max_frame):
+                responses.append(self._handle(request_id, kind, body))
+        except ProtocolError as err:
+            logger.warning("Closing sidecar connection: %s.", err)
+            responses.append(encode_frame(0, ERROR, str(err).encode("utf-8")))
+            self._transport.write(b"".join(responses))
+            self._transport.close()
+            return
+        if responses:
+            self._transport.write(b"".join(responses))
+
+    def _handle(self, request_id: int, kind: int, body: bytes) -> bytes:
+        extract = self.service.extract
+        results = []
+        for address, country in decode_request(kind, body):
+            result = extract(address, country)
+            results.append(encode_result(result.status, result.street, result.house_number))
+        return encode_frame(
+            request_id, kind, encode_batch(results) if kind == BATCH else results[0]
+        )
+
+
+def get_sidecar_service() -> AddressService:
+    """Return address service of sidecar connections. Requests are not coalesced, they would
+    block the event loop while waiting for their batch and batched frames batch them already."""
+    return next(get_event_loop_address_service())
+
+
+def bind_sidecar_socket(
+        path: Optional[str] = None, host: str = "127.0.0.1", port: int = 0, backlog: int = 2048
+) -> socket.socket:
+    """Create listening socket bound to Unix domain socket path (or to TCP host and port if path
+    is not given). Stale socket file left by a previous run is removed."""
+    if path:
+        try:
+            if stat.S_ISSOCK(os.stat(path).st_mode):
+                os.unlink(path)
+        except FileNotFoundError:
+            pass
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(path)
+    else:
+        sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+async def start_sidecar(
+        sock: socket.socket,
+        service: Optional[AddressService] = None,
+        max_frame: int = DEFAULT_MAX_FRAME,
+) -> asyncio.AbstractServer:
+    """Start serving sidecar connections accepted on listening socket in running event loop."""
+    service = service or get_sidecar_service()
+    loop = asyncio.get_running_loop()
+
+    def factory() -> SidecarProtocol:
+        return SidecarProtocol(service, max_frame)
+
+    if sock.family == socket.AF_UNIX:
+        return await loop.create_unix_server(factory, sock=sock)
+    return await loop.create_server(factory, sock=sock)
+
+
+async def _serve_forever(sock: socket.socket) -> None:
+    server = await start_sidecar(sock)
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stopped.set)
+    async with server:
+        await stopped.wait()
+
+
+def main(argv: List[str] = None) -> int:
+    """Command line entrypoint running standalone sidecar."""
+    # command line only dependencies, kept off library import path
+    import argparse  # pylint: disable=import-outside-toplevel
+
+    from app.logs import (  # pylint: disable=import-outside-toplevel
+        configure_logging,
+        shutdown_logging,
+    )
+    from app.services.ruleset import (  # pylint: disable=import-outside-toplevel
+        load_rules,
+        start_rules_reloader,
+        stop_rules_reloader,
+    )
+    from app.settings import (  # pylint: disable=import-outside-toplevel
+        get_settings,
+        initialize_settings,
+    )
+
+    initialize_settings()
+    settings = get_settings()
+    parser = argparse.ArgumentParser(prog="python -m app.sidecar", description="Run sidecar.")
+    parser.add_argument("--path", default=settings.SIDECAR_PATH, help="Unix socket path")
+    parser.add_argument("--host", default=settings.SIDECAR_HOST, help="TCP host without path")
+    parser.add_argument("--port", type=int, default=settings.SIDECAR_PORT, help="TCP port")
+    args = parser.parse_args(argv)
+    if not args.path and not args.port:
+        parser.error("either --path or --port (SIDECAR_PATH or SIDECAR_PORT) is required")
+
+    configure_logging(settings.LOG_LEVEL, settings.LOG_JSON, settings.LOG_QUEUE_SIZE)
+    load_gazetteer(settings.GAZETTEER_PATH)
+    load_rules(settings.RULES_PATH)
+    start_rules_reloader()
+    sock = bind_sidecar_socket(args.path, args.host, args.port)
+    logger.info("Sidecar listening on %s.", args.path or f"{args.host}:{sock.getsockname()[1]}")
+    try:
+        asyncio.run(_serve_forever(sock))
+    finally:
+        stop_rules_reloader()
+        sock.close()
+        if args.path:
+            os.unlink(args.path)
+        shutdown_logging()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,19 @@
+"""
+Title: __main__.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Benchmarks entrypoint (see `benchmarks.run`).
+
+    Usage:
+
+        python -m benchmarks --output baseline.json
+
+"""
+import sys
+
+from benchmarks.run import main
+
+
+sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Title: corpus.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Seeded generator of synthetic multinational address corpus used for benchmarking.
+
+"""
+import random
+from typing import Callable, Dict, List, Optional, Sequence
+
+
+def _german(rng: random.Random) -> str:
+    street = rng.choice(
+        [
+            "Winterallee", "Musterstrasse", "Hauptstraße", "Bahnhofstr.", "Am Bächle",
+            "Auf der Vogelwiese", "Blaufeldweg", "An der Alster", "Schillerplatz",
+        ]
+    )
+    number = str(rng.randint(1, 250))
+    suffix = rng.choice(["", "", "", "a", "B", " b"])
+    return f"{street} {number}{suffix}"
+
+
+def _french(rng: random.Random) -> str:
+    street_type = rng.choice(["rue", "avenue", "boulevard", "place", "allée"])
+    name = rng.choice(
+        ["de la revolution", "Victor Hugo", "des Lilas", "du Général Leclerc", "Saint-Michel"]
+    )
+    return f"{rng.randint(1, 150)}, {street_type} {name}"
+
+
+def _spanish(rng: random.Random) -> str:
+    if rng.random() < 0.3:
+        return f"Calle {rng.randint(1, 99)} No {rng.randint(1, 2000)}"
+    street_type = rng.choice(["Calle", "Avenida", "Paseo", "Plaza"])
+    name = rng.choice(["Aduana", "de Gracia", "Mayor", "del Prado", "de la Castellana"])
+    return f"{street_type} {name}, {rng.randint(1, 300)}"
+
+
+def _polish(rng: random.Random) -> str:
+    street = rng.choice(
+        [
+            "ul. Prosta", "ul. Marszałkowska", "al. Jerozolimskie", "ul. Długa",
+            "ul. Bitwy Warszawskiej 1920",
+        ]
+    )
+    number = str(rng.randint(1, 120))
+    if rng.random() < 0.3:
+        number = f"{number}/{rng.randint(1, 80)}"
+    return f"{street} {number}"
+
+
+def _us(rng: random.Random) -> str:
+    name = rng.choice(["Broadway", "Main", "Oak", "Maple", "Sunset", "Park"])
+    suffix = rng.choice(["Av", "St", "Blvd", "Rd", "Ln"])
+    return f"{rng.randint(1, 9999)} {name} {suffix}"
+
+
+def _unparseable(rng: random.Random) -> str:
+    return rng.choice(
+        [
+            "Ave #12", "PO Box 1234", "c/o Smith, Main St", "", "   ", "???", "Winterallee",
+            "3 4 5", "Flat 2, 10 Downing St", "Str. 12a3", "N/A",
+        ]
+    )
+
+
+GENERATORS: Dict[str, Callable[[random.Random], str]] = {
+    "DE": _german,
+    "FR": _french,
+    "ES": _spanish,
+    "PL": _polish,
+    "US": _us,
+}
+
+
+def generate_corpus(
+        size: int,
+        seed: int = 0,
+        unparseable_ratio: float = 0.1,
+        countries: Optional[Sequence[str]] = None,
+) -> List[str]:
+    """Generate reproducible synthetic address corpus.
+
+    Args:
+        size: Number of addresses to generate.
+        seed: Random generator seed, the same seed always gives the same corpus.
+        unparseable_ratio: Share of addresses in formats parser does not support.
+        countries: Country codes to generate addresses for (defaults to all of `GENERATORS`).
+
+    Raise:
+        ValueError: If unparseable ratio is out of range or unknown country is requested.
+
+    Returns:
+        List of address strings.
+
+    """
+    if not 0.0 <= unparseable_ratio <= 1.0:
+        raise ValueError(f"unparseable ratio must be within [0, 1], got {unparseable_ratio}")
+    countries = list(countries or GENERATORS)
+    unknown = set(countries) - set(GENERATORS)
+    if unknown:
+        raise ValueError(f"unsupported countries: {', '.join(sorted(unknown))}")
+    rng = random.Random(seed)
+    generators = [GENERATORS[country] for country in countries]
+    return [
+        _unparseable(rng) if rng.random() < unparseable_ratio else rng.choice(generators)(rng)
+        for _ in range(size)
+    ]
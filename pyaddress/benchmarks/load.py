@@ -0,0 +1,221 @@
+"""
+Title: load.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Load test harness replaying synthetic address corpus against address extraction endpoint,
+    either in-process over ASGI transport or against a running server. Reports throughput and
+    latency percentiles split by successful and failed (unparseable address) requests.
+
+    Requests are sent either by a fixed number of concurrent clients (closed loop) or at a fixed
+    rate regardless of responses (open loop). In open loop mode latency is measured from the
+    scheduled send time, so server stalls are not hidden by delayed sending.
+
+    Usage:
+
+        python -m benchmarks.load --requests 20000 --concurrency 32
+        python -m benchmarks.load --rate 500 --url http://127.0.0.1:8080 --max-p99-ms 50
+
+"""
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+
+from benchmarks.corpus import generate_corpus
+
+
+EXTRACT_PATH = "/api/v1/addresses/extract/address}"
+PERCENTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99, "p999": 0.999}
+
+
+def percentile(ordered: Sequence[float], fraction: float) -> float:
+    """Return nearest-rank percentile of ascending sorted values."""
+    if not ordered:
+        return 0.0
+    # rounding first keeps e.g. 0.99 * 100 = 99.00000000000001 from ranking as 100
+    rank = math.ceil(round(fraction * len(ordered), 9))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+def summarize(latencies: List[float]) -> Dict[str, Any]:
+    """Return count and latency percentiles (in milliseconds) of given latencies in seconds."""
+    ordered = sorted(latencies)
+    summary: Dict[str, Any] = {"count": len(ordered)}
+    for name, fraction in PERCENTILES.items():
+        summary[f"{name}_ms"] = percentile(ordered, fraction) * 1000
+    summary["max_ms"] = ordered[-1] * 1000 if ordered else 0.0
+    return summary
+
+
+class _Recorder:
+    """Collect latencies by request outcome."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {"success": [], "failure": []}
+        self.errors = 0
+
+    async def request(self, client: httpx.AsyncClient, address: str, started: float) -> None:
+        try:
+            response = await client.get(EXTRACT_PATH, params={"address": address})
+        except httpx.HTTPError:
+            self.errors += 1
+            return
+        latency = time.perf_counter() - started
+        if response.status_code == 200:
+            self.latencies["success"].append(latency)
+        elif response.status_code == 404:
+            self.latencies["failure"].append(latency)
+        else:
+            self.errors += 1
+
+
+async def _closed_loop(
+        client: httpx.AsyncClient, corpus: List[str], requests: int, concurrency: int
+) -> _Recorder:
+    recorder = _Recorder()
+    sent = iter(range(requests))
+
+    async def worker():
+        for index in sent:
+            await recorder.request(client, corpus[index % len(corpus)], time.perf_counter())
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return recorder
+
+
+async def _open_loop(
+        client: httpx.AsyncClient, corpus: List[str], requests: int, rate: float
+) -> _Recorder:
+    recorder = _Recorder()
+    tasks = []
+    start = time.perf_counter()
+    for index in range(requests):
+        scheduled = start + index / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(
+            asyncio.create_task(recorder.request(client, corpus[index % len(corpus)], scheduled))
+        )
+    await asyncio.gather(*tasks)
+    return recorder
+
+
+async def run_load(
+        corpus: List[str],
+        requests: int,
+        concurrency: int = 16,
+        rate: Optional[float] = None,
+        url: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Replay corpus against address extraction endpoint and return load test report.
+
+    Args:
+        corpus: Addresses to send (repeated if there are fewer addresses than requests).
+        requests: Total number of requests.
+        concurrency: Number of concurrent clients in closed loop mode.
+        rate: Requests per second in open loop mode (closed loop mode is used if None).
+        url: Base URL of running server, application is created in-process if None.
+
+    Returns:
+        Python dictionary with throughput, latency percentiles of successful and failed
+        requests and number of transport or server errors.
+
+    """
+    if url is None:
+        from app.factory import create_application  # pylint: disable=import-outside-toplevel
+        from app.logs import configure_logging  # pylint: disable=import-outside-toplevel
+        from app.settings import get_settings  # pylint: disable=import-outside-toplevel
+
+        application = create_application()
+        # report is written to standard output, application logs (access log too) go elsewhere
+        settings = get_settings()
+        configure_logging(
+            settings.LOG_LEVEL, settings.LOG_JSON, settings.LOG_QUEUE_SIZE, stream=sys.stderr
+        )
+        transport = httpx.ASGITransport(app=application)
+        client = httpx.AsyncClient(transport=transport, base_url="http://pyaddress")
+    else:
+        limits = httpx.Limits(max_connections=None if rate else concurrency)
+        client = httpx.AsyncClient(base_url=url, limits=limits)
+    async with client:
+        started = time.perf_counter()
+        if rate:
+            recorder = await _open_loop(client, corpus, requests, rate)
+        else:
+            recorder = await _closed_loop(client, corpus, requests, concurrency)
+        elapsed = time.perf_counter() - started
+    completed = sum(len(latencies) for latencies in recorder.latencies.values())
+    return {
+        "mode": "open" if rate else "closed",
+        "target": url or "in-process",
+        "concurrency": None if rate else concurrency,
+        "rate": rate,
+        "requests": requests,
+        "duration_s": elapsed,
+        "throughput_rps": completed / elapsed if elapsed else 0.0,
+        "errors": recorder.errors,
+        "latency": {
+            outcome: summarize(latencies) for outcome, latencies in recorder.latencies.items()
+        },
+    }
+
+
+def check(
+        report: Dict[str, Any], max_p99_ms: Optional[float], min_rps: Optional[float]
+) -> List[str]:
+    """Return human readable descriptions of release gate violations."""
+    violations = []
+    if report["errors"]:
+        violations.append(f"{report['errors']} requests failed with errors")
+    for outcome, summary in report["latency"].items():
+        if max_p99_ms is not None and summary["p99_ms"] > max_p99_ms:
+            violations.append(f"{outcome} p99 {summary['p99_ms']:.2f} ms > {max_p99_ms} ms")
+    if min_rps is not None and report["throughput_rps"] < min_rps:
+        violations.append(f"throughput {report['throughput_rps']:.0f} rps < {min_rps} rps")
+    return violations
+
+
+def main(argv: List[str] = None) -> int:
+    """Command line entrypoint."""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load", description="Load test.")
+    parser.add_argument("--requests", type=int, default=10000, help="total number of requests")
+    parser.add_argument("--concurrency", type=int, default=16, help="closed loop clients")
+    parser.add_argument("--rate", type=float, help="open loop requests per second")
+    parser.add_argument("--url", help="running server base URL (defaults to in-process app)")
+    parser.add_argument("--size", type=int, default=10000, help="synthetic corpus size")
+    parser.add_argument("--seed", type=int, default=0, help="corpus generator seed")
+    parser.add_argument(
+        "--unparseable-ratio", type=float, default=0.1, help="share of unparseable addresses"
+    )
+    parser.add_argument("-o", "--output", help="JSON report file path (defaults to stdout)")
+    parser.add_argument("--max-p99-ms", type=float, help="fail if any p99 latency exceeds it")
+    parser.add_argument("--min-rps", type=float, help="fail if throughput is lower")
+    args = parser.parse_args(argv)
+
+    corpus = generate_corpus(
+        size=args.size, seed=args.seed, unparseable_ratio=args.unparseable_ratio
+    )
+    report = asyncio.run(run_load(corpus, args.requests, args.concurrency, args.rate, args.url))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    violations = check(report, args.max_p99_ms, args.min_rps)
+    for violation in violations:
+        print(f"gate failed: {violation}", file=sys.stderr)
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
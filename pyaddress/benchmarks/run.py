@@ -0,0 +1,307 @@
+"""
+Title: run.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Address parsing benchmarks runner. Times each `AddressParser` pipeline stage and end-to-end
+    `AddressService` extraction over synthetic corpus and writes JSON results which can be
+    compared across commits.
+
+    Usage:
+
+        python -m benchmarks --output results.json
+        python -m benchmarks --compare baseline.json
+        python -m benchmarks --server --server-workers 4
+        python -m benchmarks --startup
+        python -m benchmarks --sidecar
+
+"""
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.address import AddressParser, AddressService, AddressServiceError
+from app.services.cache import LRUCache
+from app.services.matching import AddressIndex
+from benchmarks.corpus import generate_corpus
+from benchmarks.server import measure_server
+from benchmarks.sidecar import measure_sidecar
+from benchmarks.startup import measure_startup
+
+
+# benchmark setup receives corpus and returns function processing the whole corpus once
+BenchmarkSetup = Callable[[List[str]], Callable[[], Any]]
+
+
+def _normalize(corpus: List[str]) -> Callable[[], Any]:
+    normalize = AddressParser.normalize
+    return lambda: [normalize(address) for address in corpus]
+
+
+def _tokenize(corpus: List[str]) -> Callable[[], Any]:
+    normalized = [AddressParser.normalize(address) for address in corpus]
+    tokenize = AddressParser.tokenize
+    return lambda: [tokenize(address) for address in normalized]
+
+
+def _tag(corpus: List[str]) -> Callable[[], Any]:
+    tokenized = [AddressParser.tokenize(AddressParser.normalize(address)) for address in corpus]
+
+    def run():
+        for tokens in tokenized:
+            try:
+                AddressParser.tag(tokens)
+            except AddressServiceError:
+                pass
+    return run
+
+
+def _chunk(corpus: List[str]) -> Callable[[], Any]:
+    tagged = []
+    for address in corpus:
+        try:
+            tokenized = AddressParser.tokenize(AddressParser.normalize(address))
+            tagged.append(AddressParser.tag(tokenized))
+        except AddressServiceError:
+            pass
+    chunk = AddressParser.chunk
+    return lambda: [chunk(tokens) for tokens in tagged]
+
+
+def _scan(corpus: List[str]) -> Callable[[], Any]:
+    normalized = [AddressParser.normalize(address) for address in corpus]
+
+    def run():
+        for address in normalized:
+            try:
+                AddressParser.scan(address)
+            except AddressServiceError:
+                pass
+    return run
+
+
+def _parse(corpus: List[str]) -> Callable[[], Any]:
+    def run():
+        for address in corpus:
+            try:
+                AddressParser.parse(address)
+            except AddressServiceError:
+                pass
+    return run
+
+
+def _parse_result(corpus: List[str]) -> Callable[[], Any]:
+    parse_result = AddressParser.parse_result
+    return lambda: [parse_result(address) for address in corpus]
+
+
+def _parse_many(corpus: List[str]) -> Callable[[], Any]:
+    return lambda: AddressParser.parse_many(corpus)
+
+
+def _match(corpus: List[str]) -> Callable[[], Any]:
+    parsed = AddressParser.parse_many(corpus)
+    index = AddressIndex()
+    components = [
+        (street, house_number)
+        for street, house_number in zip(parsed.street, parsed.house_number)
+        if street is not None
+    ]
+    index.add_many((position, *address) for position, address in enumerate(components))
+    # parsed addresses are repeated up to corpus size, so that timings are per single match
+    components += components[:len(corpus) - len(components)]
+    return lambda: [index.match(street, house_number) for street, house_number in components]
+
+
+def _service(cache: Optional[LRUCache]) -> BenchmarkSetup:
+    def setup(corpus: List[str]) -> Callable[[], Any]:
+        service = AddressService(cache=cache)
+
+        def run():
+            for address in corpus:
+                try:
+                    service.extract_address_components(address)
+                except AddressServiceError:
+                    pass
+        return run
+    return setup
+
+
+BENCHMARKS: Dict[str, BenchmarkSetup] = {
+    "parser.normalize": _normalize,
+    "parser.tokenize": _tokenize,
+    "parser.tag": _tag,
+    "parser.chunk": _chunk,
+    "parser.scan": _scan,
+    "parser.parse": _parse,
+    "parser.parse_result": _parse_result,
+    "parser.parse_many": _parse_many,
+    "matching.match": _match,
+    "service.extract": _service(cache=None),
+    "service.extract_cached": _service(cache=LRUCache(max_size=1_000_000)),
+}
+
+
+def time_benchmark(setup: BenchmarkSetup, corpus: List[str], repeat: int) -> Dict[str, float]:
+    """Run single benchmark `repeat` times and return best timing."""
+    run = setup(corpus)
+    run()  # warm-up (e.g. fills caches)
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        run()
+        elapsed = time.perf_counter_ns() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return {
+        "ns_per_address": best / len(corpus),
+        "addresses_per_s": len(corpus) / best * 1e9 if best else 0.0,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(
+        size: int = 20000,
+        seed: int = 0,
+        unparseable_ratio: float = 0.1,
+        repeat: int = 5,
+        selected: Optional[List[str]] = None,
+        server_workers: int = 0,
+        startup: bool = False,
+        sidecar: bool = False,
+) -> Dict[str, Any]:
+    """Run benchmarks and return machine-readable results.
+
+    Args:
+        size: Synthetic corpus size.
+        seed: Corpus generator seed.
+        unparseable_ratio: Share of unparseable addresses in corpus.
+        repeat: Number of timed runs of each benchmark (best one is reported).
+        selected: Names of benchmarks to run (defaults to all of `BENCHMARKS`).
+        server_workers: Number of workers of production server to measure startup time and
+            memory footprint of, 0 skips server measurement.
+        startup: Whether to measure cold start (import times and application creation).
+        sidecar: Whether to measure standalone sidecar throughput.
+
+    Returns:
+        Python dictionary with run metadata and per benchmark results.
+
+    """
+    corpus = generate_corpus(size=size, seed=seed, unparseable_ratio=unparseable_ratio)
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if selected and name not in selected:
+            continue
+        results[name] = time_benchmark(setup, corpus, repeat)
+    report = {
+        "meta": {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "corpus": {"size": size, "seed": seed, "unparseable_ratio": unparseable_ratio},
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+    if server_workers > 0:
+        report["server"] = measure_server(workers=server_workers)
+    if startup:
+        report["startup"] = measure_startup()
+    if sidecar:
+        report["sidecar"] = measure_sidecar(size=size, seed=seed)
+    return report
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """Compare benchmark results with baseline.
+
+    Args:
+        baseline: Baseline benchmark results.
+        current: Current benchmark results.
+        threshold: Allowed relative slowdown (e.g. 0.1 for 10%).
+
+    Returns:
+        Human readable descriptions of regressions exceeding the threshold.
+
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        change = result["ns_per_address"] / previous["ns_per_address"] - 1
+        if change > threshold:
+            regressions.append(
+                f"{name}: {previous['ns_per_address']:.0f} -> {result['ns_per_address']:.0f} "
+                f"ns/address (+{change:.0%})"
+            )
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    """Command line entrypoint."""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Run benchmarks.")
+    parser.add_argument("--size", type=int, default=20000, help="synthetic corpus size")
+    parser.add_argument("--seed", type=int, default=0, help="corpus generator seed")
+    parser.add_argument(
+        "--unparseable-ratio", type=float, default=0.1, help="share of unparseable addresses"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument(
+        "--benchmark", action="append", choices=sorted(BENCHMARKS), help="benchmark to run"
+    )
+    parser.add_argument(
+        "--server", action="store_true", help="measure production server startup and memory"
+    )
+    parser.add_argument("--server-workers", type=int, default=2, help="server worker processes")
+    parser.add_argument(
+        "--startup", action="store_true", help="measure import times and application creation"
+    )
+    parser.add_argument(
+        "--sidecar", action="store_true", help="measure sidecar throughput (requests per second)"
+    )
+    parser.add_argument("-o", "--output", help="JSON results file path (defaults to stdout)")
+    parser.add_argument("--compare", help="baseline JSON results file to compare with")
+    parser.add_argument(
+        "--threshold", type=float, default=0.1, help="allowed relative slowdown when comparing"
+    )
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        size=args.size,
+        seed=args.seed,
+        unparseable_ratio=args.unparseable_ratio,
+        repeat=args.repeat,
+        selected=args.benchmark,
+        server_workers=args.server_workers if args.server else 0,
+        startup=args.startup,
+        sidecar=args.sidecar,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            regressions = compare(json.load(baseline_file), results, args.threshold)
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
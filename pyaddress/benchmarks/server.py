@@ -0,0 +1,110 @@
+"""
+Title: server.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Production server launcher startup time and memory footprint measurement. Memory figures
+    are read from Linux /proc: RSS counts pages shared copy-on-write with parent in every worker,
+    while PSS splits shared pages between processes sharing them.
+
+"""
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+
+_PROBE_PATH = "/api/v1/addresses/extract/address%7D?address=Winterallee%203"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _memory_kb(pid: int) -> Dict[str, Optional[int]]:
+    """Return RSS and PSS of process in kilobytes (None if not available)."""
+    memory: Dict[str, Optional[int]] = {"rss_kb": None, "pss_kb": None}
+    for path, field, key in (
+            (f"/proc/{pid}/status", "VmRSS:", "rss_kb"),
+            (f"/proc/{pid}/smaps_rollup", "Pss:", "pss_kb"),
+    ):
+        try:
+            with open(path, encoding="ascii") as file:
+                for line in file:
+                    if line.startswith(field):
+                        memory[key] = int(line.split()[1])
+                        break
+        except OSError:
+            pass
+    return memory
+
+
+def _children(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", encoding="ascii") as file:
+            return [int(child) for child in file.read().split()]
+    except OSError:
+        return []
+
+
+def measure_server(workers: int = 2, timeout: float = 30.0) -> Dict[str, Any]:
+    """Start production server, wait until it answers requests and measure its processes.
+
+    Args:
+        workers: Number of server worker processes.
+        timeout: Maximum time in seconds to wait for server readiness.
+
+    Raise:
+        RuntimeError: If server does not answer requests within timeout.
+
+    Returns:
+        Python dictionary with startup time and parent and per worker memory usage.
+
+    """
+    port = _free_port()
+    env = dict(
+        os.environ, SERVER_HOST="127.0.0.1", SERVER_PORT=str(port), SERVER_WORKERS=str(workers)
+    )
+    started = time.perf_counter()
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, "-m", "app.server"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}{_PROBE_PATH}", timeout=1):
+                    break
+            except (urllib.error.URLError, ConnectionError):
+                if process.poll() is not None or time.perf_counter() - started > timeout:
+                    raise RuntimeError("server did not start") from None
+                time.sleep(0.01)
+        startup = time.perf_counter() - started
+        worker_pids = _children(process.pid)
+        deadline = time.perf_counter() + timeout
+        while len(worker_pids) < workers and time.perf_counter() < deadline:
+            time.sleep(0.05)
+            worker_pids = _children(process.pid)
+        return {
+            "workers": workers,
+            "startup_s": startup,
+            "parent": _memory_kb(process.pid),
+            "worker": [_memory_kb(pid) for pid in worker_pids],
+        }
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
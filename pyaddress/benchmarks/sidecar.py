@@ -0,0 +1,94 @@
+"""
+Title: sidecar.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Sidecar throughput measurement. Standalone sidecar (single process, so single core) is started
+    on a temporary Unix domain socket and fed the synthetic corpus one request at a time, as
+    pipelined single address frames and as pipelined batch frames. Compare requests per second
+    with the HTTP load test (`python -m benchmarks.load`).
+
+"""
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from app.sidecar.client import SidecarClient
+from benchmarks.corpus import generate_corpus
+
+
+def _throughput(run, addresses: List[str]) -> Dict[str, float]:
+    started = time.perf_counter()
+    run(addresses)
+    elapsed = time.perf_counter() - started
+    return {"seconds": elapsed, "rps": len(addresses) / elapsed}
+
+
+def measure_sidecar(
+        size: int = 20000,
+        seed: int = 0,
+        batch_size: int = 256,
+        pipeline: int = 64,
+        timeout: float = 30.0,
+) -> Dict[str, Any]:
+    """Start standalone sidecar and measure its throughput.
+
+    Args:
+        size: Synthetic corpus size (number of requests of every mode).
+        seed: Corpus generator seed.
+        batch_size: Number of addresses per batch frame.
+        pipeline: Number of frames sent before reading the first response.
+        timeout: Maximum time in seconds to wait for sidecar readiness.
+
+    Raise:
+        RuntimeError: If sidecar does not start within timeout.
+
+    Returns:
+        Python dictionary with seconds and addresses per second of every mode.
+
+    """
+    # distinct corpora per mode, so that no mode is served from cache filled by another one
+    corpora = [generate_corpus(size=size, seed=seed + mode) for mode in range(3)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sidecar.sock")
+        process = subprocess.Popen(  # pylint: disable=consider-using-with
+            [sys.executable, "-m", "app.sidecar", "--path", path],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            started = time.perf_counter()
+            while not os.path.exists(path):
+                if process.poll() is not None or time.perf_counter() - started > timeout:
+                    raise RuntimeError("sidecar did not start")
+                time.sleep(0.01)
+            with SidecarClient(path=path, pool_size=1, pipeline=pipeline) as client:
+                client.parse(corpora[0][0])  # connect before timing
+
+                def sequential(addresses: List[str]) -> None:
+                    for address in addresses:
+                        client.parse(address)
+
+                client.batch_size = 1
+                pipelined = _throughput(client.parse_many, corpora[1])
+                client.batch_size = batch_size
+                return {
+                    "size": size,
+                    "batch_size": batch_size,
+                    "pipeline": pipeline,
+                    "sequential": _throughput(sequential, corpora[0]),
+                    "pipelined": pipelined,
+                    "batched": _throughput(client.parse_many, corpora[2]),
+                }
+        finally:
+            process.send_signal(signal.SIGTERM)
+            try:
+                process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
@@ -0,0 +1,107 @@
+"""
+Title: startup.py
+Author: Mateusz Jarek <mateuszjarek.mj@gmail.com>
+
+Description:
+
+    Cold start measurement. Every measurement runs in a fresh interpreter, so nothing is
+    imported already: module import times are taken from `python -X importtime` output and
+    application creation is timed separately from importing the web stack it needs.
+
+"""
+import json
+import subprocess
+import sys
+from typing import Any, Dict, List, NamedTuple, Sequence
+
+
+# library only import path and full web application
+STARTUP_MODULES = ("app.services.address", "app.factory")
+WEB_STACK = ("fastapi", "pydantic", "starlette")
+
+_CREATE_APPLICATION = """
+import json, sys, time
+from app.factory import create_application
+started = time.perf_counter()
+create_application()
+json.dump({"create_application_ms": (time.perf_counter() - started) * 1000}, sys.stdout)
+"""
+
+
+class ImportTime(NamedTuple):
+    """Single `-X importtime` entry, times are in microseconds."""
+
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(output: str) -> List[ImportTime]:
+    """Parse `python -X importtime` report (written to stderr) into entries."""
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # column headers
+        module = name.lstrip()
+        depth = (len(name) - len(module) - 1) // 2
+        entries.append(ImportTime(module.rstrip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+def measure_import(module: str, top: int = 10) -> Dict[str, Any]:
+    """Import module in fresh interpreter and return its import time report.
+
+    Args:
+        module: Module to import.
+        top: Number of slowest modules (by their own import time) to report.
+
+    Returns:
+        Python dictionary with total import time in milliseconds, number of imported modules,
+        whether any web stack module was imported and the slowest imported modules.
+
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    entries = parse_importtime(completed.stderr)
+    # interpreter startup imports (site and everything it pulls in) come first
+    site = max((index for index, entry in enumerate(entries) if entry.module == "site"), default=-1)
+    imported = entries[site + 1:]
+    return {
+        "total_ms": sum(entry.cumulative_us for entry in imported if entry.depth == 0) / 1000,
+        "modules": len(imported),
+        "web_stack": any(entry.module.split(".")[0] in WEB_STACK for entry in imported),
+        "slowest": [
+            {"module": entry.module, "self_ms": entry.self_us / 1000}
+            for entry in sorted(imported, key=lambda entry: entry.self_us, reverse=True)[:top]
+        ],
+    }
+
+
+def measure_startup(modules: Sequence[str] = STARTUP_MODULES, top: int = 10) -> Dict[str, Any]:
+    """Return import time reports of given modules and application creation time.
+
+    Args:
+        modules: Modules to measure import time of.
+        top: Number of slowest modules reported for each of the measured modules.
+
+    Returns:
+        Python dictionary with per module import reports and `create_application` wall time in
+        milliseconds (excluding imports).
+
+    """
+    report: Dict[str, Any] = {
+        "imports": {module: measure_import(module, top) for module in modules}
+    }
+    completed = subprocess.run(
+        [sys.executable, "-c", _CREATE_APPLICATION], capture_output=True, text=True, check=True
+    )
+    report.update(json.loads(completed.stdout))
+    return report
@@ -21,7 +21,7 @@ def run() -> None:
         host="127.0.0.1",
         port=8080,
         reload=True,
-        log_config="app/logging.conf",
+        access_log=False,  # requests are logged (and sampled) by application
     )
 
 
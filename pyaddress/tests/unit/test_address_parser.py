@@ -2,7 +2,16 @@ from typing import List, Tuple
 
 import pytest
 
-from app.services.address import AddressParser, Token, TokenType
+from app.services.address import (
+    AddressParser,
+    AddressServiceError,
+    ParseResult,
+    ParseRule,
+    ParseStatus,
+    Token,
+    TokenType,
+    compile_rules,
+)
 
 
 class TestAddressParser:
@@ -256,3 +265,120 @@ class TestAddressParser:
     def test_parse(self, address: str, expected_result: Tuple[str, int]):
         """Test parsing result."""
         assert AddressParser().parse(address) == expected_result
+
+    @pytest.mark.parametrize("address", ["Winterallee", "3 4 5", "Calle 39 No 154 b", "Ave #12"])
+    def test_parse_unsupported_format(self, address: str):
+        """Test that addresses not matching any rule are rejected."""
+        with pytest.raises(AddressServiceError):
+            AddressParser().parse(address)
+
+    @pytest.mark.parametrize(
+        "address, status, stage, token",
+        [
+            ("Winterallee 3", ParseStatus.OK, None, None),
+            ("Ave #12", ParseStatus.UNSUPPORTED_TOKEN, "scan", "#12"),
+            ("Winterallee", ParseStatus.UNSUPPORTED_PATTERN, "match", None),
+        ]
+    )
+    def test_parse_result(self, address: str, status: ParseStatus, stage: str, token: str):
+        """Test that non-raising parser reports failure reason instead of raising."""
+        result = AddressParser.parse_result(address)
+        assert isinstance(result, ParseResult)
+        assert (result.status, result.stage, result.token) == (status, stage, token)
+        if result.ok:
+            assert result.message is None
+            assert result.as_dict() == AddressParser.parse(address)
+            assert result.json() == b'{"street":"Winterallee","housenumber":"3"}'
+        else:
+            assert result.message == f"unsupported address format: {address}"
+            with pytest.raises(AddressServiceError, match=result.message):
+                result.json()
+
+    @pytest.mark.parametrize(
+        "address",
+        [
+            "Winterallee 3",
+            "Auf der Vogelwiese 23 b",
+            "4, rue de la revolution",
+            "Calle Aduana , 29",
+            "ul.  Bitwy\tWarszawskiej 1920 nr 43/45",
+            "5. května 798/62",
+            "12-3/4",
+            "Am Bächle 2",
+            "  ",
+            "Ave #12",
+            "A1 Street 4",
+            "43/ Street",
+            "Street 12a3",
+        ]
+    )
+    def test_scan_matches_pipeline(self, address: str):
+        """Test that fused scanner gives the same result as separate pipeline stages."""
+        address_parser = AddressParser()
+        address = address_parser.normalize(address)
+        try:
+            expected = address_parser.chunk(address_parser.tag(address_parser.tokenize(address)))
+        except AddressServiceError:
+            with pytest.raises(AddressServiceError):
+                address_parser.scan(address)
+        else:
+            assert address_parser.scan(address) == expected
+
+    def test_parse_many(self):
+        """Test columnar parsing result of many addresses."""
+        addresses = ["Winterallee 3", "Ave #12", "4, rue de la revolution", "Winterallee", ""]
+        result = AddressParser().parse_many(iter(addresses))
+        assert result.street == ["Winterallee", None, "rue de la revolution", None, None]
+        assert result.house_number == ["3", None, "4", None, None]
+        assert list(result.status) == [
+            ParseStatus.OK,
+            ParseStatus.UNSUPPORTED_TOKEN,
+            ParseStatus.OK,
+            ParseStatus.UNSUPPORTED_PATTERN,
+            ParseStatus.UNSUPPORTED_PATTERN,
+        ]
+        for address, street, house_number in zip(addresses, result.street, result.house_number):
+            if street is not None:
+                assert AddressParser().parse(address) == {
+                    "street": street, "house_number": house_number
+                }
+
+    def test_internal_punctuation(self):
+        """Test that punctuation marks inside numbers are removed, not treated as separators."""
+        assert AddressParser.parse("Winterallee 3.5") == {
+            "street": "Winterallee", "house_number": "35"
+        }
+        assert AddressParser.tag(["ul.", "Prosta", "3,5"]) == [
+            Token(TokenType.ALPHA, "ul"),
+            Token(TokenType.ALPHA, "Prosta"),
+            Token(TokenType.NUM, "35"),
+        ]
+
+    def test_tag_or_none(self):
+        assert AddressParser.tag_or_none(["3.5"]) == [Token(TokenType.NUM, "35")]
+        assert AddressParser.tag_or_none(["Prosta", "#5"]) is None
+
+
+class TestCompileRules:
+    """Parse rules compilation test suite."""
+
+    def test_first_rule_wins(self):
+        pattern = (TokenType.ALPHA, TokenType.NUM)
+        compiled = compile_rules(
+            [
+                ParseRule(pattern=pattern, street=(0,), house_number=(1,)),
+                ParseRule(pattern=pattern, street=(1,), house_number=(0,)),
+            ]
+        )
+        assert compiled == {pattern: (slice(0, 1), slice(1, 2))}
+
+    @pytest.mark.parametrize("street", [(), (0, 2), (0, 5)])
+    def test_invalid_positions(self, street: Tuple[int, ...]):
+        pattern = (TokenType.ALPHA, TokenType.NUM, TokenType.ALPHA)
+        with pytest.raises(ValueError):
+            compile_rules([ParseRule(pattern=pattern, street=street, house_number=(1,))])
+
+    def test_unreachable_pattern(self):
+        pattern = (TokenType.ALPHA, TokenType.ALPHA, TokenType.NUM)
+        with pytest.raises(ValueError, match="never matches"):
+            compile_rules([ParseRule(pattern=pattern, street=(0,), house_number=(2,))])
@@ -0,0 +1,33 @@
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.schemas.address import Address, address_json
+from app.services.address import AddressService, AddressServiceError
+from app.services.cache import LRUCache
+
+
+class TestAddressJson:
+
+    @pytest.mark.parametrize(
+        "street, house_number",
+        [
+            ("Winterallee", "3"),
+            ("Am Bächle", "23"),
+            ('Say "Hi"\\', "43/45"),
+            ("ул Ленина", "5"),
+        ]
+    )
+    def test_matches_response_serialization(self, street: str, house_number: str):
+        address = Address(street=street, house_number=house_number)
+        expected = JSONResponse(jsonable_encoder(address)).body
+        assert address_json(street, house_number) == expected
+
+    @pytest.mark.parametrize("cache", [None, LRUCache(max_size=10)])
+    def test_service_json(self, cache):
+        service = AddressService(cache=cache)
+        for _ in range(2):
+            assert service.extract_address_components_json("Am Bächle 23") == \
+                '{"street":"Am Bächle","housenumber":"23"}'.encode()
+            with pytest.raises(AddressServiceError):
+                service.extract_address_components_json("Ave #12")
@@ -0,0 +1,99 @@
+import io
+import json
+import mmap
+
+import pytest
+
+from app.batch import iter_chunks, run
+from app.services.address import AddressService, shared_cache_key
+from app.services.cache import SharedCache
+
+
+class TestBatch:
+
+    @pytest.mark.parametrize("chunk_size", [1, 5, 16, 1024])
+    def test_line_aligned_chunks(self, tmp_path, chunk_size: int):
+        data = b"Winterallee 3\nAm B\xc3\xa4chle 23\n\nAve #12"
+        path = tmp_path / "addresses.csv"
+        path.write_bytes(data)
+        with open(path, "rb") as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                chunks = list(iter_chunks(mapped, 0, chunk_size))
+        assert b"".join(data[start:end] for start, end in chunks) == data
+        assert all(data[end - 1:end] == b"\n" for _, end in chunks[:-1])
+
+    def test_run(self, tmp_path):
+        path = tmp_path / "addresses.tsv"
+        path.write_text(
+            "id\taddress\n1\tWinterallee 3\n2\tAve #12\n3\t4, rue de la revolution\n",
+            encoding="utf-8",
+        )
+        output = io.BytesIO()
+        total, failed = run(
+            str(path), output, workers=2, chunk_size=16, delimiter="\t", column=1, header=True
+        )
+        assert (total, failed) == (3, 1)
+        assert output.getvalue().decode().splitlines() == [
+            "street\thouse_number\tstatus",
+            "Winterallee\t3\tOK",
+            "\t\tUNSUPPORTED_TOKEN",
+            "rue de la revolution\t4\tOK",
+        ]
+
+    def test_prewarm_shared_cache(self, tmp_path):
+        path = tmp_path / "addresses.csv"
+        path.write_text("Winterallee 3\nAve #12\n", encoding="utf-8")
+        cache_path = str(tmp_path / "cache.sqlite")
+        run(str(path), io.BytesIO(), workers=1, shared_cache=cache_path)
+        service = AddressService(shared_cache=SharedCache(cache_path, max_size=10))
+        assert service.extract("Winterallee 3").street == "Winterallee"
+        assert not service.extract("Ave #12").ok
+        assert service.shared_cache.stats().hits == 2
+
+    @pytest.mark.parametrize("chunk_size", [1, 8, 1024])
+    def test_rows_stay_aligned(self, tmp_path, chunk_size: int):
+        path = tmp_path / "addresses.csv"
+        path.write_bytes(
+            b"Winterallee 3\r\n"
+            b"\"Am B\xc3\xa4chle\n23\",x\n"  # quoted newline
+            b"Bahnhof\xe2\x80\xa8weg 2\n"  # line separator is not a row break
+            b"Winterallee\xff 3\n"  # invalid UTF-8
+            b"Winter\rallee 3\n"  # carriage return in unquoted field
+            b"4, rue de la revolution\n"
+        )
+        output = io.BytesIO()
+        total, failed = run(str(path), output, workers=1, chunk_size=chunk_size)
+        assert (total, failed) == (6, 3)
+        assert output.getvalue().decode().splitlines()[1:] == [
+            "Winterallee,3,OK",
+            "Am Bächle,23,OK",
+            "Bahnhof weg,2,OK",
+            ",,UNSUPPORTED_TOKEN",
+            ",,MALFORMED_ROW",
+            ",,UNSUPPORTED_PATTERN",
+        ]
+
+    def test_rules_file(self, tmp_path):
+        rules = tmp_path / "rules.json"
+        rules.write_text(
+            json.dumps(
+                {
+                    "version": "strict-1",
+                    "rules": [{"pattern": ["ALPHA", "NUM"], "street": [0], "house_number": [1]}],
+                    "rule_packs": {},
+                }
+            ),
+            encoding="utf-8",
+        )
+        path = tmp_path / "addresses.csv"
+        path.write_text("Winterallee 3\n4, rue de la revolution\n", encoding="utf-8")
+        output = io.BytesIO()
+        cache_path = str(tmp_path / "cache.sqlite")
+        run(str(path), output, workers=1, shared_cache=cache_path, rules=str(rules))
+        assert output.getvalue().decode().splitlines()[1:] == [
+            "Winterallee,3,OK",
+            ",,UNSUPPORTED_PATTERN",
+        ]
+        # prewarmed entries are looked up by API running the same rules
+        cache = SharedCache(cache_path, max_size=10)
+        assert cache.get(shared_cache_key("Winterallee 3"), version="strict-1") is not None
@@ -0,0 +1,93 @@
+import pytest
+
+from app.services.address import (
+    AddressService,
+    AddressServiceError,
+    load_gazetteer,
+    ruleset_version,
+)
+from app.services.cache import CacheStats, LRUCache, SharedCache
+from app.services.gazetteer import build_gazetteer
+
+
+class TestLRUCache:
+
+    def test_eviction_order(self):
+        cache = LRUCache(max_size=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1
+        cache.put("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats() == CacheStats(hits=3, misses=1, evictions=1, size=2, max_size=2)
+        assert cache.stats().hit_rate == 0.75
+
+    def test_invalid_size(self):
+        with pytest.raises(ValueError):
+            LRUCache(max_size=0)
+
+
+class TestSharedCache:
+
+    def test_shared_between_instances(self, tmp_path):
+        path = str(tmp_path / "cache.sqlite")
+        writer, reader = SharedCache(path, max_size=10), SharedCache(path, max_size=10)
+        writer.put("a", [0, "Winterallee", "3"], version="1")
+        assert reader.get("a", version="1") == [0, "Winterallee", "3"]
+        assert reader.get("a", version="2") is None
+        assert reader.get("b", "missing", version="1") == "missing"
+        assert (reader.stats().hits, reader.stats().misses) == (1, 2)
+
+    def test_eviction_and_purge(self, tmp_path):
+        cache = SharedCache(str(tmp_path / "cache.sqlite"), max_size=20)
+        cache.put_many(((str(key), key) for key in range(50)), version="1")
+        cache.put("new", 1, version="2")
+        size = len(cache)
+        assert size <= 20
+        assert cache.get("0", version="1") is None
+        assert cache.get("49", version="1") == 49
+        assert cache.purge("2") == size - 1
+        assert len(cache) == 1
+        assert cache.get("new", version="2") == 1
+
+    def test_invalid_size(self, tmp_path):
+        with pytest.raises(ValueError):
+            SharedCache(str(tmp_path / "cache.sqlite"), max_size=0)
+
+
+class TestAddressServiceCache:
+
+    def test_cached_results(self):
+        service = AddressService(cache=LRUCache(max_size=10))
+        for _ in range(3):
+            address = service.extract_address_components("Winterallee 3")
+            assert (address.street, address.house_number) == ("Winterallee", "3")
+            with pytest.raises(AddressServiceError, match="unsupported address format"):
+                service.extract_address_components("Ave #12")
+        stats = service.cache.stats()
+        assert (stats.hits, stats.misses, stats.size) == (4, 2, 2)
+
+    def test_shared_cache(self, tmp_path):
+        path = str(tmp_path / "cache.sqlite")
+        first = AddressService(cache=LRUCache(max_size=10), shared_cache=SharedCache(path, 10))
+        assert first.extract("Winterallee 3").street == "Winterallee"
+        # another process' service starts with cold in-process cache
+        second = AddressService(cache=LRUCache(max_size=10), shared_cache=SharedCache(path, 10))
+        assert second.extract("Winterallee  3").house_number == "3"
+        assert second.shared_cache.stats().hits == 1
+        assert second.shared_cache.get(":Winterallee 3", version=ruleset_version()) == [
+            0, "Winterallee", "3"
+        ]
+
+    def test_gazetteer_reload_invalidates_results(self, tmp_path):
+        service = AddressService(cache=LRUCache(max_size=10))
+        path = str(tmp_path / "streets.gaz")
+        try:
+            assert service.extract("12 b Prosta").street == "b Prosta"
+            build_gazetteer([("PL", "Prosta")], path)
+            load_gazetteer(path)
+            assert service.extract("12 b Prosta").street == "Prosta"
+        finally:
+            load_gazetteer(None)
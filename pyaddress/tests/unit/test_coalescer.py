@@ -0,0 +1,73 @@
+import concurrent.futures
+import concurrent.futures.process
+
+import pytest
+
+from app.services import address
+from app.services.address import AddressService, AddressServiceError, parse_batch
+from app.services.coalescer import Coalescer
+
+
+class TestCoalescer:
+
+    def test_batches_concurrent_items(self):
+        coalescer = Coalescer(lambda items: [item * 2 for item in items], window=0.05, max_batch=8)
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor:
+                results = list(
+                    executor.map(lambda item: coalescer.submit(item).result(timeout=5), range(32))
+                )
+        finally:
+            coalescer.close()
+        assert results == [item * 2 for item in range(32)]
+        assert coalescer.items == 32
+        assert coalescer.batches < 32
+
+    def test_function_error(self):
+        def fail(items):
+            raise ValueError("broken batch")
+        coalescer = Coalescer(fail, window=0.0, max_batch=1)
+        try:
+            with pytest.raises(ValueError, match="broken batch"):
+                coalescer.submit("Winterallee 3").result(timeout=5)
+        finally:
+            coalescer.close()
+
+    def test_executor_submit_error(self, monkeypatch):
+        def submit(*args, **kwargs):
+            raise concurrent.futures.process.BrokenProcessPool("worker died")
+
+        monkeypatch.setattr(concurrent.futures.ProcessPoolExecutor, "submit", submit)
+        coalescer = Coalescer(parse_batch, window=0.0, max_batch=1, processes=1)
+        try:
+            for _ in range(2):
+                with pytest.raises(concurrent.futures.process.BrokenProcessPool):
+                    coalescer.submit(("Winterallee 3", None)).result(timeout=5)
+        finally:
+            coalescer.close()
+
+    def test_closed(self):
+        coalescer = Coalescer(list, window=0.0, max_batch=1)
+        coalescer.close()
+        with pytest.raises(RuntimeError):
+            coalescer.submit("Winterallee 3")
+
+    @pytest.mark.parametrize("processes", [0, 2])
+    def test_address_service(self, processes: int):
+        coalescer = Coalescer(parse_batch, window=0.01, max_batch=4, processes=processes)
+        service = AddressService(coalescer=coalescer)
+        try:
+            address = service.extract_address_components("4, rue de la revolution")
+            assert (address.street, address.house_number) == ("rue de la revolution", "4")
+            with pytest.raises(AddressServiceError, match="unsupported address format: Ave #12"):
+                service.extract_address_components("Ave #12")
+        finally:
+            coalescer.close()
+
+    def test_close_address_coalescer(self, monkeypatch):
+        coalescer = Coalescer(parse_batch, window=0.0, max_batch=1)
+        monkeypatch.setattr(address, "_ADDRESS_COALESCER", coalescer)
+        address.close_address_coalescer()
+        assert address._ADDRESS_COALESCER is None  # pylint: disable=protected-access
+        with pytest.raises(RuntimeError):
+            coalescer.submit(("Winterallee 3", None))
@@ -0,0 +1,19 @@
+import pytest
+
+from benchmarks.corpus import generate_corpus
+
+
+class TestGenerateCorpus:
+
+    def test_reproducible(self):
+        assert generate_corpus(size=100, seed=7) == generate_corpus(size=100, seed=7)
+        assert generate_corpus(size=100, seed=7) != generate_corpus(size=100, seed=8)
+
+    def test_countries(self):
+        corpus = generate_corpus(size=50, unparseable_ratio=0.0, countries=["PL"])
+        assert all(address.startswith(("ul.", "al.")) for address in corpus)
+
+    @pytest.mark.parametrize("kwargs", [{"unparseable_ratio": 1.5}, {"countries": ["XX"]}])
+    def test_invalid_arguments(self, kwargs):
+        with pytest.raises(ValueError):
+            generate_corpus(size=10, **kwargs)
@@ -0,0 +1,55 @@
+import io
+
+import pytest
+
+from app.services.extraction import _iter_words, extract_addresses
+
+
+TEXT = (
+    "Hello Anna,\n"
+    "please send the parcel to Winterallee 3 tomorrow. Our office moved to Auf der Vogelwiese "
+    "23 b\nin March; the invoice (ul. Bitwy Warszawskiej 1920 nr 43/45) was paid.\n"
+    "Visit us at Calle 39 No 1540! Or write to 4, rue de la Paix. Hauptstr. 5 is closed.\n"
+)
+EXPECTED = [
+    ("Winterallee 3", "Winterallee", "3"),
+    ("Auf der Vogelwiese 23 b", "Auf der Vogelwiese", "23 b"),
+    ("ul. Bitwy Warszawskiej 1920 nr 43/45", "ul Bitwy Warszawskiej 1920", "43/45"),
+    ("Calle 39 No 1540", "Calle 39", "No 1540"),
+    ("4 rue de la Paix", "rue de la Paix", "4"),
+    ("Hauptstr. 5", "Hauptstrasse", "5"),
+]
+
+
+class TestExtractAddresses:
+
+    @pytest.mark.parametrize("size", [1, 5, 64, len(TEXT)])
+    def test_chunked(self, size: int):
+        chunks = [TEXT[start:start + size] for start in range(0, len(TEXT), size)]
+        spans = list(extract_addresses(chunks))
+        assert [(span.text, span.street, span.house_number) for span in spans] == EXPECTED
+        assert TEXT[spans[0].start:spans[0].end] == "Winterallee 3"
+        assert TEXT[spans[-1].start:spans[-1].end] == "Hauptstr. 5"
+
+    def test_file(self):
+        assert list(extract_addresses(io.StringIO(TEXT), chunk_size=7)) == list(
+            extract_addresses([TEXT])
+        )
+
+    @pytest.mark.parametrize(
+        "text",
+        ["Winterallee 3, Berlin", "Winterallee 3\nBerlin", "Winterallee 3. Berlin is nice"],
+    )
+    def test_boundaries(self, text: str):
+        assert [span.text for span in extract_addresses([text])] == ["Winterallee 3"]
+
+    def test_long_runs(self):
+        text = ", ".join(f"Winterallee {number}" for number in range(1, 101))
+        spans = list(extract_addresses([text], max_span_words=4))
+        assert [span.house_number for span in spans] == [str(number) for number in range(1, 101)]
+
+    def test_overlong_words(self):
+        words = list(_iter_words(["abc ", "x" * 10, "x" * 10, " Am", "see 2"], max_word_length=8))
+        assert words == [
+            (0, "abc", False), (4, None, False), (25, "Amsee", False), (31, "2", False)
+        ]
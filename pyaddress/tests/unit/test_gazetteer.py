@@ -0,0 +1,127 @@
+import json
+
+import pytest
+
+from app.services.address import (
+    BUILTIN_RULES,
+    AddressParser,
+    ParseStatus,
+    load_gazetteer,
+)
+from app.services.gazetteer import Gazetteer, GazetteerError, build_gazetteer, main
+from app.services.ruleset import builtin_rules_document, load_rules
+
+
+STREETS = [
+    ("CZ", "5. května"),
+    ("PL", "ul. Bitwy Warszawskiej 1920"),
+    ("PL", "Prosta"),
+    ("CZ", "Prosta"),
+    ("DE", "Am Bächle"),
+]
+
+
+@pytest.fixture
+def gazetteer_path(tmp_path):
+    path = tmp_path / "streets.gaz"
+    build_gazetteer(STREETS, str(path))
+    return str(path)
+
+
+@pytest.fixture
+def parser_gazetteer(gazetteer_path):
+    load_gazetteer(gazetteer_path)
+    yield
+    load_gazetteer(None)
+
+
+class TestGazetteer:
+
+    def test_lookup(self, gazetteer_path):
+        gazetteer = Gazetteer(gazetteer_path)
+        try:
+            assert len(gazetteer) == 4
+            assert gazetteer.lookup("PROSTA") == frozenset({"CZ", "PL"})
+            assert gazetteer.lookup("ul Bitwy  Warszawskiej 1920") == frozenset({"PL"})
+            assert "5 května" in gazetteer
+            assert "Winterallee" not in gazetteer
+            assert "Am" not in gazetteer
+        finally:
+            gazetteer.close()
+
+    def test_empty(self, tmp_path):
+        path = str(tmp_path / "empty.gaz")
+        build_gazetteer([], path)
+        assert Gazetteer(path).lookup("Prosta") is None
+
+    def test_invalid_file(self, tmp_path):
+        path = tmp_path / "streets.csv"
+        path.write_text("PL,Prosta\n")
+        with pytest.raises(GazetteerError):
+            Gazetteer(str(path))
+        path.write_bytes(b"")
+        with pytest.raises(GazetteerError):
+            Gazetteer(str(path))
+
+    def test_truncated_file(self, gazetteer_path):
+        with open(gazetteer_path, "rb") as file:
+            data = file.read()
+        with open(gazetteer_path, "wb") as file:
+            file.write(data[:-1])
+        with pytest.raises(GazetteerError):
+            Gazetteer(gazetteer_path)
+
+    def test_rebuild_keeps_mapped_file(self, gazetteer_path):
+        gazetteer = Gazetteer(gazetteer_path)
+        try:
+            build_gazetteer([("PL", "Prosta")], gazetteer_path)
+            assert gazetteer.lookup("Am Bächle") == frozenset({"DE"})
+            assert len(Gazetteer(gazetteer_path)) == 1
+        finally:
+            gazetteer.close()
+
+    @pytest.mark.usefixtures("parser_gazetteer")
+    @pytest.mark.parametrize(
+        "address, expected_result",
+        [
+            ("5. května 798/62", {"street": "5 května", "house_number": "798/62"}),
+            (
+                "ul. Bitwy Warszawskiej 1920 15",
+                {"street": "ul Bitwy Warszawskiej 1920", "house_number": "15"},
+            ),
+            ("12 b Prosta", {"street": "Prosta", "house_number": "12 b"}),
+            ("Am Bächle 23", {"street": "Am Bächle", "house_number": "23"}),
+            ("Prosta nr 12", {"street": "Prosta", "house_number": "12"}),
+            # rest of the address is not a house number, known street name is not split off
+            ("Prosta Warszawa 12", {"street": "Prosta Warszawa", "house_number": "12"}),
+            # unknown streets fall back to pattern matching
+            ("Winterallee 3", {"street": "Winterallee", "house_number": "3"}),
+        ]
+    )
+    def test_parse(self, address: str, expected_result):
+        assert AddressParser().parse(address) == expected_result
+        parsed = AddressParser().parse_many([address])
+        assert (parsed.street[0], parsed.house_number[0], parsed.status[0]) == (
+            expected_result["street"], expected_result["house_number"], ParseStatus.OK
+        )
+
+    def test_rules_normalization(self, tmp_path):
+        document = builtin_rules_document("custom-1")
+        document["abbreviations"] = {"al": "aleja"}
+        rules = tmp_path / "rules.json"
+        rules.write_text(json.dumps(document), encoding="utf-8")
+        streets = tmp_path / "streets.csv"
+        streets.write_text("PL,al. Jerozolimskie\n", encoding="utf-8")
+        path = str(tmp_path / "streets.gaz")
+        try:
+            assert main([str(streets), path, "--rules", str(rules)]) == 0
+            # keys are normalized with abbreviations of rules gazetteer is used with
+            load_gazetteer(path)
+            assert AddressParser.parse("12 b al. Jerozolimskie") == {
+                "street": "aleja Jerozolimskie", "house_number": "12 b"
+            }
+            assert AddressParser.gazetteer.lookup("al. Jerozolimskie") == frozenset({"PL"})
+        finally:
+            load_gazetteer(None)
+            load_rules(None)
+        assert AddressParser.rules is BUILTIN_RULES
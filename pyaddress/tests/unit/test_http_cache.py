@@ -0,0 +1,62 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints.addresses import _etag_matches
+from app.factory import create_application
+from app.services.address import AddressService, result_etag
+
+
+_PATH = "/api/v1/addresses/extract/address}"
+
+
+@pytest.fixture(name="client", scope="module")
+def fixture_client():
+    return TestClient(create_application())
+
+
+class TestResultEtag:
+
+    def test_depends_on_normalized_address_and_country(self):
+        assert result_etag("Winterallee 3") == result_etag("  Winterallee   3 ")
+        assert result_etag("Winterallee 3") != result_etag("Winterallee 4")
+        assert result_etag("Winterallee 3", "de") == result_etag("Winterallee 3", "DE")
+        assert result_etag("Winterallee 3", "DE") != result_etag("Winterallee 3")
+
+    def test_strong_quoted(self):
+        etag = result_etag("Winterallee 3")
+        assert etag.startswith('"') and etag.endswith('"')
+
+    @pytest.mark.parametrize(
+        "header, expected",
+        [('"a"', True), ('W/"a"', True), ('"b", "a"', True), ("*", True), ('"b"', False)],
+    )
+    def test_etag_matches(self, header: str, expected: bool):
+        assert _etag_matches(header, '"a"') is expected
+
+
+class TestHttpCaching:
+
+    def test_response_headers(self, client):
+        response = client.get(_PATH, params={"address": "Winterallee 3"})
+        assert response.status_code == 200
+        assert response.headers["etag"] == result_etag("Winterallee 3")
+        assert response.headers["cache-control"].startswith("public, max-age=")
+
+    def test_not_found_is_cacheable(self, client):
+        response = client.get(_PATH, params={"address": "Winterallee"})
+        assert response.status_code == 404
+        assert response.headers["etag"] == result_etag("Winterallee")
+
+    def test_not_modified_skips_parsing(self, client, monkeypatch):
+        etag = client.get(_PATH, params={"address": "Winterallee 3"}).headers["etag"]
+
+        def extract(*args):
+            raise AssertionError("address parsed")
+
+        monkeypatch.setattr(AddressService, "extract", extract)
+        response = client.get(
+            _PATH, params={"address": "Winterallee 3"}, headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert not response.content
+        assert response.headers["etag"] == etag
@@ -0,0 +1,25 @@
+import asyncio
+
+import pytest
+
+from benchmarks.load import check, percentile, run_load
+
+
+class TestLoad:
+
+    @pytest.mark.parametrize(
+        "fraction, expected", [(0.5, 50), (0.9, 90), (0.99, 99), (0.999, 100), (1.0, 100)]
+    )
+    def test_percentile(self, fraction: float, expected: int):
+        assert percentile(list(range(1, 101)), fraction) == expected
+
+    @pytest.mark.parametrize("rate", [None, 1000.0])
+    def test_in_process(self, rate):
+        corpus = ["Winterallee 3", "Ave #12", "4, rue de la revolution"]
+        report = asyncio.run(run_load(corpus, requests=30, concurrency=4, rate=rate))
+        assert report["errors"] == 0
+        assert report["latency"]["success"]["count"] == 20
+        assert report["latency"]["failure"]["count"] == 10
+        assert report["throughput_rps"] > 0
+        assert check(report, max_p99_ms=None, min_rps=None) == []
+        assert check(report, max_p99_ms=0.0, min_rps=None)
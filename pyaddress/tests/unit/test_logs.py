@@ -0,0 +1,129 @@
+import asyncio
+import io
+import json
+import logging
+import queue
+
+import pytest
+
+from app.logs import (
+    ACCESS_LOGGER,
+    AccessLogMiddleware,
+    DroppingQueueHandler,
+    JsonFormatter,
+    LogWriter,
+    configure_logging,
+    shutdown_logging,
+)
+
+
+class _CountingStream(io.StringIO):
+
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        self.writes += 1
+        return super().write(text)
+
+
+@pytest.fixture(name="stream")
+def fixture_stream():
+    stream = _CountingStream()
+    handler = configure_logging(stream=stream)
+    yield stream
+    shutdown_logging()
+    logging.getLogger().removeHandler(handler)
+
+
+def _record(message: str, *args, **extra) -> logging.LogRecord:
+    record = logging.makeLogRecord({"name": "app", "levelname": "INFO", "msg": message})
+    record.args = args
+    record.__dict__.update(extra)
+    return record
+
+
+class TestLogs:
+
+    def test_json_formatter(self):
+        document = json.loads(JsonFormatter().format(_record("parsed %d", 3, status=200)))
+        assert document["message"] == "parsed 3"
+        assert document["status"] == 200
+        assert document["logger"] == "app"
+
+    def test_pipeline_writes_in_background(self, stream):
+        logging.getLogger("app").info("parsed %s", "Winterallee 3")
+        shutdown_logging()
+        assert " - app - INFO - parsed Winterallee 3" in stream.getvalue()
+
+    def test_writer_batches_records(self):
+        log_queue: queue.Queue = queue.Queue()
+        for number in range(100):
+            log_queue.put(_record("record %d", number))
+        stream = _CountingStream()
+        writer = LogWriter(log_queue, logging.Formatter("%(message)s"), stream)
+        writer.start()
+        writer.stop()
+        assert stream.getvalue().splitlines() == [f"record {number}" for number in range(100)]
+        assert stream.writes == 1
+
+    def test_full_queue_drops_records(self):
+        handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+        handler.emit(_record("first"))
+        handler.emit(_record("second"))
+        assert handler.dropped == 1
+        assert handler.queue.get_nowait().msg == "first"
+
+
+def _application(status: int):
+    async def application(scope, receive, send):
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+    return application
+
+
+def _request(middleware: AccessLogMiddleware, path: str = "/", **scope_fields) -> None:
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": path, "client": ("127.0.0.1", 1)}
+    scope.update(scope_fields)
+    asyncio.run(middleware(scope, receive, send))
+
+
+class TestAccessLogMiddleware:
+
+    def test_samples_successes(self, caplog):
+        middleware = AccessLogMiddleware(_application(200), sample_rate=3)
+        with caplog.at_level(logging.INFO, logger=ACCESS_LOGGER):
+            for _ in range(6):
+                _request(middleware)
+        assert len(caplog.records) == 2
+        assert caplog.records[0].status == 200
+
+    def test_logs_failed_and_slow_requests(self, caplog):
+        with caplog.at_level(logging.INFO, logger=ACCESS_LOGGER):
+            for _ in range(3):
+                _request(AccessLogMiddleware(_application(404), sample_rate=0))
+            _request(AccessLogMiddleware(_application(200), sample_rate=0, slow_ms=0.0))
+        assert [record.status for record in caplog.records] == [404, 404, 404, 200]
+        assert caplog.records[0].getMessage().startswith('127.0.0.1:1 - "GET /" 404')
+
+    @pytest.mark.parametrize(
+        "raw_path",
+        [b"/api/v1/addresses/extract", b"/api/v1/addresses/extract?address=Winterallee%203"],
+    )
+    def test_logs_query_string_once(self, caplog, raw_path: bytes):
+        middleware = AccessLogMiddleware(_application(404), sample_rate=0)
+        with caplog.at_level(logging.INFO, logger=ACCESS_LOGGER):
+            _request(
+                middleware,
+                "/api/v1/addresses/extract",
+                raw_path=raw_path,
+                query_string=b"address=Winterallee%203",
+            )
+        assert caplog.records[0].path == "/api/v1/addresses/extract?address=Winterallee%203"
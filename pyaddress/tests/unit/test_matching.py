@@ -0,0 +1,111 @@
+import os
+import pickle
+import random
+import sys
+
+import pytest
+
+from app.services.matching import (
+    MAGIC,
+    PICKLE_PROTOCOL,
+    AddressIndex,
+    AddressIndexError,
+    _grams,
+    canonical_house_number,
+)
+
+
+RECORDS = [
+    (1, "Winterallee", "3"),
+    (2, "Auf der Vogelwiese", "23 b"),
+    (3, "Hauptstr.", "5"),
+    (4, "Hauptstrasse", "5"),
+    (5, "Hauptstrasse", "5a"),
+    (6, "Calle 39", "No 1540"),
+    (7, "Sommerallee", "3"),
+]
+
+
+@pytest.fixture
+def index():
+    index = AddressIndex()
+    assert index.add_many(RECORDS) == len(RECORDS)
+    return index
+
+
+class TestAddressIndex:
+
+    @pytest.mark.parametrize(
+        "house_number, expected", [("23 b", "23b"), ("No 1540", "1540"), ("nr 43/45", "43/45")]
+    )
+    def test_canonical_house_number(self, house_number: str, expected: str):
+        assert canonical_house_number(house_number) == expected
+
+    def test_match(self, index):
+        assert [(match.id, match.score) for match in index.match("HAUPTSTRASSE", "5")] == [
+            (3, 1.0), (4, 1.0), (5, 0.9)
+        ]
+        assert [match.id for match in index.match("Winteralle", "3")] == [1]
+        assert [match.id for match in index.match("Winterallee", "3", min_similarity=0.5)] == [
+            1, 7
+        ]
+        assert index.match("Winterallee", "4") == []
+        assert index.match("Calle 39", "1540")[0].house_number == "1540"
+        assert [match.id for match in index.match_address("Auf der Vogelwiese 23B")] == [2]
+        with pytest.raises(ValueError):
+            index.match("Winterallee", "3", min_similarity=0)
+
+    def test_duplicates(self, index):
+        assert index.add_address(8, "Winterallee 3")
+        assert not index.add_address(9, "Ave #12")
+        assert sorted(index.duplicates()) == [[1, 8], [3, 4]]
+
+    def test_fuzzy_lookup_is_exhaustive(self):
+        rng = random.Random(0)
+        streets = [
+            "".join(rng.choice("aeiklmnorst") for _ in range(rng.randint(4, 14)))
+            for _ in range(300)
+        ]
+        index = AddressIndex()
+        index.add_many((position, street, "1") for position, street in enumerate(streets))
+        for query in streets[:30]:
+            query = query[:-1] + "x"
+            expected = set()
+            for street in set(streets):
+                grams, candidate_grams = _grams(query), _grams(street)
+                shared = len(grams & candidate_grams)
+                if 2 * shared / (len(grams) + len(candidate_grams)) >= 0.6:
+                    expected.add(street)
+            matches = index.match(query, "1", k=len(streets), min_similarity=0.6)
+            assert {match.street for match in matches} == expected
+
+    def test_save_load(self, index, tmp_path):
+        path = str(tmp_path / "addresses.idx")
+        index.save(path)
+        loaded = AddressIndex.load(path)
+        assert len(loaded) == len(index) and loaded.streets == index.streets
+        assert loaded.match("Hauptstrasse", "5") == index.match("Hauptstrasse", "5")
+        loaded.add(8, "Hauptstrasse", "5")
+        assert [match.id for match in loaded.match("Hauptstrasse", "5")] == [3, 4, 8, 5]
+
+        (tmp_path / "broken.idx").write_bytes(b"not an index")
+        with pytest.raises(AddressIndexError):
+            AddressIndex.load(str(tmp_path / "broken.idx"))
+
+    @pytest.mark.parametrize(
+        "content",
+        [
+            MAGIC,
+            MAGIC + pickle.dumps(("little", [], []), protocol=PICKLE_PROTOCOL),
+            MAGIC + pickle.dumps(
+                (sys.byteorder, [], [], b"\0", {}, b"", [], b"", {}), protocol=PICKLE_PROTOCOL
+            ),
+            # classes and functions are never unpickled
+            MAGIC + pickle.dumps(os.getpid, protocol=PICKLE_PROTOCOL),
+        ]
+    )
+    def test_load_malformed(self, tmp_path, content: bytes):
+        path = tmp_path / "broken.idx"
+        path.write_bytes(content)
+        with pytest.raises(AddressIndexError, match="malformed"):
+            AddressIndex.load(str(path))
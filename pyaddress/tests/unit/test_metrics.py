@@ -0,0 +1,99 @@
+import pytest
+
+from app.metrics import PARSE_FAILURES, PARSE_STAGE_SECONDS, Counter, Gauge, Histogram, \
+    MetricsRegistry, collect_exited, enable_metrics, render_directory, write_snapshot
+from app.services.address import AddressParser, AddressServiceError
+
+
+class TestMetricsRegistry:
+
+    def test_render(self):
+        registry = MetricsRegistry()
+        counter = registry.register(Counter("requests_total", "Requests.", ("outcome",)))
+        histogram = registry.register(Histogram("latency_seconds", "Latency.", buckets=(0.1, 1)))
+        registry.register(Gauge("size", "Size.", callback=lambda: {(): 3}))
+        counter.inc("success")
+        counter.inc("success", amount=2)
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        assert registry.render().splitlines() == [
+            "# HELP requests_total Requests.",
+            "# TYPE requests_total counter",
+            'requests_total{outcome="success"} 3',
+            "# HELP latency_seconds Latency.",
+            "# TYPE latency_seconds histogram",
+            'latency_seconds_bucket{le="0.1"} 1',
+            'latency_seconds_bucket{le="1"} 2',
+            'latency_seconds_bucket{le="+Inf"} 2',
+            "latency_seconds_sum 0.55",
+            "latency_seconds_count 2",
+            "# HELP size Size.",
+            "# TYPE size gauge",
+            "size 3",
+        ]
+
+
+
+def _worker_registry(requests: int, size: int) -> MetricsRegistry:
+    registry = MetricsRegistry()
+    counter = registry.register(Counter("requests_total", "Requests.", ("outcome",)))
+    histogram = registry.register(Histogram("latency_seconds", "Latency.", buckets=(0.1, 1)))
+    registry.register(Gauge("size", "Size.", callback=lambda: {(): size}))
+    counter.inc("success", amount=requests)
+    histogram.observe(0.05)
+    return registry
+
+
+class TestMetricsDirectory:
+
+    def test_merged_workers(self, tmp_path):
+        directory = str(tmp_path)
+        write_snapshot(directory, _worker_registry(requests=2, size=3), pid=11)
+        write_snapshot(directory, _worker_registry(requests=5, size=7), pid=12)
+        lines = render_directory(directory).splitlines()
+        assert 'requests_total{outcome="success"} 7' in lines
+        assert 'latency_seconds_bucket{le="0.1"} 2' in lines
+        assert "latency_seconds_count 2" in lines
+        assert 'size{pid="11"} 3' in lines and 'size{pid="12"} 7' in lines
+
+    def test_exited_worker_counts_are_kept(self, tmp_path):
+        directory = str(tmp_path)
+        write_snapshot(directory, _worker_registry(requests=2, size=3), pid=11)
+        collect_exited(directory, 11)
+        write_snapshot(directory, _worker_registry(requests=5, size=7), pid=11)
+        collect_exited(directory, 11)
+        write_snapshot(directory, _worker_registry(requests=1, size=1), pid=13)
+        lines = render_directory(directory).splitlines()
+        assert 'requests_total{outcome="success"} 8' in lines
+        assert "latency_seconds_count 3" in lines
+        # gauges of exited workers are dropped
+        assert [line for line in lines if line.startswith("size{")] == ['size{pid="13"} 1']
+        assert sorted(path.name for path in tmp_path.glob("*.json")) == [
+            "13.json", "exited.json"
+        ]
+
+
+class TestParseInstrumentation:
+
+    @pytest.fixture
+    def metrics_enabled(self):
+        enable_metrics()
+        yield
+        enable_metrics(False)
+
+    def test_disabled(self):
+        count = PARSE_STAGE_SECONDS.count("scan")
+        AddressParser().parse("Winterallee 3")
+        assert PARSE_STAGE_SECONDS.count("scan") == count
+
+    @pytest.mark.usefixtures("metrics_enabled")
+    def test_enabled(self):
+        counts = [PARSE_STAGE_SECONDS.count(stage) for stage in ("normalize", "scan", "match")]
+        failures = PARSE_FAILURES.value("unsupported_pattern")
+        AddressParser().parse("Winterallee 3")
+        with pytest.raises(AddressServiceError):
+            AddressParser().parse("Winterallee")
+        assert [
+            PARSE_STAGE_SECONDS.count(stage) for stage in ("normalize", "scan", "match")
+        ] == [counts[0] + 2, counts[1] + 2, counts[2] + 1]
+        assert PARSE_FAILURES.value("unsupported_pattern") == failures + 1
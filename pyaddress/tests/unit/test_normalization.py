@@ -0,0 +1,42 @@
+import pytest
+
+from app.services.address import AddressParser, AddressService
+from app.services.cache import LRUCache
+from app.services.normalization import normalize_address
+
+
+class TestNormalization:
+
+    @pytest.mark.parametrize(
+        "address, expected",
+        [
+            ("Winterallee 3", "Winterallee 3"),
+            ("  4, rue de la revolution ", "4 rue de la revolution"),
+            ("Calle Aduana,29", "Calle Aduana 29"),
+            ("Winterallee 3.5", "Winterallee 35"),
+            ("U.S.A. Rd. 1,920", "USA Rd 1920"),
+            ("ul.\tBitwy  Warszawskiej 1920", "ul Bitwy Warszawskiej 1920"),
+            ("Bahnhofstr. 12", "Bahnhofstrasse 12"),
+            ("Str. 12", "Strasse 12"),
+            ("HAUPTSTR. 5", "HAUPTSTRASSE 5"),
+            ("Distr. 4", "Distr 4"),
+            ("Bd. Saint-Michel 4", "Boulevard Saint-Michel 4"),
+            # decomposed umlaut, full-width digit and non-breaking space
+            ("Am Ba\u0308chle\u00a0\uff12", "Am B\u00e4chle 2"),
+        ],
+    )
+    def test_normalize_address(self, address: str, expected: str):
+        assert normalize_address(address) == expected
+
+    def test_internal_punctuation(self, monkeypatch):
+        monkeypatch.setattr(AddressParser, "internal_punctuation", ".,;")
+        assert AddressParser.normalize("Winterallee;3") == "Winterallee 3"
+        assert AddressParser.parse("Winterallee;3") == {
+            "street": "Winterallee", "house_number": "3"
+        }
+
+    def test_cache_shares_normalized_form(self):
+        service = AddressService(cache=LRUCache(max_size=10))
+        for address in ("Bahnhofstr. 12", "Bahnhofstrasse  12", "Bahnhofstrasse, 12"):
+            assert service.extract_address_components(address).street == "Bahnhofstrasse"
+        assert len(service.cache) == 1
@@ -0,0 +1,73 @@
+import sys
+
+import pytest
+
+from app.services.address import AddressParser, AddressService, ParseStatus, get_rule_pack
+from app.services.cache import LRUCache
+from app.services.rules import RULE_PACKS, detect_country
+
+
+class TestRulePacks:
+
+    @pytest.mark.parametrize(
+        "words, country",
+        [
+            (["ul", "prosta"], "PL"),
+            (["rue", "de", "la", "revolution"], "FR"),
+            (["calle", "aduana"], "ES"),
+            (["broadway", "av"], "US"),
+            (["winterallee"], "DE"),
+            (["musterstrasse"], "DE"),
+            (["května"], "CZ"),
+            (["aleja", "krakowska"], "PL"),
+            (["downing"], None),
+            # too common elsewhere to identify Polish or Czech addresses
+            (["pl", "vendome"], None),
+            (["al", "farabi"], None),
+            (["villanova"], None),
+            (["iowa"], None),
+            ([], None),
+        ],
+    )
+    def test_detect_country(self, words, country):
+        assert detect_country(words) == country
+
+    def test_rule_packs_compile(self):
+        for country in RULE_PACKS:
+            assert get_rule_pack(country)
+            assert RULE_PACKS[country] in sys.modules
+        assert get_rule_pack("XX") is None
+
+    def test_detected_pack_rules(self):
+        assert AddressParser.parse("5. května 798/62") == {
+            "street": "5 května", "house_number": "798/62"
+        }
+        assert AddressParser.parse("ul Bitwy Warszawskiej 1920 nr 8") == {
+            "street": "ul Bitwy Warszawskiej 1920", "house_number": "8"
+        }
+
+    def test_only_house_number_markers_are_dropped(self):
+        assert AddressParser.parse("ul Prosta 5 NR 8") == {
+            "street": "ul Prosta 5", "house_number": "8"
+        }
+        # "lok" (premises) is not a house number marker, it is never silently dropped
+        result = AddressParser.parse_result("ul Prosta 5 lok 8")
+        assert result.status is ParseStatus.UNSUPPORTED_PATTERN
+        assert list(AddressParser.parse_many(["ul Prosta 5 lok 8"]).status) == [
+            ParseStatus.UNSUPPORTED_PATTERN
+        ]
+
+    def test_country_hint(self):
+        # hint skips detection, generic rules are the fallback of hinted pack
+        assert AddressParser.parse("ul Bitwy Warszawskiej 1920 nr 8", country="de") == {
+            "street": "ul Bitwy Warszawskiej 1920", "house_number": "nr 8"
+        }
+        parsed = AddressParser.parse_many(["ul Bitwy Warszawskiej 1920 nr 8"], country="PL")
+        assert parsed.house_number == ["8"]
+
+    def test_service_country_hint_cache(self):
+        service = AddressService(cache=LRUCache(max_size=10))
+        address = "ul Bitwy Warszawskiej 1920 nr 8"
+        assert service.extract_address_components(address).house_number == "8"
+        assert service.extract_address_components(address, "DE").house_number == "nr 8"
+        assert len(service.cache) == 2
@@ -0,0 +1,157 @@
+import json
+import os
+
+import pytest
+
+from app.services import address
+from app.services.address import (
+    BUILTIN_RULES,
+    AddressParser,
+    AddressService,
+    ParseStatus,
+    parse_batch,
+    ruleset_version,
+)
+from app.services.cache import LRUCache
+from app.services.coalescer import Coalescer
+from app.services.ruleset import (
+    RulesError,
+    RulesReloader,
+    build_rules,
+    builtin_rules_document,
+    load_rules,
+    read_rules,
+    _on_swap,
+)
+from app.settings import initialize_settings
+
+
+_ADDRESSES = (
+    "Winterallee 3",
+    "Auf der Vogelwiese 23 b",
+    "4, rue de la revolution",
+    "Calle 39 No 1540",
+    "ul. Bitwy Warszawskiej 1920 nr 43/45",
+    "Bahnhofstr. 12",
+)
+
+# only alphabetic street followed by house number is supported
+_STRICT = {
+    "version": "strict-1",
+    "rules": [{"pattern": ["ALPHA", "NUM"], "street": [0], "house_number": [1]}],
+    "rule_packs": {},
+    "abbreviations": {"al": "aleja"},
+    "suffix_abbreviations": {},
+}
+
+
+@pytest.fixture(autouse=True)
+def fixture_restore_rules():
+    yield
+    AddressParser.rules = BUILTIN_RULES
+
+
+def _write(path, document) -> str:
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(document, file)
+    return str(path)
+
+
+class TestRulesDataFile:
+
+    def test_builtin_document_parses_same(self):
+        expected = [AddressParser.parse_result(address).as_dict() for address in _ADDRESSES]
+        AddressParser.rules = build_rules(builtin_rules_document("2"))
+        assert ruleset_version() == "2"
+        assert [AddressParser.parse_result(address).as_dict() for address in _ADDRESSES] == (
+            expected
+        )
+
+    def test_load_rules(self, tmp_path):
+        rules = load_rules(_write(tmp_path / "rules.json", _STRICT))
+        assert AddressParser.rules is rules
+        assert ruleset_version() == "strict-1"
+        assert AddressParser.parse("Winterallee 3") == {
+            "street": "Winterallee", "house_number": "3"
+        }
+        assert not AddressParser.parse_result("4, rue de la revolution").ok
+        assert AddressParser.normalize("Al. Jana Pawla 2") == "Aleja Jana Pawla 2"
+        assert AddressParser.normalize("Bahnhofstr. 12") == "Bahnhofstr 12"
+        load_rules(None)
+        assert AddressParser.rules is BUILTIN_RULES
+
+    @pytest.mark.parametrize(
+        "document",
+        [
+            {"rules": []},
+            {"version": ""},
+            {"version": "2", "rules": [{"pattern": ["WORD"], "street": [0], "house_number": []}]},
+            {"version": "2", "rules": [{"pattern": ["ALPHA", "NUM"], "street": [0, 2],
+                                        "house_number": [1]}]},
+            {"version": "2", "country_keywords": {"rue": 1}},
+        ],
+    )
+    def test_malformed(self, document):
+        with pytest.raises(RulesError):
+            build_rules(document)
+
+    def test_malformed_json(self, tmp_path):
+        path = tmp_path / "rules.json"
+        path.write_text("{", encoding="utf-8")
+        with pytest.raises(RulesError):
+            read_rules(str(path))
+
+
+class TestRulesReloader:
+
+    def test_reload_on_change(self, tmp_path):
+        path = _write(tmp_path / "rules.json", _STRICT)
+        swapped = []
+        reloader = RulesReloader(path, on_swap=swapped.append)
+        assert reloader.reload()
+        assert not reloader.reload()  # file did not change
+        # changed file with the active version is not swapped in
+        _write(path, dict(_STRICT, rule_packs={"DE": []}))
+        os.utime(path, ns=(1, 1))
+        assert not reloader.reload()
+        _write(path, builtin_rules_document("strict-2"))
+        os.utime(path, ns=(2, 2))
+        assert reloader.reload()
+        assert [rules.version for rules in swapped] == ["strict-1", "strict-2"]
+        assert AddressParser.parse_result("4, rue de la revolution").ok
+
+    def test_broken_file_keeps_rules(self, tmp_path):
+        path = tmp_path / "rules.json"
+        path.write_text("[]", encoding="utf-8")
+        assert not RulesReloader(str(path)).reload()
+        assert not RulesReloader(str(tmp_path / "missing.json")).reload()
+        assert AddressParser.rules is BUILTIN_RULES
+
+    def test_cached_results_of_previous_rules_are_not_used(self, tmp_path):
+        service = AddressService(cache=LRUCache(max_size=10))
+        assert service.extract("4, rue de la revolution").ok
+        load_rules(_write(tmp_path / "rules.json", _STRICT))
+        assert service.extract("4, rue de la revolution").status is (
+            ParseStatus.UNSUPPORTED_PATTERN
+        )
+
+    def test_coalescer_worker_processes(self, tmp_path, monkeypatch):
+        initialize_settings()
+        coalescer = Coalescer(parse_batch, window=0.0, max_batch=1, processes=1)
+        monkeypatch.setattr(address, "_ADDRESS_COALESCER", coalescer)
+        service = AddressService(cache=LRUCache(max_size=10), coalescer=coalescer)
+        try:
+            assert service.extract("Winterallee 3").ok  # starts worker with built-in rules
+            # results of workers running previous rules are neither returned nor cached
+            load_rules(_write(tmp_path / "strict.json", _STRICT))
+            worker_result = coalescer.submit(("4, rue de la revolution", None)).result()
+            assert worker_result[3] == BUILTIN_RULES.version
+            result = service.extract("4, rue de la revolution")
+            assert result.status is ParseStatus.UNSUPPORTED_PATTERN
+            assert service.extract("4, rue de la revolution") is result
+            # reloader replaces workers, so that they parse with reloaded rules
+            path = _write(tmp_path / "rules.json", dict(_STRICT, version="strict-2"))
+            assert RulesReloader(path, on_swap=_on_swap).reload()
+            assert coalescer.submit(("Winterallee 3", None)).result()[3] == "strict-2"
+        finally:
+            coalescer.close()
@@ -0,0 +1,32 @@
+import sys
+
+from app.metrics import REGISTRY, enable_metrics
+from app.server import bind_socket, warm_up
+from app.services.rules import RULE_PACKS
+from app.settings import Settings
+
+
+class TestServer:
+
+    def test_warm_up_loads_rule_packs(self):
+        warm_up()
+        assert all(module in sys.modules for module in RULE_PACKS.values())
+
+    def test_warm_up_is_not_instrumented(self):
+        enable_metrics()
+        try:
+            snapshot = REGISTRY.snapshot()
+            warm_up()
+            # forked workers of idle server report no parses
+            assert REGISTRY.snapshot() == snapshot
+            assert REGISTRY.enabled
+        finally:
+            enable_metrics(False)
+
+    def test_bind_socket(self):
+        sock = bind_socket(Settings(SERVER_HOST="127.0.0.1", SERVER_PORT=0))
+        try:
+            assert sock.getsockname()[1] > 0
+            assert sock.get_inheritable()
+        finally:
+            sock.close()
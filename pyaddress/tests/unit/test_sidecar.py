@@ -0,0 +1,121 @@
+import asyncio
+import os
+import socket
+import threading
+
+import pytest
+
+from app.services.address import AddressService
+from app.sidecar.client import SidecarClient, SidecarError
+from app.sidecar.protocol import (
+    BATCH,
+    DEFAULT_MAX_FRAME,
+    ERROR,
+    HEADER,
+    PARSE,
+    ProtocolError,
+    SidecarResult,
+    decode_request,
+    decode_results,
+    encode_batch,
+    encode_frame,
+    encode_item,
+    encode_result,
+    split_frames,
+)
+from app.sidecar.server import bind_sidecar_socket, start_sidecar
+
+
+class TestProtocol:
+
+    def test_request_round_trip(self):
+        assert decode_request(PARSE, encode_item("Winterallee 3", "DE")) == [
+            ("Winterallee 3", "DE")
+        ]
+        body = encode_batch([encode_item("Winterallee 3"), encode_item("ul. Żółta 5", "PL")])
+        assert decode_request(BATCH, body) == [("Winterallee 3", None), ("ul. Żółta 5", "PL")]
+
+    def test_results_round_trip(self):
+        body = encode_batch([encode_result(0, "Winterallee", "3"), encode_result(2, None, None)])
+        assert decode_results(BATCH, body) == [
+            SidecarResult(0, "Winterallee", "3"), SidecarResult(2, None, None)
+        ]
+        assert decode_results(PARSE, encode_result(0, "Winterallee", "3"))[0].ok
+
+    def test_split_frames_keeps_partial_frame(self):
+        first = encode_frame(1, PARSE, encode_item("Winterallee 3"))
+        second = encode_frame(2, PARSE, encode_item("Calle 39 No 1540"))
+        buffer = bytearray(first + second[:5])
+        assert split_frames(buffer, DEFAULT_MAX_FRAME) == [(1, PARSE, first[HEADER.size:])]
+        assert buffer == second[:5]
+        buffer += second[5:]
+        assert split_frames(buffer, DEFAULT_MAX_FRAME) == [(2, PARSE, second[HEADER.size:])]
+        assert not buffer
+
+    def test_malformed_requests(self):
+        with pytest.raises(ProtocolError):
+            split_frames(bytearray(encode_frame(1, PARSE, b"x" * 100)), max_frame=10)
+        with pytest.raises(ProtocolError):
+            decode_request(PARSE, encode_item("Winterallee 3")[:-1])
+        with pytest.raises(ProtocolError):
+            decode_request(7, b"")
+
+
+@pytest.fixture(name="sidecar_path")
+def fixture_sidecar_path(tmp_path):
+    path = str(tmp_path / "sidecar.sock")
+    sock = bind_sidecar_socket(path)
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(start_sidecar(sock, AddressService()))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield path
+    loop.call_soon_threadsafe(server.close)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+    loop.close()
+    sock.close()
+    os.unlink(path)
+
+
+class TestSidecar:
+
+    def test_parse(self, sidecar_path):
+        with SidecarClient(path=sidecar_path) as client:
+            assert client.parse("Winterallee 3") == SidecarResult(0, "Winterallee", "3")
+            assert not client.parse("Winterallee").ok
+
+    def test_parse_many_pipelines_batches(self, sidecar_path):
+        addresses = [f"Winterallee {number}" for number in range(1, 1000)]
+        with SidecarClient(path=sidecar_path, batch_size=16, pipeline=4) as client:
+            results = client.parse_many(addresses)
+        assert [result.house_number for result in results] == [
+            str(number) for number in range(1, 1000)
+        ]
+
+    def test_malformed_request_closes_connection(self, sidecar_path):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(5)
+            sock.connect(sidecar_path)
+            sock.sendall(encode_frame(1, 7, b""))
+            response = b""
+            while chunk := sock.recv(4096):
+                response += chunk
+        assert HEADER.unpack_from(response)[2] == ERROR
+
+    def test_client_requires_address(self):
+        with pytest.raises(ValueError):
+            SidecarClient()
+
+    def test_connection_refused(self, tmp_path):
+        client = SidecarClient(path=str(tmp_path / "missing.sock"))
+        with pytest.raises(OSError):
+            client.parse("Winterallee 3")
+
+    def test_error_frame_raises(self, sidecar_path):
+        client = SidecarClient(path=sidecar_path)
+        with pytest.raises(SidecarError, match="unknown request kind"):
+            with client._connection() as connection:  # pylint: disable=protected-access
+                connection.receive(connection.send(7, b""))
+        assert client.parse("Winterallee 3").ok  # broken connection was not pooled
+        client.close()
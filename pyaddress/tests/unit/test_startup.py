@@ -0,0 +1,21 @@
+from benchmarks.startup import measure_import, parse_importtime
+
+
+class TestStartup:
+
+    def test_parse_importtime(self):
+        entries = parse_importtime(
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   app.services\n"
+            "import time:       300 |        420 | app.services.address\n"
+        )
+        assert [(entry.module, entry.depth) for entry in entries] == [
+            ("app.services", 1), ("app.services.address", 0)
+        ]
+        assert entries[1].cumulative_us == 420
+
+    def test_library_import_path(self):
+        report = measure_import("app.services.address", top=3)
+        assert not report["web_stack"]
+        assert report["total_ms"] > 0
+        assert len(report["slowest"]) == 3
@@ -0,0 +1,175 @@
+import asyncio
+import json
+from typing import Any, List
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.streaming import StreamDecodeError, iter_json_batches, iter_json_items
+from app.factory import create_application
+from app.services import address
+from app.services.address import parse_batch
+from app.services.coalescer import Coalescer
+
+
+async def _chunks(chunks: List[bytes]):
+    for chunk in chunks:
+        yield chunk
+
+
+def _decode_limited(chunks: List[bytes], **kwargs) -> List[Any]:
+    async def collect():
+        return [item async for item in iter_json_items(_chunks(chunks), **kwargs)]
+    return asyncio.run(collect())
+
+
+def _decode(chunks: List[bytes]) -> List[Any]:
+    return _decode_limited(chunks)
+
+
+class TestIterJsonItems:
+
+    @pytest.mark.parametrize(
+        "chunks, expected",
+        [
+            ([b'["Winterallee 3", "Am B\xc3\xa4chle 2"]'], ["Winterallee 3", "Am Bächle 2"]),
+            ([b' [ "a" ', b', 1', b'2 , "b"', b"]\n"], ["a", 12, "b"]),
+            ([b"[1.5e", b"10, -", b"2]"], [1.5e10, -2]),
+            ([b"[1.5e-", b"1, tr", b"ue]"], [0.15, True]),
+            ([b'"Am B\xc3', b'\xa4chle 2"\n"Winterallee 3"'], ["Am Bächle 2", "Winterallee 3"]),
+            ([b'"a"\r\n\r\n"b"\n'], ["a", "b"]),
+            ([b"[]"], []),
+            ([b""], []),
+        ]
+    )
+    def test_decode(self, chunks: List[bytes], expected: List[Any]):
+        assert _decode(chunks) == expected
+
+    @pytest.mark.parametrize(
+        "chunks",
+        [
+            [b'["a"'], [b'["a" "b"]'], [b'["a"] "b"'], [b'["a", {bad}'], [b'"\xff"'],
+            [b'["a",]'], [b'["a",', b" ]"], [b"[,]"], [b"[1.5x]"],
+        ],
+    )
+    def test_malformed(self, chunks: List[bytes]):
+        with pytest.raises(StreamDecodeError):
+            _decode(chunks)
+
+    def test_malformed_array_fails_early(self):
+        def chunks():
+            yield b'["a", {bad}, "Winterallee 3", '
+            raise AssertionError("malformed body read on")
+
+        async def collect():
+            async def body():
+                for chunk in chunks():
+                    yield chunk
+            return [item async for item in iter_json_items(body())]
+
+        with pytest.raises(StreamDecodeError):
+            asyncio.run(collect())
+
+    def test_malformed_lines(self):
+        items = _decode([b'"a"\n{bad}\n"b', b'"\n"c"\n"d'])
+        assert [type(item) for item in items] == [
+            str, StreamDecodeError, str, str, StreamDecodeError
+        ]
+        assert items[2:4] == ["b", "c"]
+
+    def test_batches(self):
+        async def collect(chunks):
+            return [batch async for batch in iter_json_batches(_chunks(chunks))]
+
+        assert asyncio.run(collect([b'["a", "b", "c', b'", "d"]'])) == [["a", "b"], ["c", "d"]]
+        assert asyncio.run(collect([b'"a"\n"b', b'"\n'])) == [["a"], ["b"]]
+        batches = []
+
+        async def collect_malformed():
+            async for batch in iter_json_batches(_chunks([b'["a", {bad}, "b"]'])):
+                batches.append(batch)
+
+        with pytest.raises(StreamDecodeError):
+            asyncio.run(collect_malformed())
+        assert batches == [["a"]]
+
+    def test_long_line(self):
+        items = _decode_limited([b'"' + b"a" * 10, b"a" * 10 + b'"\n"b"\n'], max_item_size=16)
+        assert isinstance(items[0], StreamDecodeError)
+        assert items[1:] == ["b"]
+
+        with pytest.raises(StreamDecodeError):
+            _decode_limited([b'["' + b"a" * 10, b"a" * 10, b"a" * 10 + b'"]'], max_item_size=16)
+
+
+@pytest.fixture(name="client", scope="module")
+def fixture_client():
+    return TestClient(create_application())
+
+
+class TestBatchEndpoint:
+
+    def test_ndjson(self, client):
+        body = b'"Winterallee 3"\n{bad}\n12\n"Winterallee"\n\n"4, rue de la revolution"\n'
+        response = client.post(
+            "/api/v1/addresses/batch",
+            content=body,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert response.status_code == 200
+        results = [json.loads(line) for line in response.text.splitlines()]
+        assert [result["index"] for result in results] == [0, 1, 2, 3, 4]
+        assert results[0]["street"] == "Winterallee" and results[0]["error"] is None
+        assert results[1]["error"].startswith("invalid input: malformed JSON")
+        assert results[2]["error"] == "invalid input: address must be a string"
+        assert results[3]["error"] == "unsupported address format: Winterallee"
+        assert results[4]["housenumber"] == "4"
+
+    def test_malformed_array(self, client):
+        response = client.post("/api/v1/addresses/batch", json=["Winterallee 3", 1, {}, "x"])
+        results = [json.loads(line) for line in response.text.splitlines()]
+        assert [result["index"] for result in results] == [0, 1, 2, 3]
+
+        response = client.post("/api/v1/addresses/batch", content=b'["Winterallee 3", {bad}]')
+        results = [json.loads(line) for line in response.text.splitlines()]
+        assert results[0]["street"] == "Winterallee"
+        assert results[1]["index"] is None
+        assert results[1]["error"].startswith("malformed request body")
+
+    def test_parsed_off_event_loop(self, client, monkeypatch):
+        on_event_loop = []
+        extract = address.AddressService.extract
+
+        def record(self, *args):
+            try:
+                asyncio.get_running_loop()
+                on_event_loop.append(True)
+            except RuntimeError:
+                on_event_loop.append(False)
+            return extract(self, *args)
+
+        monkeypatch.setattr(address.AddressService, "extract", record)
+        response = client.post("/api/v1/addresses/batch", json=["Winterallee 3"] * 3)
+        assert len(response.text.splitlines()) == 3
+        assert on_event_loop == [False] * 3
+
+    def test_not_coalesced(self, client, monkeypatch):
+        coalescer = Coalescer(parse_batch, window=0.05, max_batch=64)
+        submitted = []
+
+        def submit(item):
+            submitted.append(item)
+            return Coalescer.submit(coalescer, item)
+
+        monkeypatch.setattr(coalescer, "submit", submit)
+        monkeypatch.setattr(address, "_ADDRESS_COALESCER", coalescer)
+        try:
+            response = client.post("/api/v1/addresses/batch", json=["Winterallee 3"] * 50)
+            results = [json.loads(line) for line in response.text.splitlines()]
+            assert [result["street"] for result in results] == ["Winterallee"] * 50
+            # waiting for a batch window per address would stall the whole batch
+            assert not submitted
+            client.get("/api/v1/addresses/extract/address}", params={"address": "Am Bächle 17"})
+            assert submitted == [("Am Bächle 17", None)]
+        finally:
+            coalescer.close()
@@ -14,3 +14,8 @@ class TestToken:
     )
     def test_str(self, token, expected):
         assert str(token) == expected
+
+    def test_hashable(self):
+        tokens = {Token(TokenType.ALPHA, "Prosta"), Token(TokenType.ALPHA, "Prosta")}
+        assert tokens == {Token(token_type=TokenType.ALPHA, value="Prosta")}
+        assert Token(TokenType.ALPHA, "43") != Token(TokenType.NUM, "43")